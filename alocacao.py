@@ -0,0 +1,453 @@
+import re
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from esquema import normalizar_codigos
+from resultados import lotes_resultado
+from tipos import categoria, chave_ordenacao, codigos, quantidade
+
+# =====================================================
+# CONSTANTES DA ALOCAÇÃO
+# =====================================================
+# Grupos que vêm primeiro na prioridade padrão; os demais LK-GRUPO
+# encontrados no estoque vêm depois, em ordem alfabética
+GRUPOS_PRIORIDADE = ["QM", "MF"]
+
+SEM_ESTOQUE = "SEM ESTOQUE"
+
+# Exceções à prioridade: {CNPJ ou Codigo: grupos na ordem de atendimento}.
+# Só os grupos listados atendem a linha; a exceção do produto prevalece
+# sobre a do cliente
+Excecoes = namedtuple("Excecoes", ["por_cnpj", "por_codigo"], defaults=[None, None])
+
+COLUNAS_RESULTADO = [
+    "CNPJ",
+    "Codigo",
+    "Quantidade_Pedido",
+    "Valor_Unitario",
+    "Empresa_Atendimento",
+    "Qtde_Disponivel",
+    "Valor_Item",
+    "Arquivo_Pedido",
+]
+
+
+# =====================================================
+# ÍNDICE DO ESTOQUE (PRODUTO -> QTDE POR GRUPO)
+# =====================================================
+def grupos_estoque(df_estoque_agrupado, prioridade=GRUPOS_PRIORIDADE):
+    """
+    LK-GRUPO presentes no estoque: os de `prioridade` primeiro, nessa ordem,
+    e os demais em ordem alfabética.
+    """
+    presentes = {str(g) for g in categoria(df_estoque_agrupado["LK-GRUPO"]).categories}
+    presentes -= {"", "NAN"}
+    return [g for g in prioridade if g in presentes] + sorted(presentes - set(prioridade))
+
+
+def indexar_estoque(df_estoque_agrupado, grupos=None):
+    """
+    Pivota o estoque agrupado em uma tabela indexada por Produto, com uma
+    coluna de quantidade para cada LK-GRUPO na ordem de prioridade (padrão:
+    grupos_estoque). A ordem das colunas é a prioridade usada na alocação.
+
+    A tabela é montada pelos códigos das categorias (Produto x LK-GRUPO),
+    sem agrupar os textos de novo.
+    """
+    grupos = grupos_estoque(df_estoque_agrupado) if grupos is None else list(grupos)
+    produtos = categoria(df_estoque_agrupado["Produto"])
+    grupo = pd.Categorical(df_estoque_agrupado["LK-GRUPO"], categories=grupos)
+
+    validas = (produtos.codes >= 0) & (grupo.codes >= 0)
+    posicao = produtos.codes[validas].astype("int64") * len(grupos) + grupo.codes[validas]
+    quantidades = np.bincount(
+        posicao,
+        weights=df_estoque_agrupado["Qtde"].to_numpy(dtype="float64")[validas],
+        minlength=len(produtos.categories) * len(grupos)
+    )
+    return pd.DataFrame(
+        quantidades.reshape(len(produtos.categories), len(grupos)),
+        index=pd.Index(produtos.categories, name="Produto"),
+        columns=pd.Index(grupos, name="LK-GRUPO"),
+    )
+
+
+# =====================================================
+# EXCEÇÕES DE PRIORIDADE (POR CLIENTE OU PRODUTO)
+# =====================================================
+_LINHA_EXCECAO = re.compile(r"^(CNPJ|CODIGO|CÓDIGO)\s+(\S+?)\s*[:=]\s*(.*)$", re.IGNORECASE)
+
+
+def ler_excecoes(texto, grupos=None):
+    """
+    Lê exceções de prioridade, uma por linha:
+
+        CNPJ 12.345.678/0001-99: MF, QM
+        CODIGO 0001234: MF
+
+    Linhas vazias ou iniciadas por # são ignoradas; CNPJ e código são
+    normalizados como nos pedidos. Com `grupos`, recusa grupos fora da lista
+    (sem ela, grupos ausentes do índice são apenas ignorados na alocação).
+    Devolve (Excecoes, erros), com erros no formato "Linha n: motivo" para
+    as linhas recusadas.
+    """
+    por_cnpj, por_codigo, erros = {}, {}, []
+    for numero, linha in enumerate(texto.splitlines(), start=1):
+        linha = linha.strip()
+        if not linha or linha.startswith("#"):
+            continue
+
+        encontrado = _LINHA_EXCECAO.match(linha)
+        if not encontrado:
+            erros.append(f"Linha {numero}: use \"CNPJ <cnpj>: GRUPO, ...\" ou \"CODIGO <código>: GRUPO, ...\".")
+            continue
+
+        tipo, chave, lista = encontrado.groups()
+        ordem = tuple(dict.fromkeys(g.strip().upper() for g in lista.split(",") if g.strip()))
+        desconhecidos = [g for g in ordem if grupos is not None and g not in grupos]
+        if not ordem or desconhecidos:
+            erros.append(f"Linha {numero}: grupo(s) inválido(s): {', '.join(desconhecidos) or 'nenhum informado'}.")
+        elif tipo.upper() == "CNPJ":
+            por_cnpj[re.sub(r"\D", "", chave)] = ordem
+        else:
+            por_codigo[normalizar_codigos(pd.Series([chave])).iloc[0]] = ordem
+
+    return Excecoes(por_cnpj, por_codigo), erros
+
+
+# =====================================================
+# ALOCAÇÃO VETORIZADA
+# =====================================================
+def alocar_pedidos(df_pedidos, indice_estoque, reservar=False, dividir=False, excecoes=None):
+    """
+    Define Empresa_Atendimento e Qtde_Disponivel para todas as linhas de pedido
+    de uma só vez, consultando o índice do estoque.
+
+    Espera as colunas normalizadas Codigo, Quantidade, Valor_Unitario,
+    Total_Item, CNPJ e Arquivo_Pedido.
+
+    A prioridade entre os grupos é a ordem das colunas do índice, exceto nas
+    linhas com uma exceção (ver Excecoes). Todos os grupos são avaliados
+    juntos, sobre a matriz linha x grupo.
+
+    - reservar=False: cada linha é comparada com o estoque total e atendida pelo
+      primeiro grupo (na sua ordem de prioridade) que cobre a quantidade.
+    - reservar=True: as linhas consomem o estoque em sequência (ver
+      alocar_com_reserva), de modo que vários pedidos não contam o mesmo saldo.
+    """
+    df = df_pedidos[df_pedidos["Quantidade"] > 0]
+
+    if reservar:
+        return alocar_com_reserva(df, indice_estoque, dividir=dividir, excecoes=excecoes)
+
+    grupos = list(indice_estoque.columns)
+    prioridade = _prioridade_por_linha(df, grupos, excecoes)
+    estoque = _ordenar(_estoque_por_linha(df, indice_estoque), prioridade)
+    qtd = df["Quantidade"].to_numpy(dtype="float64")
+    nivel, qtde_disp = _primeiro_grupo(estoque, qtd)
+
+    return _montar_resultado(
+        df, grupos, _grupo_no_nivel(prioridade, nivel, len(grupos)), qtde_disp, qtd, df["Total_Item"].to_numpy()
+    )
+
+
+# =====================================================
+# CONSULTA DE DISPONIBILIDADE (ITENS AVULSOS)
+# =====================================================
+def consultar_estoque(codigos, quantidades, indice_estoque, excecoes=None, cnpj=""):
+    """
+    Disponibilidade de itens avulsos (ex.: um pedido do WhatsApp) no índice
+    do estoque, sem montar um pedido completo. `codigos` já normalizados
+    (ver esquema.normalizar_codigos); `cnpj` (somente números) seleciona as
+    exceções do cliente.
+
+    Devolve um DataFrame na ordem dos itens com o estoque de cada grupo e a
+    Empresa_Atendimento sugerida pela mesma regra de alocar_pedidos sem
+    reserva. Cada código é uma consulta à tabela hash do índice.
+    """
+    grupos = list(indice_estoque.columns)
+    df = pd.DataFrame({"Codigo": np.asarray(codigos, dtype=object), "CNPJ": cnpj})
+    estoque = _estoque_por_linha(df, indice_estoque)
+    prioridade = _prioridade_por_linha(df, grupos, excecoes)
+    nivel, _ = _primeiro_grupo(_ordenar(estoque, prioridade), np.asarray(quantidades, dtype="float64"))
+
+    disponibilidade = pd.DataFrame(estoque, columns=grupos)
+    disponibilidade["Empresa_Atendimento"] = pd.Categorical.from_codes(
+        _grupo_no_nivel(prioridade, nivel, len(grupos)), categories=grupos + [SEM_ESTOQUE]
+    )
+    return disponibilidade
+
+
+# =====================================================
+# ALOCAÇÃO COM RESERVA (SALDO CORRENTE ENTRE PEDIDOS)
+# =====================================================
+def alocar_com_reserva(df, indice_estoque, dividir=False, excecoes=None):
+    """
+    Aloca as linhas mantendo um saldo corrente por Produto e LK-GRUPO.
+
+    As linhas são consumidas em ordem determinística: por Arquivo_Pedido e,
+    dentro de cada arquivo, na ordem original. Cada linha percorre a sua
+    lista de prioridade inteira antes das linhas seguintes do mesmo produto:
+    as linhas de um produto são divididas em trechos consecutivos com a
+    mesma ordem (ver _blocos_mesma_prioridade), e cada rodada resolve um
+    trecho de cada produto, nível a nível, com somas acumuladas por produto
+    e grupo (sem laço por linha). Sem exceções há uma única rodada.
+
+    - dividir=False: cada grupo atende, na ordem, as linhas pendentes cuja
+      quantidade inteira cabe no saldo deixado pelas linhas já atendidas; as
+      que não couberem não consomem saldo, passam para o próximo grupo e, por
+      fim, ficam "SEM ESTOQUE".
+    - dividir=True: o estoque é consumido em cascata, na ordem de prioridade.
+      Uma linha que o saldo restante de um grupo não cobre é dividida entre os
+      grupos, e a parte não atendida vira uma linha "SEM ESTOQUE".
+      Quantidade_Pedido e Valor_Item passam a ser os da parte alocada.
+
+    Qtde_Disponivel é o saldo do grupo antes da linha ser atendida.
+    O resultado mantém a ordem original das linhas.
+    """
+    posicao = np.arange(len(df))
+    ordem = np.argsort(chave_ordenacao(df["Arquivo_Pedido"]), kind="stable")
+    df = df.iloc[ordem]
+    posicao = posicao[ordem]
+
+    grupos = list(indice_estoque.columns)
+    niveis = len(grupos)
+    prioridade = _prioridade_por_linha(df, grupos, excecoes)
+    estoque = _ordenar(np.clip(_estoque_por_linha(df, indice_estoque), 0, None), prioridade)
+    qtd = df["Quantidade"].to_numpy(dtype="float64")
+    produtos = codigos(df["Codigo"]).astype("int64")
+
+    # Coluna nível = grupo atendido naquele nível; a última = SEM ESTOQUE
+    partes = np.zeros((len(df), niveis + 1))
+    saldo_antes = np.zeros((len(df), niveis + 1))
+    consumido = np.zeros((int(produtos.max()) + 1 if len(produtos) else 0) * niveis)
+    colunas = np.broadcast_to(np.arange(niveis), (len(df), niveis)) if prioridade is None else prioridade
+
+    for linhas in _blocos_mesma_prioridade(produtos, prioridade):
+        pendente = qtd[linhas]
+        for k in range(niveis):
+            # Linhas sem grupo neste nível (-1) não pedem nada: não entram na
+            # soma acumulada da chave que compartilham com o grupo 0
+            grupo = colunas[linhas, k]
+            chave = produtos[linhas] * niveis + np.maximum(grupo, 0)
+            disponivel = np.where(grupo >= 0, estoque[linhas, k] - consumido[chave], 0.0)
+            pedida = np.where(grupo >= 0, pendente, 0.0)
+            if dividir:
+                acumulado = _soma_acumulada(pedida, chave)
+                anterior = acumulado - pedida
+                parte = np.clip(acumulado, 0, disponivel) - np.clip(anterior, 0, disponivel)
+                saldo_antes[linhas, k] = disponivel - np.clip(anterior, 0, disponivel)
+            else:
+                parte, saldo_antes[linhas, k] = _atender_inteiras(pedida, chave, disponivel)
+
+            partes[linhas, k] = parte
+            consumido += np.bincount(chave, weights=parte, minlength=len(consumido))
+            pendente = pendente - parte
+        partes[linhas, niveis] = pendente
+
+    if dividir:
+        linha, nivel = np.nonzero(partes > 1e-9)
+        df_partes = df.iloc[linha]
+        quantidade_parte = partes[linha, nivel]
+        valor = df_partes["Total_Item"].to_numpy(dtype="float64") * quantidade_parte / qtd[linha]
+        empresa = _grupo_no_nivel(None if prioridade is None else prioridade[linha], nivel, niveis)
+
+        resultado = _montar_resultado(
+            df_partes, grupos, empresa, saldo_antes[linha, nivel], quantidade_parte, valor
+        )
+        chave = posicao[linha]
+    else:
+        # Sem divisão, cada linha tem uma única parte (a quantidade inteira)
+        nivel = np.argmax(partes > 0, axis=1)
+        qtde_disp = saldo_antes[np.arange(len(df)), nivel]
+        empresa = _grupo_no_nivel(prioridade, nivel, niveis)
+
+        resultado = _montar_resultado(df, grupos, empresa, qtde_disp, qtd, df["Total_Item"].to_numpy())
+        chave = posicao
+
+    return resultado.iloc[np.argsort(chave, kind="stable")].reset_index(drop=True)
+
+
+# =====================================================
+# FATURAMENTO PREVISTO POR EMPRESA
+# =====================================================
+def resumir_faturamento(df_resultado, grupos=GRUPOS_PRIORIDADE):
+    """
+    Soma Valor_Item por Empresa_Atendimento (DataFrame ou ResultadoEmLotes,
+    somando os totais de cada lote). Os grupos de estoque e "SEM ESTOQUE"
+    sempre aparecem, mesmo com valor zero.
+    """
+    rotulos = list(grupos) + [SEM_ESTOQUE]
+    parciais = [
+        lote.groupby("Empresa_Atendimento", observed=True)["Valor_Item"].sum()
+        for lote in lotes_resultado(df_resultado, ["Empresa_Atendimento", "Valor_Item"])
+    ]
+    if len(parciais) == 1:
+        faturamento = parciais[0]
+    else:
+        faturamento = pd.concat(parciais or [pd.Series(dtype="float64")]).groupby(level=0, sort=False).sum()
+    faturamento = faturamento.reindex(rotulos + [e for e in faturamento.index if e not in rotulos], fill_value=0.0)
+    return faturamento.rename_axis("Empresa_Atendimento").reset_index()
+
+
+# =====================================================
+# FUNÇÕES AUXILIARES
+# =====================================================
+def _estoque_por_linha(df, indice_estoque):
+    """Quantidade em estoque de cada grupo para o Codigo de cada linha."""
+    # Busca cada código distinto uma vez; as linhas só copiam pelo código inteiro
+    codigo = categoria(df["Codigo"])
+    posicao = indice_estoque.index.get_indexer(codigo.categories)
+    linhas = np.where(codigo.codes >= 0, posicao[codigo.codes], -1)
+
+    # Copia só as linhas consultadas; códigos fora do estoque (posição -1) ficam com zero
+    tabela = indice_estoque.to_numpy(dtype="float64")
+    estoque = np.zeros((len(linhas), tabela.shape[1]))
+    encontrados = linhas >= 0
+    estoque[encontrados] = tabela[linhas[encontrados]]
+    return estoque
+
+
+def _primeiro_grupo(estoque, qtd):
+    """
+    Posição do primeiro grupo cujo estoque cobre a quantidade de cada linha
+    (len(grupos) = SEM ESTOQUE) e o estoque desse grupo (0 se nenhum).
+    """
+    if not estoque.shape[1]:
+        return np.zeros(len(estoque), dtype="int64"), np.zeros(len(estoque))
+    atende = estoque >= qtd[:, None]
+    tem_grupo = atende.any(axis=1)
+    primeiro = atende.argmax(axis=1)
+
+    empresa = np.where(tem_grupo, primeiro, estoque.shape[1])
+    qtde_disp = np.where(tem_grupo, estoque[np.arange(len(estoque)), primeiro], 0)
+    return empresa, qtde_disp
+
+
+def _prioridade_por_linha(df, grupos, excecoes):
+    """
+    Coluna do índice atendida em cada nível de prioridade de cada linha (-1 =
+    grupo fora da exceção), ou None se nenhuma exceção se aplica (a ordem é
+    a das colunas). Cada ordem distinta é um perfil: as exceções são
+    resolvidas por categoria e as linhas copiam o perfil pelo código inteiro.
+    """
+    if excecoes is None or not grupos:
+        return None
+
+    colunas = {grupo: j for j, grupo in enumerate(grupos)}
+    perfis = {tuple(range(len(grupos))): 0}
+    perfil = np.zeros(len(df), dtype="int64")
+
+    # Cliente primeiro e produto depois: a exceção do produto prevalece
+    for coluna, regras in (("CNPJ", excecoes.por_cnpj), ("Codigo", excecoes.por_codigo)):
+        if not regras:
+            continue
+        valores = categoria(df[coluna])
+        por_categoria = np.zeros(len(valores.categories) + 1, dtype="int64")  # última: nulos (código -1)
+        com_excecao = np.zeros(len(por_categoria), dtype=bool)
+        for posicao, ordem in zip(valores.categories.get_indexer(list(regras)), regras.values()):
+            if posicao >= 0:
+                atendem = [colunas[grupo] for grupo in ordem if grupo in colunas]
+                niveis = tuple(atendem + [-1] * (len(grupos) - len(atendem)))
+                por_categoria[posicao] = perfis.setdefault(niveis, len(perfis))
+                com_excecao[posicao] = True
+        # Uma exceção igual à ordem padrão (perfil 0) também prevalece
+        perfil = np.where(com_excecao[valores.codes], por_categoria[valores.codes], perfil)
+
+    if len(perfis) == 1:
+        return None
+    return np.array(list(perfis), dtype="int64")[perfil]
+
+
+def _ordenar(estoque, prioridade):
+    """Estoque de cada linha na sua ordem de prioridade (zero nos grupos fora da exceção)."""
+    if prioridade is None:
+        return estoque
+    return np.where(prioridade >= 0, np.take_along_axis(estoque, np.maximum(prioridade, 0), axis=1), 0.0)
+
+
+def _grupo_no_nivel(prioridade, nivel, niveis):
+    """Coluna do índice do grupo escolhido no `nivel` de cada linha (niveis = SEM ESTOQUE)."""
+    if prioridade is None:
+        return nivel
+    coluna = prioridade[np.arange(len(nivel)), np.minimum(nivel, niveis - 1)]
+    return np.where(nivel < niveis, coluna, niveis)
+
+
+def _blocos_mesma_prioridade(produtos, prioridade):
+    """
+    Rodadas da alocação com reserva: posições das linhas (na ordem recebida)
+    tais que a rodada r reúne o r-ésimo trecho de linhas consecutivas de
+    cada produto com a mesma ordem de prioridade. Sem exceções (prioridade
+    None), todas as linhas formam uma única rodada (slice(None)).
+    """
+    if prioridade is None or not len(produtos):
+        return [slice(None)]
+
+    ordem = np.argsort(produtos, kind="stable")
+    novo_produto = np.append(True, produtos[ordem][1:] != produtos[ordem][:-1])
+    mudou = novo_produto | np.append(True, (prioridade[ordem][1:] != prioridade[ordem][:-1]).any(axis=1))
+    trecho = np.cumsum(mudou)
+    rodada = np.empty(len(produtos), dtype="int64")
+    rodada[ordem] = trecho - np.maximum.accumulate(np.where(novo_produto, trecho, 0))
+
+    linhas = np.argsort(rodada, kind="stable")
+    return np.split(linhas, np.flatnonzero(np.diff(rodada[linhas])) + 1)
+
+
+def _soma_acumulada(valores, chaves):
+    """Soma acumulada de valores por chave, preservando a ordem das linhas."""
+    return pd.Series(valores).groupby(chaves, sort=False).cumsum().to_numpy()
+
+
+def _atender_inteiras(pedida, chave, disponivel):
+    """
+    Atende cada linha inteira, na ordem, se `pedida` couber no saldo da sua
+    chave depois das linhas anteriores já atendidas; linhas recusadas não
+    consomem saldo. Devolve (parte atendida, saldo antes da linha); nas
+    linhas não atendidas, o saldo é o `disponivel` recebido.
+
+    A cada rodada, as linhas que cabem na soma acumulada até a primeira
+    recusa de cada chave são atendidas e essa primeira é recusada; as
+    seguintes são refeitas com o saldo que sobrou (as que já não cabem nele
+    são recusadas de uma vez).
+    """
+    parte = np.zeros(len(pedida))
+    saldo = np.asarray(disponivel, dtype="float64").copy()
+    usado = np.zeros(int(chave.max()) + 1 if len(chave) else 0)
+    candidatas = np.flatnonzero(pedida > 0)
+
+    while candidatas.size:
+        chave_c = chave[candidatas]
+        pedida_c = pedida[candidatas]
+        restante = saldo[candidatas] - usado[chave_c]
+        acumulado = _soma_acumulada(pedida_c, chave_c)
+        cabe = acumulado <= restante
+        recusas = _soma_acumulada((~cabe).astype("float64"), chave_c)
+
+        atendidas = candidatas[cabe]
+        parte[atendidas] = pedida_c[cabe]
+        saldo[atendidas] = (restante - (acumulado - pedida_c))[cabe]
+        usado += np.bincount(chave_c[cabe], weights=pedida_c[cabe], minlength=len(usado))
+
+        # Depois da primeira recusa da chave, a linha ainda pode caber no que sobrou
+        seguem = recusas > 1
+        seguem[seguem] = pedida_c[seguem] <= saldo[candidatas[seguem]] - usado[chave_c[seguem]]
+        candidatas = candidatas[seguem]
+    return parte, saldo
+
+
+def _montar_resultado(df, grupos, empresa, qtde_disp, quantidade_pedido, valor_item):
+    # empresa: posição do grupo em `grupos` (len(grupos) = SEM ESTOQUE)
+    return pd.DataFrame({
+        "CNPJ": categoria(df["CNPJ"]),
+        "Codigo": categoria(df["Codigo"]),
+        "Quantidade_Pedido": quantidade(quantidade_pedido),
+        "Valor_Unitario": df["Valor_Unitario"].to_numpy(),
+        "Empresa_Atendimento": pd.Categorical.from_codes(empresa, categories=list(grupos) + [SEM_ESTOQUE]),
+        "Qtde_Disponivel": quantidade(qtde_disp),
+        "Valor_Item": valor_item,
+        "Arquivo_Pedido": categoria(df["Arquivo_Pedido"]),
+    }, columns=COLUNAS_RESULTADO)
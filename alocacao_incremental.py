@@ -0,0 +1,226 @@
+import threading
+from collections import OrderedDict, defaultdict
+
+from alocacao import COLUNAS_RESULTADO, alocar_pedidos
+from diagnostico import etapa
+from pedidos import WORKERS_PADRAO, ler_pedidos
+from resultados import LIMITE_RESULTADO_EM_MEMORIA_MB, ResultadoEmLotes
+from tipos import concatenar
+
+# Arquivos de pedido mantidos no cache (os menos usados saem primeiro)
+CACHE_PEDIDOS_MAX_ENTRADAS = 2_000
+
+# Memória máxima (MB) de cada tabela do cache (leituras e alocações)
+CACHE_PEDIDOS_MAX_MB = 256
+
+# Sem reserva, arquivos de pedido lidos e alocados de cada vez
+ARQUIVOS_POR_BLOCO = 256
+
+
+# =====================================================
+# CACHE POR ARQUIVO DE PEDIDO
+# =====================================================
+class CacheResultados:
+    """
+    Resultados por arquivo de pedido, chaveados pelo hash do conteúdo e pelo
+    nome do arquivo (que entra em Arquivo_Pedido):
+
+    - leituras: (df_pedido, aviso) normalizados, independentes do estoque;
+    - alocacoes: resultado da alocação sem reserva, válido apenas para a
+      versão do estoque (incluindo prioridade e exceções) com que foi
+      calculado. Uma versão diferente descarta todas as alocações.
+
+    Cada tabela guarda até max_entradas arquivos e max_mb de DataFrames; os
+    menos usados saem primeiro.
+
+    Uma alocação usa o cache do início ao fim sob `trava`: duas chamadas com
+    o mesmo cache (ex.: a tarefa retirada e a que a substitui) rodam uma após
+    a outra, sem misturar versões do estoque.
+    """
+
+    def __init__(self, max_entradas=CACHE_PEDIDOS_MAX_ENTRADAS, max_mb=CACHE_PEDIDOS_MAX_MB):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_mb * 1024 * 1024
+        self.leituras = OrderedDict()
+        self.alocacoes = OrderedDict()
+        self.versao_estoque = None
+        self._tamanhos = {}
+        self._bytes = defaultdict(int)
+        self.trava = threading.Lock()
+
+    def usar_estoque(self, versao_estoque):
+        if versao_estoque != self.versao_estoque:
+            for chave in self.alocacoes:
+                self._tamanhos.pop((id(self.alocacoes), chave), None)
+            self.alocacoes.clear()
+            self._bytes[id(self.alocacoes)] = 0
+            self.versao_estoque = versao_estoque
+
+    def obter(self, tabela, chave):
+        if chave not in tabela:
+            return None
+        tabela.move_to_end(chave)
+        return tabela[chave]
+
+    def guardar(self, tabela, chave, valor):
+        self._descartar(tabela, chave)
+        tabela[chave] = valor
+        tamanho = _tamanho(valor)
+        self._tamanhos[(id(tabela), chave)] = tamanho
+        self._bytes[id(tabela)] += tamanho
+        while len(tabela) > 1 and (len(tabela) > self.max_entradas or self._bytes[id(tabela)] > self.max_bytes):
+            self._descartar(tabela, next(iter(tabela)))
+
+    def _descartar(self, tabela, chave):
+        if chave in tabela:
+            del tabela[chave]
+            self._bytes[id(tabela)] -= self._tamanhos.pop((id(tabela), chave))
+
+
+# =====================================================
+# ALOCAÇÃO INCREMENTAL
+# =====================================================
+def alocar_incremental(arquivos, versao_estoque, indice_estoque, cache, reservar=False, dividir=False,
+                       excecoes=None, workers=WORKERS_PADRAO, ao_concluir=None, verificar=None,
+                       limite_memoria_mb=LIMITE_RESULTADO_EM_MEMORIA_MB):
+    """
+    Aloca os pedidos recebidos como (nome_arquivo, hash_conteudo, conteudo),
+    recalculando apenas os arquivos novos ou alterados desde a última chamada.
+
+    Sem reserva, cada arquivo é alocado de forma independente e o resultado
+    fica no cache; os arquivos são lidos e alocados em blocos de
+    ARQUIVOS_POR_BLOCO, e só o resultado de cada bloco segue adiante. Com
+    reserva, os pedidos dependem uns dos outros (saldo corrente): só a
+    leitura vem do cache e a alocação, vetorizada, é refeita sobre todos.
+
+    `versao_estoque` deve mudar sempre que o índice (ou a sua ordem de
+    prioridade) ou as exceções mudarem.
+
+    `verificar`, se informado, é chamado entre blocos e entre arquivos
+    alocados (inclusive os que vêm do cache) e pode lançar uma exceção para
+    interromper a alocação (ex.: Tarefa.verificar).
+
+    Devolve (resultado, avisos, recalculados): resultado é um
+    ResultadoEmLotes (acima de `limite_memoria_mb`, os lotes vão para
+    Parquet) e recalculados é o número de arquivos que precisaram ser lidos
+    novamente.
+    """
+    verificar = verificar or (lambda: None)
+    with cache.trava:
+        return _alocar_incremental(arquivos, versao_estoque, indice_estoque, cache, reservar, dividir,
+                                   excecoes, workers, ao_concluir, verificar, limite_memoria_mb)
+
+
+def _alocar_incremental(arquivos, versao_estoque, indice_estoque, cache, reservar, dividir,
+                        excecoes, workers, ao_concluir, verificar, limite_memoria_mb):
+    verificar()
+    cache.usar_estoque(versao_estoque)
+    resultado = ResultadoEmLotes(COLUNAS_RESULTADO, limite_memoria_mb)
+    a_ler = sum((hash_arquivo, nome) not in cache.leituras for nome, hash_arquivo, _ in arquivos)
+
+    avisos = []
+    recalculados = 0
+    for bloco in [arquivos] if reservar else blocos_por_nome(arquivos):
+        verificar()
+        progresso = None
+        if ao_concluir is not None:
+            def progresso(concluidos, _total, antes=recalculados):
+                ao_concluir(antes + concluidos, max(a_ler, antes + concluidos))
+
+        pedidos, avisos_bloco, lidos = _ler_bloco(bloco, cache, workers, progresso)
+        avisos.extend(avisos_bloco)
+        recalculados += lidos
+        if not pedidos:
+            continue
+
+        with etapa("alocacao.comparacao") as registro:
+            linhas_antes = len(resultado)
+            _alocar(pedidos, indice_estoque, cache, reservar, dividir, excecoes, resultado, verificar)
+            registro["linhas"] = len(resultado) - linhas_antes
+
+    return resultado, avisos, recalculados
+
+
+def blocos_por_nome(arquivos, tamanho=ARQUIVOS_POR_BLOCO):
+    """
+    Divide `arquivos` (tuplas com o nome na primeira posição) em blocos de
+    cerca de `tamanho`, sem separar arquivos de mesmo nome: o nome vira
+    Arquivo_Pedido, e cada pedido deve ficar inteiro em um lote do
+    ResultadoEmLotes.
+    """
+    por_nome = OrderedDict()
+    for arquivo in arquivos:
+        por_nome.setdefault(arquivo[0], []).append(arquivo)
+
+    bloco = []
+    for mesmo_nome in por_nome.values():
+        bloco.extend(mesmo_nome)
+        if len(bloco) >= tamanho:
+            yield bloco
+            bloco = []
+    if bloco:
+        yield bloco
+
+
+def _ler_bloco(arquivos, cache, workers, ao_concluir):
+    # Leituras do cache ou lidas agora (em paralelo): ([(nome, hash, df)], avisos, lidos)
+    leituras = {}
+    faltantes = {}
+    for nome, hash_arquivo, conteudo in arquivos:
+        leitura = cache.obter(cache.leituras, (hash_arquivo, nome))
+        if leitura is None:
+            faltantes[(hash_arquivo, nome)] = conteudo
+        else:
+            leituras[(hash_arquivo, nome)] = leitura
+
+    # Com vários processos, cada leitura é medida como um todo nesta etapa
+    with etapa("pedidos.leitura") as registro:
+        lidos = ler_pedidos(
+            [(nome, conteudo) for (_, nome), conteudo in faltantes.items()],
+            workers=workers,
+            ao_concluir=ao_concluir
+        )
+        registro["linhas"] = sum(len(df) for df, _ in lidos if df is not None)
+    for chave, leitura in zip(faltantes, lidos):
+        leituras[chave] = leitura
+        cache.guardar(cache.leituras, chave, leitura)
+
+    avisos = []
+    pedidos = []
+    for nome, hash_arquivo, _ in arquivos:
+        df_pedido, aviso = leituras[(hash_arquivo, nome)]
+        if aviso:
+            avisos.append(aviso)
+        else:
+            pedidos.append((nome, hash_arquivo, df_pedido))
+    return pedidos, avisos, len(faltantes)
+
+
+def _alocar(pedidos, indice_estoque, cache, reservar, dividir, excecoes, resultado, verificar):
+    verificar()
+    if reservar:
+        resultado.adicionar(alocar_pedidos(
+            concatenar(df for _, _, df in pedidos),
+            indice_estoque,
+            reservar=True,
+            dividir=dividir,
+            excecoes=excecoes
+        ))
+        return
+
+    alocados = []
+    for nome, hash_arquivo, df_pedido in pedidos:
+        verificar()
+        alocado = cache.obter(cache.alocacoes, (hash_arquivo, nome))
+        if alocado is None:
+            alocado = alocar_pedidos(df_pedido, indice_estoque, excecoes=excecoes)
+            cache.guardar(cache.alocacoes, (hash_arquivo, nome), alocado)
+        alocados.append(alocado)
+
+    resultado.adicionar(concatenar(alocados))
+
+
+def _tamanho(valor):
+    # Bytes dos DataFrames guardados (leituras são (df, aviso))
+    df = valor[0] if isinstance(valor, tuple) else valor
+    return int(df.memory_usage(deep=True).sum()) if df is not None else 0
@@ -0,0 +1,178 @@
+"""
+Alocação de pedidos em lote, sem Streamlit.
+
+Uso:
+    python alocacao_lote.py --estoque-qm QM.csv --estoque-mf MF.csv \
+        --pedidos pasta_ou_glob [...] --saida alocacao_pedidos.zip
+
+Se --saida terminar em .zip, grava o mesmo ZIP da aba "COMPARAR ESTOQUES";
+caso contrário, grava os arquivos em um diretório (CSV por padrão; Parquet
+ou XLSX com --formato). Em ambos os casos inclui
+faturamento.csv com o faturamento previsto por empresa, separacao.csv com a
+lista de separação por empresa e reposicao.csv com os produtos em falta.
+
+A prioridade entre os grupos de estoque (LK-GRUPO) pode ser definida com
+--prioridade QM,MF,... e exceções por cliente ou produto com --excecoes
+(arquivo texto no formato de alocacao.ler_excecoes).
+
+Sem --reservar, os pedidos são lidos e alocados em blocos de arquivos; o
+resultado passa de --memoria-max-mb para arquivos Parquet temporários e os
+resumos e a exportação percorrem esses lotes, um por vez.
+
+Códigos de saída: 0 = sucesso, 2 = erro de colunas (estoque ou pedidos),
+1 = outros erros.
+"""
+import argparse
+import glob
+import os
+import sys
+
+from alocacao import indexar_estoque, ler_excecoes, resumir_faturamento
+from alocacao_incremental import CacheResultados, alocar_incremental
+from estoque import ColunasEstoqueError, agrupar_estoque
+from exportacao import FORMATOS_EXPORTACAO, csv_grupo, escrever_diretorio_resultados, escrever_zip_resultados
+from pedidos import WORKERS_PADRAO, ler_pedidos
+from resultados import LIMITE_RESULTADO_EM_MEMORIA_MB
+from separacao import resumir_separacao
+
+SAIDA_OK = 0
+SAIDA_ERRO = 1
+SAIDA_ERRO_COLUNAS = 2
+
+
+# =====================================================
+# PIPELINE COMPLETO (ESTOQUE + PEDIDOS -> RESULTADO)
+# =====================================================
+def executar_alocacao(estoque_qm, estoque_mf, pedidos, reservar=False, dividir=False,
+                      prioridade=None, excecoes=None, workers=WORKERS_PADRAO, ao_concluir=None,
+                      limite_memoria_mb=LIMITE_RESULTADO_EM_MEMORIA_MB):
+    """
+    Executa a alocação completa a partir dos caminhos dos estoques e da lista
+    de caminhos dos pedidos. `prioridade` lista os grupos que atendem, na
+    ordem (padrão: todos os grupos do estoque, ver grupos_estoque).
+
+    A leitura e a alocação são as de alocacao_incremental.alocar_incremental
+    (em blocos sem reserva), com um cache descartável: cada pedido é lido do
+    disco só quando chega o seu bloco. `dividir` só vale com `reservar`.
+
+    Devolve (resultado, avisos, indice_estoque), onde resultado é um
+    ResultadoEmLotes e avisos lista os pedidos ignorados por falta de
+    colunas. Lança ColunasEstoqueError se o estoque for inválido.
+    """
+    df_estoque_agrupado = agrupar_estoque(estoque_qm, estoque_mf)
+    indice_estoque = indexar_estoque(df_estoque_agrupado, prioridade)
+
+    # O caminho faz as vezes do hash do conteúdo: é único nesta execução
+    arquivos = [(os.path.basename(caminho), caminho, caminho) for caminho in pedidos]
+    resultado, avisos, _ = alocar_incremental(
+        arquivos,
+        None,
+        indice_estoque,
+        CacheResultados(max_entradas=1, max_mb=0),
+        reservar=reservar,
+        dividir=reservar and dividir,
+        excecoes=excecoes,
+        workers=workers,
+        ao_concluir=ao_concluir,
+        limite_memoria_mb=limite_memoria_mb
+    )
+    return resultado, avisos, indice_estoque
+
+
+def listar_pedidos(entradas):
+    """
+    Expande diretórios (todos os *.csv) e padrões glob em uma lista ordenada
+    e sem repetições de caminhos de pedidos.
+    """
+    caminhos = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            caminhos.extend(glob.glob(os.path.join(entrada, "*.csv")))
+        else:
+            caminhos.extend(glob.glob(entrada))
+    return sorted(set(caminhos))
+
+
+# =====================================================
+# LINHA DE COMANDO
+# =====================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aloca pedidos de venda com base nos estoques de QM e MF.")
+    parser.add_argument("--estoque-qm", required=True, help="CSV do estoque QM (';', latin1)")
+    parser.add_argument("--estoque-mf", required=True, help="CSV do estoque MF (';', latin1)")
+    parser.add_argument("--pedidos", required=True, nargs="+", help="Diretórios ou padrões glob dos CSVs de pedido")
+    parser.add_argument("--saida", default="alocacao_pedidos.zip", help="Arquivo .zip ou diretório de saída")
+    parser.add_argument("--reservar", action="store_true", help="Reservar estoque entre pedidos")
+    parser.add_argument("--dividir", action="store_true", help="Dividir linhas entre grupos (requer --reservar)")
+    parser.add_argument("--prioridade", help="Grupos de estoque na ordem de atendimento, separados por vírgula "
+                                             "(padrão: todos os encontrados, QM e MF primeiro)")
+    parser.add_argument("--excecoes", help="Arquivo texto com exceções de prioridade por CNPJ ou CODIGO")
+    parser.add_argument("--formato", choices=list(FORMATOS_EXPORTACAO), default="csv",
+                        help="Formato dos arquivos por pedido e empresa")
+    parser.add_argument("--workers", type=int, default=WORKERS_PADRAO, help="Processos para ler os pedidos")
+    parser.add_argument("--memoria-max-mb", type=int, default=LIMITE_RESULTADO_EM_MEMORIA_MB,
+                        help="Memória (MB) do resultado antes de gravá-lo em lotes Parquet temporários")
+    args = parser.parse_args(argv)
+    if args.dividir and not args.reservar:
+        parser.error("--dividir requer --reservar")
+
+    pedidos = listar_pedidos(args.pedidos)
+    if not pedidos:
+        print("Nenhum pedido encontrado em: " + ", ".join(args.pedidos), file=sys.stderr)
+        return SAIDA_ERRO
+
+    prioridade = None
+    if args.prioridade:
+        prioridade = [grupo.strip().upper() for grupo in args.prioridade.split(",") if grupo.strip()]
+
+    excecoes = None
+    if args.excecoes:
+        with open(args.excecoes, encoding="utf-8") as f:
+            excecoes, erros = ler_excecoes(f.read(), prioridade)
+        for erro in erros:
+            print(f"AVISO: exceção ignorada — {erro}", file=sys.stderr)
+
+    try:
+        resultado, avisos, indice_estoque = executar_alocacao(
+            args.estoque_qm,
+            args.estoque_mf,
+            pedidos,
+            reservar=args.reservar,
+            dividir=args.dividir,
+            prioridade=prioridade,
+            excecoes=excecoes,
+            workers=args.workers,
+            limite_memoria_mb=args.memoria_max_mb
+        )
+    except ColunasEstoqueError as e:
+        print(f"ERRO: {e}", file=sys.stderr)
+        print(f"Colunas encontradas no estoque QM: {e.colunas_qm}", file=sys.stderr)
+        print(f"Colunas encontradas no estoque MF: {e.colunas_mf}", file=sys.stderr)
+        return SAIDA_ERRO_COLUNAS
+
+    for aviso in avisos:
+        print(f"AVISO: {aviso}", file=sys.stderr)
+
+    df_faturamento = resumir_faturamento(resultado, list(indice_estoque.columns))
+    df_separacao, df_reposicao = resumir_separacao(resultado, indice_estoque)
+    extras = {
+        "faturamento.csv": df_faturamento.to_csv(index=False, sep=";", decimal=",").encode("utf-8"),
+        "separacao.csv": csv_grupo(df_separacao),
+        "reposicao.csv": csv_grupo(df_reposicao),
+    }
+
+    if args.saida.lower().endswith(".zip"):
+        escrever_zip_resultados(resultado, args.saida, extras=extras, formato=args.formato)
+    else:
+        escrever_diretorio_resultados(resultado, args.saida, extras=extras, formato=args.formato)
+
+    print(f"{len(pedidos) - len(avisos)} pedido(s), {len(resultado)} linha(s) alocadas -> {args.saida}")
+    print(df_faturamento.to_string(index=False))
+    if len(df_reposicao):
+        print(f"{len(df_reposicao)} produto(s) em falta (ver reposicao.csv)")
+
+    return SAIDA_ERRO_COLUNAS if avisos else SAIDA_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,266 @@
+"""
+Benchmark das etapas críticas, sem Streamlit.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.executar --escalas 1000 100000 1000000 --saida bench.json
+    python -m benchmarks.executar --comparar bench_anterior.json
+
+Para cada etapa e escala (número de linhas/itens) mede o tempo de parede, a
+vazão (linhas/s) e o pico de memória alocada pelo Python/NumPy (tracemalloc,
+em uma execução separada para não distorcer o tempo).
+"""
+import argparse
+import io
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+
+from alocacao import COLUNAS_RESULTADO, alocar_pedidos, indexar_estoque, resumir_faturamento
+from benchmarks.geradores import gerar_estoque, gerar_mensagem_whatsapp, gerar_pedido
+from estoque import agrupar_estoque
+from exportacao import escrever_zip_resultados
+from pdf_pedido import documentos_alocacao, gerar_pdf, gerar_pdfs_em_lote
+from pedidos import ler_pedidos
+from resultados import ResultadoEmLotes
+from separacao import resumir_separacao
+from tipos import concatenar
+from whatsapp import ler_pedido_whatsapp, montar_dados_para_pdf
+
+ESCALAS_PADRAO = [1_000, 100_000, 1_000_000]
+
+# Linhas por arquivo de pedido gerado
+LINHAS_POR_PEDIDO = 1_000
+
+# Memória (MB) do resultado na etapa em lotes: pequena para forçar a gravação em Parquet
+LIMITE_MEMORIA_LOTES_MB = 8
+
+
+# =====================================================
+# PREPARAÇÃO DAS ETAPAS
+# =====================================================
+# Cada etapa recebe a escala e devolve (funcao_medida, linhas_processadas);
+# a geração dos dados de entrada fica fora da medição.
+def _etapa_whatsapp(n):
+    texto = gerar_mensagem_whatsapp(n)
+
+    def executar():
+        ler_pedido_whatsapp(texto)
+
+    return executar, n
+
+
+def _etapa_pdf(n):
+    texto = gerar_mensagem_whatsapp(n)
+    leitura = ler_pedido_whatsapp(texto)
+    dados_cliente = leitura.cliente
+    dados_pdf, carrinho = montar_dados_para_pdf(dados_cliente, leitura.itens, texto, leitura.endereco)
+
+    def executar():
+        gerar_pdf(
+            dados_cliente=dados_pdf,
+            carrinho=carrinho,
+            total=leitura.total,
+            cond_pag="Conforme combinado",
+            frete="A combinar",
+            obs="Benchmark",
+            cnpj=dados_cliente["CNPJ"],
+            telefone=dados_cliente["Telefone"],
+            email=dados_cliente["Email"],
+            ie=dados_cliente["IE"]
+        )
+
+    return executar, n
+
+
+def _etapa_pdf_lote(n):
+    df_pedidos, indice_estoque = _preparar_alocacao(n)
+    documentos = list(documentos_alocacao(alocar_pedidos(df_pedidos, indice_estoque)))
+    return (lambda: gerar_pdfs_em_lote(documentos, io.BytesIO())), n
+
+
+def _etapa_estoque(n):
+    qm = gerar_estoque(n, "QM", semente=1)
+    mf = gerar_estoque(n, "MF", semente=2)
+    return (lambda: agrupar_estoque(io.BytesIO(qm), io.BytesIO(mf))), 2 * n
+
+
+def _etapa_leitura_pedidos(n):
+    arquivos = _gerar_pedidos(n)
+    return (lambda: ler_pedidos(arquivos, workers=1)), n
+
+
+def _etapa_alocacao(n, reservar=False):
+    df_pedidos, indice_estoque = _preparar_alocacao(n)
+    return (lambda: alocar_pedidos(df_pedidos, indice_estoque, reservar=reservar)), n
+
+
+def _etapa_alocacao_reserva(n):
+    return _etapa_alocacao(n, reservar=True)
+
+
+def _etapa_zip(n):
+    df_pedidos, indice_estoque = _preparar_alocacao(n)
+    df_resultado = alocar_pedidos(df_pedidos, indice_estoque)
+    return (lambda: escrever_zip_resultados(df_resultado, io.BytesIO())), n
+
+
+def _etapa_resultado_em_lotes(n):
+    df_pedidos, indice_estoque = _preparar_alocacao(n)
+    df_resultado = alocar_pedidos(df_pedidos, indice_estoque)
+
+    def executar():
+        resultado = ResultadoEmLotes(COLUNAS_RESULTADO, LIMITE_MEMORIA_LOTES_MB)
+        resultado.adicionar(df_resultado)
+        resumir_faturamento(resultado, list(indice_estoque.columns))
+        resumir_separacao(resultado, indice_estoque)
+        escrever_zip_resultados(resultado, io.BytesIO())
+
+    return executar, n
+
+
+ETAPAS = {
+    "whatsapp_extracao": (_etapa_whatsapp, None),
+    "gerar_pdf": (_etapa_pdf, 10_000),
+    "gerar_pdf_lote": (_etapa_pdf_lote, 100_000),
+    "estoque_agrupamento": (_etapa_estoque, None),
+    "leitura_pedidos": (_etapa_leitura_pedidos, None),
+    "alocacao": (_etapa_alocacao, None),
+    "alocacao_reserva": (_etapa_alocacao_reserva, None),
+    "exportacao_zip": (_etapa_zip, None),
+    "resultado_em_lotes": (_etapa_resultado_em_lotes, None),
+}
+
+
+def _gerar_pedidos(n):
+    n_skus = max(1_000, n // 10)
+    return [
+        (f"pedido_{i:05d}.csv", gerar_pedido(min(LINHAS_POR_PEDIDO, n - inicio), n_skus, variante=i, semente=i))
+        for i, inicio in enumerate(range(0, n, LINHAS_POR_PEDIDO))
+    ]
+
+
+def _preparar_alocacao(n):
+    n_skus = max(1_000, n // 10)
+    df_estoque_agrupado = agrupar_estoque(
+        io.BytesIO(gerar_estoque(n_skus, "QM", semente=1)),
+        io.BytesIO(gerar_estoque(n_skus, "MF", semente=2))
+    )
+    lidos = ler_pedidos(_gerar_pedidos(n), workers=1)
+    df_pedidos = concatenar(df for df, _ in lidos)
+    return df_pedidos, indexar_estoque(df_estoque_agrupado)
+
+
+# =====================================================
+# MEDIÇÃO
+# =====================================================
+def medir(funcao, linhas, repeticoes=1, memoria=True):
+    """Executa `funcao` e devolve tempo (melhor de `repeticoes`), vazão e pico de memória."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    segundos = min(tempos)
+
+    pico_mb = None
+    if memoria:
+        tracemalloc.start()
+        try:
+            funcao()
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        pico_mb = round(pico / 1024 / 1024, 2)
+
+    return {
+        "linhas": linhas,
+        "segundos": round(segundos, 6),
+        "linhas_por_segundo": round(linhas / segundos, 1) if segundos else None,
+        "pico_memoria_mb": pico_mb,
+    }
+
+
+def executar_benchmark(etapas, escalas, repeticoes=1, memoria=True, ao_medir=None):
+    resultados = []
+    for nome in etapas:
+        preparar, limite = ETAPAS[nome]
+        for escala in escalas:
+            if limite and escala > limite:
+                continue
+            funcao, linhas = preparar(escala)
+            resultado = {"etapa": nome, "escala": escala, **medir(funcao, linhas, repeticoes, memoria)}
+            resultados.append(resultado)
+            if ao_medir:
+                ao_medir(resultado)
+    return resultados
+
+
+def comparar(resultados, base):
+    """Tabela com a razão de tempo atual/base para cada etapa e escala em comum."""
+    df_atual = pd.DataFrame(resultados).set_index(["etapa", "escala"])
+    df_base = pd.DataFrame(base["resultados"]).set_index(["etapa", "escala"])
+    df = df_atual[["segundos"]].join(df_base[["segundos"]], rsuffix="_base", how="inner")
+    df["razao"] = (df["segundos"] / df["segundos_base"]).round(3)
+    return df.reset_index()
+
+
+def _versao():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# =====================================================
+# LINHA DE COMANDO
+# =====================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark das etapas de pedido e estoque.")
+    parser.add_argument("--escalas", type=int, nargs="+", default=ESCALAS_PADRAO)
+    parser.add_argument("--etapas", nargs="+", choices=list(ETAPAS), default=list(ETAPAS))
+    parser.add_argument("--repeticoes", type=int, default=1)
+    parser.add_argument("--sem-memoria", action="store_true", help="Não medir o pico de memória")
+    parser.add_argument("--saida", help="Arquivo JSON para gravar os resultados")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparação")
+    args = parser.parse_args(argv)
+
+    def mostrar(r):
+        print(
+            f"{r['etapa']:<22} {r['escala']:>9}  {r['segundos']:>10.4f}s  "
+            f"{r['linhas_por_segundo'] or 0:>12.0f} linhas/s  {r['pico_memoria_mb'] or '-':>8} MB",
+            flush=True
+        )
+
+    resultados = executar_benchmark(
+        args.etapas, args.escalas, args.repeticoes, memoria=not args.sem_memoria, ao_medir=mostrar
+    )
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump({
+                "data": datetime.now().isoformat(timespec="seconds"),
+                "versao": _versao(),
+                "python": platform.python_version(),
+                "pandas": pd.__version__,
+                "resultados": resultados,
+            }, f, indent=2, ensure_ascii=False)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+        print()
+        print(comparar(resultados, base).to_string(index=False))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
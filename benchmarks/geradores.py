@@ -0,0 +1,105 @@
+import numpy as np
+
+# Variações de cabeçalho encontradas nos pedidos exportados pelos clientes
+CABECALHOS_PEDIDO = [
+    ["Cnpj", "Codigo", "Produto", "Quantidade", "Valor_Unitario", "Total"],
+    ["CPF_CNPJ", "COD_PROD", "Descrição", "QTDE", "PRECO", "VL_TOTAL"],
+    ["CNPJ_CLIENTE", "Código", "Qtd", "Valor Unitário"],
+]
+
+
+# =====================================================
+# NÚMEROS NO FORMATO BRASILEIRO
+# =====================================================
+def numero_br(valor):
+    return f"{valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+# =====================================================
+# ESTOQUE
+# =====================================================
+def gerar_estoque(n_skus, grupo="QM", largura_codigo=7, semente=0):
+    """
+    CSV de estoque (';', latin1) com `n_skus` produtos de código com zeros à
+    esquerda, no mesmo layout do ERP.
+    """
+    rng = np.random.default_rng(semente)
+    qtdes = rng.integers(0, 50, n_skus)
+    linhas = ["Produto;Descrição;Qtde;LK-GRUPO"]
+    linhas.extend(
+        f"{i:0{largura_codigo}d};PRODUTO {i};{q};{grupo}"
+        for i, q in enumerate(qtdes, start=1)
+    )
+    return ("\n".join(linhas) + "\n").encode("latin1")
+
+
+# =====================================================
+# PEDIDOS
+# =====================================================
+def gerar_pedido(n_linhas, n_skus, variante=0, largura_codigo=7, semente=0):
+    """
+    CSV de pedido (';', latin1, decimais BR) com `n_linhas` itens sorteados
+    entre `n_skus` produtos. `variante` escolhe um dos CABECALHOS_PEDIDO.
+    """
+    rng = np.random.default_rng(semente)
+    cabecalho = CABECALHOS_PEDIDO[variante % len(CABECALHOS_PEDIDO)]
+    codigos = rng.integers(1, n_skus + 1, n_linhas)
+    qtdes = rng.integers(1, 30, n_linhas)
+    precos = rng.integers(100, 500_000, n_linhas) / 100
+    cnpj = f"{rng.integers(0, 10**14):014d}"
+
+    linhas = [";".join(cabecalho)]
+    for cod, qtd, preco in zip(codigos, qtdes, precos):
+        campos = {
+            "cnpj": cnpj,
+            "codigo": f"{cod:0{largura_codigo}d}",
+            "descricao": f"PRODUTO {cod}",
+            "qtd": str(qtd),
+            "preco": numero_br(preco),
+            "total": numero_br(preco * qtd),
+        }
+        if len(cabecalho) == 6:
+            valores = [campos[c] for c in ("cnpj", "codigo", "descricao", "qtd", "preco", "total")]
+        else:
+            valores = [campos[c] for c in ("cnpj", "codigo", "qtd", "preco")]
+        linhas.append(";".join(valores))
+    return ("\n".join(linhas) + "\n").encode("latin1")
+
+
+# =====================================================
+# MENSAGEM DE PEDIDO DO WHATSAPP
+# =====================================================
+def gerar_mensagem_whatsapp(n_itens, semente=0):
+    """Texto de pedido no formato recebido pelo WhatsApp, com `n_itens` itens."""
+    rng = np.random.default_rng(semente)
+    linhas = [
+        "🛒 *NOVO PEDIDO*",
+        "",
+        "👤 *DADOS DO CLIENTE*",
+        "Razão Social: LOJA EXEMPLO COMERCIO DE MOVEIS LTDA",
+        "CNPJ: 12.345.678/0001-99",
+        "IE: 9012345678",
+        "Telefone: (41) 99876-5432",
+        "E-mail: compras@lojaexemplo.com.br",
+        "📍 Endereço:",
+        "Rua das Araucárias, 1234 - Centro",
+        "Curitiba - PR - 80000-000",
+        "",
+        "📦 *ITENS DO PEDIDO*",
+        "",
+    ]
+    total = 0.0
+    for i in range(n_itens):
+        cod = int(rng.integers(1, 100_000))
+        qtd = int(rng.integers(1, 20))
+        preco = int(rng.integers(100, 500_000)) / 100
+        subtotal = round(qtd * preco, 2)
+        total += subtotal
+        linhas.extend([
+            f"*PRODUTO {cod} - ITEM {i + 1}*",
+            f"Cód: {cod:07d}",
+            f"{qtd} x R$ {numero_br(preco)} = *R$ {numero_br(subtotal)}*",
+            "",
+        ])
+    linhas.append(f"💰 *TOTAL DO PEDIDO: R$ {numero_br(total)}*")
+    return "\n".join(linhas)
@@ -1,623 +1,849 @@
-import streamlit as st
-import pandas as pd
-import zipfile
-import io
-import unicodedata
-import re
-from io import StringIO
-from datetime import datetime
-
-# =====================================================
-# CONFIGURAÇÃO DA PÁGINA (GLOBAL)
-# =====================================================
-st.set_page_config(
-    page_title="Ferramentas de Pedido e Estoque",
-    layout="wide",
-    page_icon="📦"
-)
-
-st.title("📦 Ferramentas de Pedido e Estoque")
-
-# =====================================================
-# CRIAR ABAS
-# =====================================================
-tab1, tab2 = st.tabs(["📦 CONVERTER PEDIDO WHATSAPP", "📊 COMPARAR ESTOQUES"])
-
-import streamlit as st
-import pandas as pd
-import re
-from io import StringIO, BytesIO
-from fpdf import FPDF
-
-# =====================================================
-# ABA 1: CONVERTER PEDIDO WHATSAPP
-# =====================================================
-with tab1:
-    st.markdown("### 📦 CONVERTER PEDIDO WHATSAPP")
-    st.markdown("Cole abaixo o texto do pedido exatamente como recebido:")
-
-    if "texto_pedido" not in st.session_state:
-        st.session_state.texto_pedido = ""
-
-    # ---------------- BOTÕES ----------------
-    col1, col2, col3 = st.columns(3)
-
-    with col1:
-        converter = st.button("🔄 Converter para CSV", key="btn_csv")
-
-    with col2:
-        limpar = st.button("🧹 Limpar texto", key="btn_limpar")
-        if limpar:
-            st.session_state["texto_pedido"] = ""
-
-
-    with col3:
-        gerar_pdf_btn = st.button("📄 Gerar PDF", key="btn_pdf")
-
-
-    # ---------------- TEXT AREA ----------------
-    texto = st.text_area(
-        "📋 Texto do Pedido",
-        value=st.session_state["texto_pedido"],
-        key="texto_pedido",
-        height=420
-    )
-
-
-    # ---------------- FUNÇÕES AUXILIARES ----------------
-    def so_numeros(v):
-        return re.sub(r"\D", "", v or "")
-
-    def parse_valor(v):
-        if not v:
-            return 0.0
-        v = v.strip()
-        if "," in v and "." in v:
-            if v.rfind(",") > v.rfind("."):
-                v = v.replace(".", "").replace(",", ".")
-            else:
-                v = v.replace(",", "")
-        elif "," in v:
-            v = v.replace(".", "").replace(",", ".")
-        else:
-            v = v.replace(",", "")
-        return float(v)
-
-    def formatar_br(v):
-        return f"{v:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-
-    def formatar_codigo(c):
-        return c.zfill(7)
-
-    def formatar_cnpj(cnpj):
-        return f'="{so_numeros(cnpj)}"'
-
-    # ---------------- EXTRAÇÃO DE ITENS ----------------
-    def extrair_itens(texto):
-        itens = []
-
-        bloco = re.search(
-            r"📦\s*\*ITENS DO PEDIDO\*(.*?)💰\s*\*TOTAL DO PEDIDO",
-            texto,
-            re.DOTALL
-        )
-
-        if not bloco:
-            return pd.DataFrame()
-
-        padrao = re.findall(
-            r"\*\s*(.*?)\s*\*\s*\n"
-            r"Cód:\s*(\d+)\s*\n"
-            r"(\d+)\s*x\s*R\$\s*([\d,.]+)\s*=\s*\*R\$\s*([\d,.]+)\*",
-            bloco.group(1)
-        )
-
-        for prod, cod, qtd, unit, total in padrao:
-            itens.append({
-                "Codigo": cod,
-                "Produto": prod,
-                "Quantidade": int(qtd),
-                "Valor_Unitario": parse_valor(unit),
-                "Total": parse_valor(total)
-            })
-
-        return pd.DataFrame(itens)
-
-    # ---------------- EXTRAÇÃO CLIENTE ----------------
-    def extrair_dados_cliente(texto):
-        campos = {
-            "Razao_Social": r"Razão Social:\s*(.*)",
-            "CNPJ": r"CNPJ:\s*([\d./-]+)",
-            "IE": r"IE:\s*(.*)",
-            "Telefone": r"Telefone:\s*([\d()+\s-]+)",
-            "Email": r"E-mail:\s*(.*)"
-        }
-
-        dados = {}
-        for campo, regex in campos.items():
-            m = re.search(regex, texto)
-            dados[campo] = m.group(1).strip() if m else ""
-
-        return dados
-
-    # ---------------- ENDEREÇO (2 LINHAS) ----------------
-    def extrair_endereco(texto):
-        padrao = r"📍 Endereço:\s*\n(.+)\n(.+)"
-        m = re.search(padrao, texto)
-        if m:
-            return m.group(1).strip(), m.group(2).strip()
-        return "", ""
-
-    # ---------------- TOTAL ----------------
-    def extrair_total(texto):
-        m = re.search(r"TOTAL DO PEDIDO:\s*R\$\s*([\d,.]+)", texto)
-        return parse_valor(m.group(1)) if m else 0.0
-
-    # ---------------- MONTAGEM PDF ----------------
-    def montar_dados_para_pdf(dados_cliente, df_itens, texto):
-        end1, end2 = extrair_endereco(texto)
-
-        dados_cliente_pdf = {
-            "razao": dados_cliente.get("Razao_Social", ""),
-            "endereco_linha1": end1,
-            "endereco_linha2": end2
-        }
-
-        carrinho = []
-        for _, r in df_itens.iterrows():
-            carrinho.append({
-                "codigo": r["Codigo"],
-                "descricao": r["Produto"],
-                "qtd": r["Quantidade"],
-                "preco": r["Valor_Unitario"],
-                "total": r["Total"]
-            })
-
-        return dados_cliente_pdf, carrinho
-
-    # =====================================================
-    # PDF OFICIAL ZIONNE
-    # =====================================================
-    class PedidoPDF(FPDF):
-
-        def header(self):
-            self.set_font("Arial", "B", 14)
-            self.cell(0, 8, "PEDIDO DE VENDA - FEIRA ABUP SHOW HOME", 0, 1, "C")
-            self.set_font("Arial", "", 9)
-            self.cell(
-                0, 5,
-                f"Emissão: {datetime.now().strftime('%d/%m/%Y %H:%M')}",
-                0, 1, "R"
-            )
-            self.ln(3)
-
-        def footer(self):
-            self.set_y(-22)
-            self.set_font("Arial", "", 8)
-            self.cell(0, 4, "Instagram: @zionne.oficial", 0, 1, "C")
-            self.cell(0, 4, "Telefone / WhatsApp: (41) 3043-0595", 0, 1, "C")
-            self.cell(0, 4, "Site: zionne.com.br | E-mail: comercial@zionne.com", 0, 1, "C")
-            self.cell(0, 4, "R. Gen. Mário Tourinho, 2465 - Curitiba - PR", 0, 0, "C")
-
-    def gerar_pdf(
-        dados_cliente,
-        carrinho,
-        total,
-        cond_pag,
-        frete,
-        obs,
-        cnpj,
-        telefone,
-        email,
-        ie
-    ):
-        pdf = PedidoPDF()
-        pdf.add_page()
-        pdf.set_auto_page_break(auto=True, margin=25)
-
-        pdf.set_font("Arial", "B", 10)
-        pdf.cell(0, 6, "DADOS DO CLIENTE", 0, 1)
-        pdf.set_font("Arial", "", 9)
-
-        pdf.cell(0, 5, f"Cliente: {dados_cliente.get('razao','')}", 0, 1)
-        pdf.cell(0, 5, f"CNPJ: {cnpj}    IE: {ie}", 0, 1)
-        pdf.cell(0, 5, f"Telefone: {telefone}    E-mail: {email}", 0, 1)
-
-        pdf.multi_cell(
-            0, 5,
-            f"Endereço:\n{dados_cliente.get('endereco_linha1','')}\n{dados_cliente.get('endereco_linha2','')}"
-        )
-
-        pdf.ln(3)
-
-        pdf.set_font("Arial", "B", 9)
-        pdf.cell(10, 6, "Item", 1)
-        pdf.cell(25, 6, "Código", 1)
-        pdf.cell(90, 6, "Descrição", 1)
-        pdf.cell(15, 6, "Qtde", 1)
-        pdf.cell(25, 6, "Vlr Unit", 1)
-        pdf.cell(25, 6, "Vlr Total", 1, 1)
-
-        pdf.set_font("Arial", "", 9)
-
-        for i, item in enumerate(carrinho, start=1):
-            pdf.cell(10, 6, str(i), 1)
-            pdf.cell(25, 6, item["codigo"], 1)
-            pdf.cell(90, 6, item["descricao"], 1)
-            pdf.cell(15, 6, str(item["qtd"]), 1, 0, "C")
-            pdf.cell(25, 6, f"{item['preco']:.2f}", 1, 0, "R")
-            pdf.cell(25, 6, f"{item['total']:.2f}", 1, 1, "R")
-
-        pdf.ln(4)
-        pdf.set_font("Arial", "B", 10)
-        pdf.cell(130, 6, "")
-        pdf.cell(30, 6, "TOTAL:", 1)
-        pdf.cell(30, 6, f"{total:.2f}", 1, 1, "R")
-
-        pdf.ln(4)
-        pdf.set_font("Arial", "", 9)
-        pdf.multi_cell(0, 5, f"Pagamento: {cond_pag}")
-        pdf.multi_cell(0, 5, f"Frete: {frete}")
-        pdf.multi_cell(0, 5, f"Observações: {obs}")
-
-        return pdf.output(dest="S").encode("latin1")
-
-    # ---------------- AÇÃO PRINCIPAL ----------------
-    if converter or gerar_pdf_btn:
-        if not texto.strip():
-            st.warning("Cole o texto do pedido antes de continuar.")
-        else:
-            df_itens = extrair_itens(texto)
-            dados_cliente = extrair_dados_cliente(texto)
-            total_pedido = extrair_total(texto)
-
-            cnpj = so_numeros(dados_cliente.get("CNPJ"))
-            telefone = so_numeros(dados_cliente.get("Telefone"))
-            nome_arquivo = f"{cnpj}_{telefone}"
-
-            st.subheader("📦 Itens do Pedido")
-            st.dataframe(df_itens, use_container_width=True)
-
-            st.metric("💰 Total", f"R$ {formatar_br(total_pedido)}")
-
-            if converter:
-                df_csv = df_itens.copy()
-                df_csv["Cnpj"] = formatar_cnpj(dados_cliente.get("CNPJ"))
-                df_csv["Codigo"] = df_csv["Codigo"].apply(formatar_codigo)
-                df_csv["Valor_Unitario"] = df_csv["Valor_Unitario"].apply(formatar_br)
-                df_csv["Total"] = df_csv["Total"].apply(formatar_br)
-
-                csv = StringIO()
-                df_csv.to_csv(csv, index=False, sep=";")
-
-                st.download_button(
-                    "⬇️ Baixar CSV",
-                    csv.getvalue(),
-                    file_name=f"{nome_arquivo}.csv",
-                    mime="text/csv"
-                )
-
-            if gerar_pdf_btn:
-                dados_pdf, carrinho = montar_dados_para_pdf(
-                    dados_cliente, df_itens, texto
-                )
-
-                pdf_bytes = gerar_pdf(
-                    dados_cliente=dados_pdf,
-                    carrinho=carrinho,
-                    total=total_pedido,
-                    cond_pag="Conforme combinado",
-                    frete="A combinar",
-                    obs="Pedido gerado via WhatsApp",
-                    cnpj=dados_cliente.get("CNPJ"),
-                    telefone=dados_cliente.get("Telefone"),
-                    email=dados_cliente.get("Email"),
-                    ie=dados_cliente.get("IE")
-                )
-
-                st.download_button(
-                    "⬇️ Baixar PDF",
-                    pdf_bytes,
-                    file_name=f"{nome_arquivo}.pdf",
-                    mime="application/pdf"
-                )
-
-
-# =====================================================
-# ABA 2: COMPARAR ESTOQUES
-# =====================================================
-with tab2:
-    st.markdown("### 📊 COMPARAR ESTOQUES")
-    
-    # =====================================================
-    # LIMPAR CACHE / RESET
-    # =====================================================
-    if st.button("🧹 Limpar cache e recarregar"):
-        st.cache_data.clear()
-        st.session_state.clear()
-        st.rerun()
-
-    st.title("📦 Alocação de Pedido de Venda (QM x MF)")
-    st.markdown("Ferramenta para alocar pedidos de venda com base nos estoques de QM e MF, gerando relatórios de faturamento e downloads organizados.")
-
-    # =====================================================
-    # UPLOAD DOS ESTOQUES
-    # =====================================================
-    st.subheader("📂 Upload dos Estoques")
-    estoque_qm = st.file_uploader("Estoque QM (CSV)", type="csv", help="Arquivo CSV com separador ';', encoding latin1.")
-    estoque_mf = st.file_uploader("Estoque MF (CSV)", type="csv", help="Arquivo CSV com separador ';', encoding latin1.")
-
-    # =====================================================
-    # UPLOAD DOS PEDIDOS
-    # =====================================================
-    st.subheader("🛒 Upload dos Pedidos de Venda")
-    pedidos_files = st.file_uploader(
-        "Pedidos (um ou vários CSVs)",
-        type="csv",
-        accept_multiple_files=True,
-        help="Arquivos CSV com separador ';', encoding latin1, decimal ','."
-    )
-
-    # =====================================================
-    # FUNÇÃO AUXILIAR PARA LOCALIZAR COLUNAS
-    # =====================================================
-    def localizar_coluna(df, possiveis_nomes):
-        """
-        Localiza uma coluna no DataFrame baseada em possíveis nomes (ignorando acentos e maiúsculas).
-        """
-        for col in df.columns:
-            col_norm = unicodedata.normalize('NFD', col).encode('ascii', 'ignore').decode('ascii').upper()
-            if any(nome in col_norm for nome in possiveis_nomes):
-                return col
-        return None
-
-    # =====================================================
-    # FUNÇÃO PARA CONVERTER VALORES PARA FLOAT (FORMATO BRASILEIRO)
-    # =====================================================
-    def to_float_br(valor):
-        if pd.isna(valor):
-            return 0.0
-
-        # Se já for número, retorna direto
-        if isinstance(valor, (int, float)):
-            return float(valor)
-
-        # Se for string, converte formato BR
-        valor = str(valor).strip()
-        valor = valor.replace(".", "").replace(",", ".")
-        return float(valor)
-
-
-    # =====================================================
-    # PROCESSAMENTO PRINCIPAL
-    # =====================================================
-    if estoque_qm and estoque_mf and pedidos_files:
-        try:
-            # -------------------------------------------------
-            # LER E VALIDAR ESTOQUES
-            # -------------------------------------------------
-            with st.spinner("Carregando estoques..."):
-                df_qm = pd.read_csv(estoque_qm, sep=";", encoding="latin1")
-                df_mf = pd.read_csv(estoque_mf, sep=";", encoding="latin1")
-            
-            df_estoque = pd.concat([df_qm, df_mf], ignore_index=True)
-            df_estoque.columns = df_estoque.columns.str.strip()
-            
-            # Detectar colunas obrigatórias do estoque
-            col_produto = localizar_coluna(df_estoque, {"PRODUTO", "CODIGO", "COD_PROD", "CODPROD"})
-            col_qtde = localizar_coluna(df_estoque, {"QTDE", "QUANTIDADE", "SALDO", "QTD"})
-            col_grupo = localizar_coluna(df_estoque, {"LK-GRUPO", "GRUPO", "EMPRESA", "LKGRUPO"})
-            
-            if not all([col_produto, col_qtde, col_grupo]):
-                st.error("❌ Os arquivos de estoque não contêm todas as colunas necessárias (Produto, Qtde, LK-GRUPO).")
-                st.write("Colunas encontradas no estoque QM:", df_qm.columns.tolist())
-                st.write("Colunas encontradas no estoque MF:", df_mf.columns.tolist())
-                st.stop()
-            
-            # Normalizar dados do estoque (usar strings para evitar NaN em códigos mistos)
-            df_estoque["Produto"] = (
-                df_estoque[col_produto]
-                .astype(str)
-                .str.strip()
-                .str.upper()
-                .str.lstrip('0')  # Remove zeros à esquerda se numérico
-            )
-            df_estoque["Qtde"] = pd.to_numeric(df_estoque[col_qtde], errors="coerce").fillna(0)
-            df_estoque["LK-GRUPO"] = df_estoque[col_grupo].astype(str).str.strip().str.upper()
-            
-            # Filtrar estoques válidos
-            df_estoque = df_estoque.dropna(subset=["Produto"])
-            
-            # Agrupar estoque por Produto e LK-GRUPO
-            df_estoque_agrupado = (
-                df_estoque
-                .groupby(["Produto", "LK-GRUPO"], as_index=False)["Qtde"]
-                .sum()
-            )
-            
-            with st.expander("🔍 Ver estoque agrupado (primeiras 100 linhas)"):
-                st.dataframe(df_estoque_agrupado.head(100), use_container_width=True)
-            
-            # -------------------------------------------------
-            # PROCESSAR PEDIDOS
-            # -------------------------------------------------
-            resultados = []
-            progresso = st.progress(0)
-            total_arquivos = len(pedidos_files)
-            
-            for i, file in enumerate(pedidos_files):
-                with st.spinner(f"Processando pedido {i+1}/{total_arquivos}: {file.name}"):
-                    df_pedido = pd.read_csv(file, sep=";", encoding="latin1", decimal=",")
-                    df_pedido.columns = df_pedido.columns.str.strip()
-                    
-                    # Detectar colunas do pedido
-                    col_codigo = localizar_coluna(df_pedido, {"CODIGO", "PRODUTO", "COD_PROD", "CODPROD"})
-                    col_quant = localizar_coluna(df_pedido, {"QUANTIDADE", "QTDE", "QTD"})
-                    col_cnpj = localizar_coluna(df_pedido, {"CNPJ", "CNPJ_CLIENTE", "CPF_CNPJ", "CLIENTE"})
-                    col_valor_unit = localizar_coluna(df_pedido, {"VALOR_UNITARIO", "VALOR", "PRECO", "VL_UNIT"})
-                    col_total = localizar_coluna(df_pedido, {"TOTAL", "VALOR_TOTAL", "VL_TOTAL"})
-                    
-                    if not col_codigo or not col_quant:
-                        st.warning(f"⚠️ Pedido {file.name} ignorado: colunas obrigatórias não encontradas.")
-                        continue
-                    
-                    # Normalizar dados do pedido
-                    df_pedido["Codigo"] = (
-                        df_pedido[col_codigo]
-                        .astype(str)
-                        .str.strip()
-                        .str.upper()
-                        .str.lstrip('0')  # Remove zeros à esquerda
-                    )
-                    df_pedido["Quantidade"] = pd.to_numeric(df_pedido[col_quant], errors="coerce").fillna(0)
-                    
-                    # Calcular valor do item (usando to_float_br para garantir formato brasileiro)
-                    if col_total:
-                        df_pedido["Total_Item"] = df_pedido[col_total].apply(to_float_br)
-                        df_pedido["Valor_Unitario"] = (
-                            df_pedido["Total_Item"] /
-                            df_pedido["Quantidade"].replace(0, 1)
-                        )
-
-                    elif col_valor_unit:
-                        df_pedido["Valor_Unitario"] = df_pedido[col_valor_unit].apply(to_float_br)
-                        df_pedido["Total_Item"] = (
-                            df_pedido["Quantidade"] *
-                            df_pedido["Valor_Unitario"]
-                        )
-
-                    else:
-                        df_pedido["Valor_Unitario"] = 0
-                        df_pedido["Total_Item"] = 0
-                    
-                    # Normalizar CNPJ
-                    if col_cnpj:
-                        df_pedido["CNPJ"] = df_pedido[col_cnpj].astype(str).str.replace(r"\D", "", regex=True)
-                    else:
-                        df_pedido["CNPJ"] = file.name
-                    
-                    # Filtrar pedidos válidos
-                    df_pedido = df_pedido.dropna(subset=["Codigo"])
-                    
-                    # -------------------------------------------------
-                    # COMPARAÇÃO COM ESTOQUE
-                    # -------------------------------------------------
-                    for _, row in df_pedido.iterrows():
-                        if row["Quantidade"] <= 0:
-                            continue
-                        
-                        codigo = row["Codigo"]
-                        qtd_pedida = row["Quantidade"]
-                        
-                        empresa = "SEM ESTOQUE"
-                        qtde_disp = 0
-                        
-                        estoque_prod = df_estoque_agrupado[df_estoque_agrupado["Produto"] == codigo]
-                        
-                        if not estoque_prod.empty:
-                            qm = estoque_prod[estoque_prod["LK-GRUPO"] == "QM"]
-                            mf = estoque_prod[estoque_prod["LK-GRUPO"] == "MF"]
-                            
-                            if not qm.empty and qm.iloc[0]["Qtde"] >= qtd_pedida:
-                                empresa = "QM"
-                                qtde_disp = qm.iloc[0]["Qtde"]
-                            elif not mf.empty and mf.iloc[0]["Qtde"] >= qtd_pedida:
-                                empresa = "MF"
-                                qtde_disp = mf.iloc[0]["Qtde"]
-                        
-                        resultados.append({
-                            "CNPJ": row["CNPJ"],
-                            "Codigo": codigo,
-                            "Quantidade_Pedido": qtd_pedida,
-                            "Valor_Unitario": row["Valor_Unitario"],
-                            "Empresa_Atendimento": empresa,
-                            "Qtde_Disponivel": qtde_disp,
-                            "Valor_Item": row["Total_Item"],
-                            "Arquivo_Pedido": file.name,
-                        })
-                
-                progresso.progress((i + 1) / total_arquivos)
-            
-            progresso.empty()
-            
-            # =====================================================
-            # RESULTADO FINAL
-            # =====================================================
-            df_resultado = pd.DataFrame(resultados)
-            
-            st.subheader("📊 Resultado da Alocação")
-            st.dataframe(df_resultado, use_container_width=True)
-            
-            # =====================================================
-            # FATURAMENTO POR EMPRESA (QM E MF)
-            # =====================================================
-            df_faturamento = (
-                df_resultado
-                .query("Empresa_Atendimento != 'SEM ESTOQUE'")
-                .groupby("Empresa_Atendimento", as_index=False)["Valor_Item"]
-                .sum()
-            )
-            
-            # Garantir que QM e MF sempre apareçam (mesmo com 0)
-            qm_valor = df_faturamento[df_faturamento["Empresa_Atendimento"] == "QM"]["Valor_Item"].sum() if not df_faturamento[df_faturamento["Empresa_Atendimento"] == "QM"].empty else 0.0
-            mf_valor = df_faturamento[df_faturamento["Empresa_Atendimento"] == "MF"]["Valor_Item"].sum() if not df_faturamento[df_faturamento["Empresa_Atendimento"] == "MF"].empty else 0.0
-            
-            st.subheader("💰 Faturamento Previsto por Empresa (QM e MF)")
-            col1, col2 = st.columns(2)
-            
-            valor_qm = f"R$ {qm_valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-            valor_mf = f"R$ {mf_valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-            
-            col1.metric("QM", valor_qm)
-            col2.metric("MF", valor_mf)
-            
-            # =====================================================
-            # FATURAMENTO POR EMPRESA (INCLUINDO SEM ESTOQUE)
-            # =====================================================
-            df_faturamento_total = (
-                df_resultado
-                .groupby("Empresa_Atendimento", as_index=False)["Valor_Item"]
-                .sum()
-            )
-            
-            # Garantir que QM, MF e SEM ESTOQUE sempre apareçam (mesmo com 0)
-            qm_valor_total = df_faturamento_total[df_faturamento_total["Empresa_Atendimento"] == "QM"]["Valor_Item"].sum() if not df_faturamento_total[df_faturamento_total["Empresa_Atendimento"] == "QM"].empty else 0.0
-            mf_valor_total = df_faturamento_total[df_faturamento_total["Empresa_Atendimento"] == "MF"]["Valor_Item"].sum() if not df_faturamento_total[df_faturamento_total["Empresa_Atendimento"] == "MF"].empty else 0.0
-            sem_estoque_valor = df_faturamento_total[df_faturamento_total["Empresa_Atendimento"] == "SEM ESTOQUE"]["Valor_Item"].sum() if not df_faturamento_total[df_faturamento_total["Empresa_Atendimento"] == "SEM ESTOQUE"].empty else 0.0
-            
-            st.subheader("💰 Faturamento Previsto por Empresa (Incluindo Sem Estoque)")
-            col1, col2, col3 = st.columns(3)
-            
-            valor_qm_total = f"R$ {qm_valor_total:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-            valor_mf_total = f"R$ {mf_valor_total:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-            valor_sem_estoque = f"R$ {sem_estoque_valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-            
-            col1.metric("QM", valor_qm_total)
-            col2.metric("MF", valor_mf_total)
-            col3.metric("SEM ESTOQUE", valor_sem_estoque)
-            
-            # =====================================================
-            # GERAR ZIP COM CSVs SEPARADOS
-            # =====================================================
-            zip_buffer = io.BytesIO()
-            with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zipf:
-                for (arquivo, empresa), df_grupo in df_resultado.groupby(["Arquivo_Pedido", "Empresa_Atendimento"]):
-                    nome_csv = f"{arquivo.replace('.csv', '')}_{empresa}.csv"
-                    zipf.writestr(nome_csv, df_grupo.to_csv(index=False, sep=";", decimal=",").encode("utf-8"))
-            
-            zip_buffer.seek(0)
-            
-            st.download_button(
-                "⬇️ Baixar Resultados (ZIP)",
-                zip_buffer,
-                "alocacao_pedidos.zip",
-                "application/zip"
-            )
-        
-        except Exception as e:
-            st.error(f"❌ Erro durante o processamento: {str(e)}")
-            st.info("Verifique os arquivos enviados (formato, encoding, separadores) e tente novamente.")
-
-    else:
-        st.info("⬆️ Envie os arquivos de estoque (QM e MF) e os pedidos para iniciar o processamento.")
-
+import streamlit as st
+import pandas as pd
+import io
+import os
+import re
+import hashlib
+import threading
+import time
+from functools import partial
+
+# =====================================================
+# CONFIGURAÇÃO DA PÁGINA (GLOBAL)
+# =====================================================
+st.set_page_config(
+    page_title="Ferramentas de Pedido e Estoque",
+    layout="wide",
+    page_icon="📦"
+)
+
+st.title("📦 Ferramentas de Pedido e Estoque")
+
+# =====================================================
+# CRIAR ABAS
+# =====================================================
+tab1, tab2 = st.tabs(["📦 CONVERTER PEDIDO WHATSAPP", "📊 COMPARAR ESTOQUES"])
+
+from streamlit import runtime
+from streamlit.errors import StreamlitAPIException
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from alocacao import SEM_ESTOQUE, consultar_estoque, indexar_estoque, ler_excecoes, resumir_faturamento
+from alocacao_incremental import CacheResultados, alocar_incremental
+from diagnostico import Diagnostico, ativar, etapa
+from esquema import normalizar_codigos, resolver_colunas, tabela_mapeamento
+from estoque import REGRAS_ESTOQUE, ColunasEstoqueError, agrupar_atualizacao, agrupar_estoque
+from estoque_local import aplicar_atualizacao, carregar_estoque_local, info_snapshot, substituir_estoque
+from exportacao import FORMATOS_EXPORTACAO, csv_grupo, escrever_zip_temporario, formatos_disponiveis
+from separacao import resumir_separacao
+from pdf_pedido import documentos_alocacao, gerar_pdf_pedido, gerar_pdfs_em_lote
+from whatsapp import (
+    formatar_br,
+    ler_pedido_whatsapp,
+    montar_csv_pedido,
+    nome_arquivo_pedido,
+    total_confere,
+)
+from whatsapp_lote import converter_conversa, linhas_conversa
+from visualizacao import (
+    LINHAS_POR_PAGINA,
+    OPCOES_LINHAS_POR_PAGINA,
+    contar_filtradas,
+    opcoes_filtro_resultado,
+    pagina_filtrada,
+    total_paginas,
+)
+from leitura import ler_cabecalho
+from pedidos import REGRAS_PEDIDO, WORKERS_PADRAO
+from tarefas import CANCELADA, CONCLUIDA, GerenciadorTarefas
+
+# Cache do estoque agrupado: máximo de pares QM/MF mantidos e validade (segundos)
+CACHE_ESTOQUE_MAX_ENTRADAS = 8
+CACHE_ESTOQUE_TTL = 6 * 60 * 60
+
+# Intervalo (segundos) entre as consultas ao andamento de uma tarefa em segundo plano
+INTERVALO_ACOMPANHAMENTO = 0.5
+
+# =====================================================
+# DIAGNÓSTICO DE DESEMPENHO (OPCIONAL)
+# =====================================================
+# Desligado, as etapas instrumentadas não registram nada. Cada aba mede e
+# mostra as próprias etapas (ver executar_com_diagnostico)
+st.sidebar.markdown("### 🩺 Diagnóstico")
+medir_desempenho = st.sidebar.checkbox(
+    "Medir tempo de cada etapa",
+    value=False,
+    help="Registra tempo, linhas processadas e (opcionalmente) pico de memória "
+         "de cada etapa desta execução, nas duas abas."
+)
+medir_memoria = st.sidebar.checkbox(
+    "Medir pico de memória (mais lento)",
+    value=False,
+    disabled=not medir_desempenho,
+    help="O pico é medido no processo inteiro: com outras execuções ao mesmo "
+         "tempo (outros usuários ou o processamento em segundo plano), inclui "
+         "o que elas alocarem."
+)
+# =====================================================
+# CACHE DO ESTOQUE (COMPARTILHADO ENTRE SESSÕES E ABAS)
+# =====================================================
+# Chaveado pelo hash do conteúdo enviado: arquivos idênticos enviados por
+# qualquer usuário reaproveitam o mesmo estoque já lido, agrupado e
+# indexado. As entradas expiram após o TTL e, acima do limite, as menos
+# usadas saem. cache_resource devolve o mesmo objeto (sem cópia a cada
+# leitura): o estoque e o índice são somente leitura no aplicativo.
+@st.cache_resource(max_entries=CACHE_ESTOQUE_MAX_ENTRADAS, ttl=CACHE_ESTOQUE_TTL, show_spinner=False)
+def carregar_estoque_agrupado(hash_qm, hash_mf, _conteudo_qm, _conteudo_mf):
+    df_estoque_agrupado = agrupar_estoque(io.BytesIO(_conteudo_qm), io.BytesIO(_conteudo_mf))
+    return df_estoque_agrupado, indexar_estoque(df_estoque_agrupado)
+
+
+# Estoque da base local: chaveado pela versão do snapshot (muda a cada gravação)
+@st.cache_resource(max_entries=2, show_spinner=False)
+def carregar_estoque_salvo(versao):
+    df_estoque_agrupado = carregar_estoque_local()
+    return df_estoque_agrupado, indexar_estoque(df_estoque_agrupado)
+
+
+# =====================================================
+# TAREFAS EM SEGUNDO PLANO (ALOCAÇÃO)
+# =====================================================
+# Um único gerenciador para todas as sessões: as tarefas continuam entre
+# reexecuções do script, e a mesma chave (sessão, estoque, pedidos e opções)
+# reencontra a tarefa em andamento ou já concluída. A sessão faz parte da
+# chave: cancelar, limpar o cache ou recolher o resultado em uma sessão não
+# afeta a tarefa de outra, e cada tarefa usa o cache da sua. Quando a sessão
+# termina (aba fechada), ninguém mais recolhe o resultado: as suas tarefas
+# são canceladas e retiradas na próxima reexecução de qualquer sessão.
+@st.cache_resource
+def gerenciador_tarefas():
+    return GerenciadorTarefas()
+
+
+def chave_tarefa(chave):
+    """`chave` restrita à sessão corrente (o id da sessão no Streamlit)."""
+    return get_script_run_ctx().session_id, chave
+
+
+def retirar_tarefas_orfas(gerenciador):
+    """Cancela e retira as tarefas de sessões que já terminaram."""
+    if runtime.exists():
+        instancia = runtime.get_instance()
+        gerenciador.retirar_se(lambda tarefa: not instancia.is_active_session(tarefa.chave[0]))
+
+
+def processar_pedidos(tarefa, arquivos, versao_estoque, indice_estoque, cache_pedidos,
+                      reservar=False, dividir=False, excecoes=None, workers=WORKERS_PADRAO):
+    """
+    Tarefa de alocação: lê e aloca os pedidos (progresso por arquivo lido) e
+    prepara os resumos mostrados na aba. Sem chamadas ao Streamlit.
+
+    O resultado é um ResultadoEmLotes: os resumos percorrem os lotes, sem
+    juntar todas as linhas em um único DataFrame.
+    """
+    tarefa.avancar("lendo e alocando pedidos")
+    resultado, avisos_alocacao, recalculados = alocar_incremental(
+        arquivos,
+        versao_estoque,
+        indice_estoque,
+        cache_pedidos,
+        reservar=reservar,
+        dividir=dividir,
+        excecoes=excecoes,
+        workers=workers,
+        ao_concluir=tarefa.progresso,
+        verificar=tarefa.verificar
+    )
+
+    # Uma única agregação por Empresa_Atendimento alimenta todas as métricas
+    tarefa.avancar("resumindo o resultado")
+    with etapa("ui.faturamento", linhas=len(resultado)):
+        df_faturamento = resumir_faturamento(resultado, list(indice_estoque.columns))
+    df_separacao, df_reposicao = resumir_separacao(resultado, indice_estoque)
+
+    return {
+        "resultado": resultado,
+        "avisos": avisos_alocacao,
+        "recalculados": recalculados,
+        "faturamento": dict(zip(df_faturamento["Empresa_Atendimento"], df_faturamento["Valor_Item"])),
+        "separacao": df_separacao,
+        "reposicao": df_reposicao,
+    }
+
+
+def reexecutar_aba():
+    """Reexecuta só a aba (fragmento); numa execução completa do app, o app inteiro."""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
+
+
+def ler_zip_salvo(zip_salvo):
+    """
+    Conteúdo do ZIP guardado na sessão (arquivo temporário), lido só quando
+    o download é pedido: a sessão guarda o arquivo, não os bytes.
+    """
+    with zip_salvo["trava"]:
+        zip_salvo["arquivo"].seek(0)
+        return zip_salvo["arquivo"].read()
+
+
+def estoque_ativo():
+    """
+    {"indice", "excecoes", "descricao"} do estoque usado para anotar os
+    pedidos do WhatsApp: o último carregado na aba de estoques desta sessão
+    (com a prioridade e as exceções escolhidas) ou, se nenhum, o estoque
+    salvo. None se não houver estoque disponível.
+    """
+    ativo = st.session_state.get("estoque_ativo")
+    if ativo is not None:
+        return ativo
+
+    snapshot = info_snapshot()
+    if snapshot is None:
+        return None
+    _, indice_estoque = carregar_estoque_salvo(snapshot["versao"])
+    return {
+        "indice": indice_estoque,
+        "excecoes": None,
+        "descricao": f"estoque salvo (versão {snapshot['versao']}, {snapshot['atualizado_em']})",
+    }
+
+
+# =====================================================
+# ABA 1: CONVERTER PEDIDO WHATSAPP
+# =====================================================
+def aba_whatsapp():
+    st.markdown("### 📦 CONVERTER PEDIDO WHATSAPP")
+    st.markdown("Cole abaixo o texto do pedido exatamente como recebido:")
+
+    if "texto_pedido" not in st.session_state:
+        st.session_state.texto_pedido = ""
+
+    # ---------------- BOTÕES ----------------
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        converter = st.button("🔄 Converter para CSV", key="btn_csv")
+
+    with col2:
+        limpar = st.button("🧹 Limpar texto", key="btn_limpar")
+        if limpar:
+            st.session_state["texto_pedido"] = ""
+
+
+    with col3:
+        gerar_pdf_btn = st.button("📄 Gerar PDF", key="btn_pdf")
+
+
+    # ---------------- TEXT AREA ----------------
+    texto = st.text_area(
+        "📋 Texto do Pedido",
+        value=st.session_state["texto_pedido"],
+        key="texto_pedido",
+        height=420
+    )
+
+
+    # ---------------- AÇÃO PRINCIPAL ----------------
+    if converter or gerar_pdf_btn:
+        if not texto.strip():
+            st.warning("Cole o texto do pedido antes de continuar.")
+        else:
+            with etapa("whatsapp.extracao") as registro:
+                leitura = ler_pedido_whatsapp(texto)
+                registro["linhas"] = len(leitura.itens)
+
+            df_itens = leitura.itens
+            dados_cliente = leitura.cliente
+            total_pedido = leitura.total
+            nome_arquivo = nome_arquivo_pedido(dados_cliente)
+
+            st.subheader("📦 Itens do Pedido")
+            estoque = estoque_ativo()
+            if estoque is None:
+                st.dataframe(df_itens, use_container_width=True)
+                st.caption("Carregue os estoques na aba COMPARAR ESTOQUES para ver a disponibilidade de cada item.")
+            else:
+                # Disponibilidade por grupo e empresa sugerida de cada item (só na tela; o CSV não muda)
+                with etapa("whatsapp.disponibilidade", linhas=len(df_itens)):
+                    disponibilidade = consultar_estoque(
+                        normalizar_codigos(df_itens["Codigo"]),
+                        df_itens["Quantidade"],
+                        estoque["indice"],
+                        estoque["excecoes"],
+                        re.sub(r"\D", "", dados_cliente.get("CNPJ") or "")
+                    )
+                st.dataframe(
+                    pd.concat([df_itens, disponibilidade.set_index(df_itens.index)], axis=1),
+                    use_container_width=True
+                )
+                st.caption(f"Disponibilidade pelo {estoque['descricao']}.")
+
+            st.metric("💰 Total", f"R$ {formatar_br(total_pedido)}")
+
+            # ---------------- CONFERÊNCIA ----------------
+            if not total_confere(leitura):
+                st.warning(
+                    f"⚠️ A soma dos itens (R$ {formatar_br(leitura.soma_itens)}) não confere com o "
+                    f"TOTAL DO PEDIDO (R$ {formatar_br(total_pedido)})."
+                )
+            if leitura.falhas:
+                st.warning(f"⚠️ {len(leitura.falhas)} linha(s) do pedido não foram reconhecidas.")
+                with st.expander("🔍 Linhas não reconhecidas"):
+                    st.dataframe(pd.DataFrame(leitura.falhas), use_container_width=True, hide_index=True)
+
+            if converter:
+                st.download_button(
+                    "⬇️ Baixar CSV",
+                    montar_csv_pedido(df_itens, dados_cliente),
+                    file_name=f"{nome_arquivo}.csv",
+                    mime="text/csv",
+                    on_click="ignore"
+                )
+
+            if gerar_pdf_btn:
+                with etapa("pdf.gerar", linhas=len(df_itens)):
+                    pdf_bytes = gerar_pdf_pedido(texto, df_itens, dados_cliente, total_pedido, leitura.endereco)
+
+                st.download_button(
+                    "⬇️ Baixar PDF",
+                    pdf_bytes,
+                    file_name=f"{nome_arquivo}.pdf",
+                    mime="application/pdf",
+                    on_click="ignore"
+                )
+
+    # =====================================================
+    # CONVERSA EXPORTADA (VÁRIOS PEDIDOS DE UMA VEZ)
+    # =====================================================
+    st.divider()
+    st.markdown("### 📚 Converter conversa exportada (vários pedidos)")
+    st.markdown(
+        "Envie a conversa exportada do WhatsApp (.txt) ou um ZIP com várias conversas. "
+        "Cada bloco \"ITENS DO PEDIDO\" … \"TOTAL DO PEDIDO\" vira um arquivo."
+    )
+
+    conversa = st.file_uploader("Conversa exportada (.txt ou .zip)", type=["txt", "zip"], key="conversa_whatsapp")
+    incluir_pdf = st.checkbox("Incluir PDF de cada pedido", value=False, key="conversa_pdf")
+
+    if st.button("🔄 Converter conversa", key="btn_conversa"):
+        if not conversa:
+            st.warning("Envie a conversa exportada antes de continuar.")
+        else:
+            zip_pedidos = io.BytesIO()
+            with st.spinner("Convertendo pedidos da conversa..."):
+                resumo = converter_conversa(
+                    linhas_conversa(conversa, conversa.name),
+                    zip_pedidos,
+                    incluir_pdf=incluir_pdf
+                )
+
+            if not resumo:
+                st.warning("Nenhum pedido encontrado na conversa.")
+            else:
+                df_resumo = pd.DataFrame(resumo)
+                st.subheader(f"📦 {len(df_resumo)} pedido(s) encontrados")
+                st.dataframe(df_resumo, use_container_width=True)
+                st.metric("💰 Total", f"R$ {formatar_br(df_resumo['Total'].sum())}")
+
+                st.download_button(
+                    "⬇️ Baixar Pedidos (ZIP)",
+                    zip_pedidos.getvalue(),
+                    file_name="pedidos_whatsapp.zip",
+                    mime="application/zip",
+                    on_click="ignore"
+                )
+
+
+# =====================================================
+# ABA 2: COMPARAR ESTOQUES
+# =====================================================
+def aba_estoques():
+    st.markdown("### 📊 COMPARAR ESTOQUES")
+    
+    def hash_upload(arquivo):
+        """
+        Hash SHA-256 do conteúdo de um arquivo enviado (memorizado por file_id na
+        sessão, só para os arquivos ainda enviados).
+        """
+        hashes = st.session_state.setdefault("hashes_upload", {})
+        if arquivo.file_id not in hashes:
+            hashes[arquivo.file_id] = hashlib.sha256(arquivo.getvalue()).hexdigest()
+        return hashes[arquivo.file_id]
+
+    # =====================================================
+    # LIMPAR CACHE / RESET
+    # =====================================================
+    if st.button("🧹 Limpar cache e recarregar"):
+        carregar_estoque_agrupado.clear()
+        carregar_estoque_salvo.clear()
+        gerenciador_tarefas().retirar(st.session_state.pop("tarefa_alocacao", None))
+        for chave in ("cache_pedidos", "resultado_alocacao", "zip_resultado", "estoque_ativo"):
+            st.session_state.pop(chave, None)
+        st.rerun()
+
+    st.title("📦 Alocação de Pedido de Venda")
+    st.markdown("Ferramenta para alocar pedidos de venda com base nos estoques de QM, MF e dos demais grupos (LK-GRUPO), gerando relatórios de faturamento e downloads organizados.")
+
+    # =====================================================
+    # UPLOAD DOS ESTOQUES
+    # =====================================================
+    st.subheader("📂 Upload dos Estoques")
+    estoque_qm = st.file_uploader("Estoque QM (CSV)", type="csv", help="Arquivo CSV com separador ';', encoding latin1.")
+    estoque_mf = st.file_uploader("Estoque MF (CSV)", type="csv", help="Arquivo CSV com separador ';', encoding latin1.")
+
+    # =====================================================
+    # BASE LOCAL DE ESTOQUE (SNAPSHOT + ATUALIZAÇÕES PARCIAIS)
+    # =====================================================
+    with st.expander("💾 Base local de estoque"):
+        if estoque_qm and estoque_mf and st.button("Salvar estoques enviados na base local"):
+            try:
+                df_estoque_enviado, _ = carregar_estoque_agrupado(
+                    hash_upload(estoque_qm),
+                    hash_upload(estoque_mf),
+                    estoque_qm.getvalue(),
+                    estoque_mf.getvalue()
+                )
+                substituir_estoque(df_estoque_enviado, origem=f"{estoque_qm.name} + {estoque_mf.name}")
+                st.success("✅ Estoque salvo na base local.")
+            except ColunasEstoqueError as e:
+                st.error(f"❌ {e}")
+
+        estoque_delta = st.file_uploader(
+            "Atualização parcial (somente SKUs alterados)",
+            type="csv",
+            key="estoque_delta",
+            help="Mesmas colunas do estoque (Produto, Qtde, LK-GRUPO). A Qtde de cada "
+                 "Produto/LK-GRUPO do arquivo substitui a salva; os demais não mudam."
+        )
+        if estoque_delta and st.button("Aplicar atualização"):
+            try:
+                aplicar_atualizacao(agrupar_atualizacao(estoque_delta), origem=estoque_delta.name)
+                st.success("✅ Atualização aplicada.")
+            except ColunasEstoqueError as e:
+                st.error(f"❌ {e}")
+                st.write("Colunas encontradas no arquivo:", e.colunas_qm)
+
+        snapshot = info_snapshot()
+        if snapshot:
+            st.caption(
+                f"Estoque salvo: versão {snapshot['versao']}, {snapshot['skus']} linha(s) "
+                f"Produto/LK-GRUPO, atualizado em {snapshot['atualizado_em']} ({snapshot['origem']})."
+            )
+        else:
+            st.caption("Nenhum estoque salvo ainda.")
+
+    usar_estoque_salvo = st.checkbox(
+        "Usar o estoque salvo na base local (sem enviar os CSVs de estoque)",
+        value=False,
+        disabled=snapshot is None
+    )
+
+    # =====================================================
+    # UPLOAD DOS PEDIDOS
+    # =====================================================
+    st.subheader("🛒 Upload dos Pedidos de Venda")
+    pedidos_files = st.file_uploader(
+        "Pedidos (um ou vários CSVs)",
+        type="csv",
+        accept_multiple_files=True,
+        help="Arquivos CSV com separador ';', encoding latin1, decimal ','."
+    )
+
+    # Hashes só dos arquivos enviados agora: os removidos saem da sessão
+    enviados = {arquivo.file_id for arquivo in [estoque_qm, estoque_mf, *(pedidos_files or [])] if arquivo}
+    hashes = st.session_state.get("hashes_upload", {})
+    if hashes.keys() - enviados:
+        st.session_state["hashes_upload"] = {chave: valor for chave, valor in hashes.items() if chave in enviados}
+
+    # =====================================================
+    # MODO DE ALOCAÇÃO
+    # =====================================================
+    st.subheader("⚙️ Modo de Alocação")
+    reservar_estoque = st.checkbox(
+        "Reservar estoque entre pedidos",
+        value=False,
+        help="Os pedidos consomem o estoque em sequência (por nome do arquivo), "
+             "mantendo um saldo por Produto e LK-GRUPO. Sem esta opção, cada linha "
+             "é comparada com o estoque total."
+    )
+    dividir_linhas = st.checkbox(
+        "Dividir linha entre os grupos quando o saldo de um grupo não for suficiente",
+        value=False,
+        disabled=not reservar_estoque
+    )
+    workers_pedidos = st.number_input(
+        "Processos em paralelo (leitura dos pedidos e PDFs)",
+        min_value=1,
+        max_value=os.cpu_count() or 1,
+        value=WORKERS_PADRAO,
+        help="Quantidade de arquivos de pedido (ou PDFs) processados ao mesmo tempo."
+    )
+
+    # =====================================================
+    # PROCESSAMENTO PRINCIPAL
+    # =====================================================
+    estoque_pronto = (usar_estoque_salvo and snapshot is not None) or (estoque_qm and estoque_mf)
+    if estoque_pronto and pedidos_files:
+        try:
+            # -------------------------------------------------
+            # LER E VALIDAR ESTOQUES
+            # -------------------------------------------------
+            with st.spinner("Carregando estoques..."), etapa("estoque.carregar"):
+                if usar_estoque_salvo and snapshot is not None:
+                    df_estoque_agrupado, indice_estoque = carregar_estoque_salvo(snapshot["versao"])
+                    versao_estoque = f"local:{snapshot['versao']}"
+                else:
+                    try:
+                        df_estoque_agrupado, indice_estoque = carregar_estoque_agrupado(
+                            hash_upload(estoque_qm),
+                            hash_upload(estoque_mf),
+                            estoque_qm.getvalue(),
+                            estoque_mf.getvalue()
+                        )
+                    except ColunasEstoqueError as e:
+                        st.error(f"❌ {e}")
+                        st.write("Colunas encontradas no estoque QM:", e.colunas_qm)
+                        st.write("Colunas encontradas no estoque MF:", e.colunas_mf)
+                        st.stop()
+                    versao_estoque = f"{hash_upload(estoque_qm)}:{hash_upload(estoque_mf)}"
+
+            # -------------------------------------------------
+            # PRIORIDADE ENTRE OS GRUPOS DE ESTOQUE
+            # -------------------------------------------------
+            # Grupos encontrados no estoque (QM e MF primeiro). A ordem das
+            # colunas do índice é a prioridade usada na alocação
+            grupos_encontrados = list(indice_estoque.columns)
+            col_prioridade, col_excecoes = st.columns(2)
+            prioridade = col_prioridade.multiselect(
+                "Prioridade dos grupos de estoque",
+                grupos_encontrados,
+                default=grupos_encontrados,
+                help="Os grupos atendem na ordem escolhida. Grupos removidos não atendem pedidos; "
+                     "para mudar a ordem, remova e adicione novamente."
+            )
+            texto_excecoes = col_excecoes.text_area(
+                "Exceções de prioridade (opcional)",
+                placeholder="CNPJ 12.345.678/0001-99: MF, QM\nCODIGO 0001234: MF",
+                help="Uma exceção por linha, por cliente (CNPJ) ou por produto (CODIGO). Só os grupos "
+                     "listados atendem, nessa ordem; a exceção do produto prevalece sobre a do cliente."
+            )
+            if not prioridade:
+                st.warning("Selecione ao menos um grupo de estoque na prioridade.")
+                st.stop()
+            
+            excecoes, erros_excecoes = ler_excecoes(texto_excecoes, prioridade)
+            for erro in erros_excecoes:
+                st.warning(f"⚠️ Exceção ignorada — {erro}")
+            if prioridade != grupos_encontrados:
+                indice_estoque = indice_estoque[prioridade]
+            versao_alocacao = (versao_estoque, tuple(prioridade), texto_excecoes.strip())
+            
+            # O mesmo índice (objeto do cache) passa a anotar os pedidos do WhatsApp
+            st.session_state["estoque_ativo"] = {
+                "indice": indice_estoque,
+                "excecoes": excecoes,
+                "descricao": (
+                    f"estoque salvo (versão {snapshot['versao']}, {snapshot['atualizado_em']})"
+                    if versao_estoque.startswith("local:")
+                    else f"estoque enviado ({estoque_qm.name} + {estoque_mf.name})"
+                ),
+            }
+            
+            with st.expander("🔍 Ver estoque agrupado (primeiras 100 linhas)"):
+                st.dataframe(df_estoque_agrupado.head(100), use_container_width=True)
+            
+            # -------------------------------------------------
+            # PROCESSAR PEDIDOS E COMPARAR COM ESTOQUE
+            # -------------------------------------------------
+            # O último resultado fica na sessão: filtros, paginação e downloads
+            # reexecutam a aba sem alocar de novo enquanto nada mudar
+            chave_resultado = (
+                versao_alocacao,
+                tuple((file.name, hash_upload(file)) for file in pedidos_files),
+                reservar_estoque,
+                reservar_estoque and dividir_linhas,
+            )
+            resultado_salvo = st.session_state.get("resultado_alocacao")
+            
+            if not resultado_salvo or resultado_salvo["chave"] != chave_resultado:
+                # A alocação roda em segundo plano: a aba só acompanha a tarefa
+                # (progresso e cancelamento) e recolhe o resultado quando termina.
+                # Resultados por arquivo ficam no cache da sessão: ao adicionar,
+                # remover ou trocar um pedido, só ele é lido (e alocado) de novo
+                gerenciador = gerenciador_tarefas()
+                retirar_tarefas_orfas(gerenciador)
+                tarefa = gerenciador.obter(st.session_state.get("tarefa_alocacao"))
+                if tarefa is None or tarefa.chave != chave_tarefa(chave_resultado):
+                    if tarefa is not None:
+                        gerenciador.retirar(tarefa.id)
+                    tarefa = gerenciador.enviar(
+                        chave_tarefa(chave_resultado),
+                        processar_pedidos,
+                        [(file.name, hash_upload(file), file.getvalue()) for file in pedidos_files],
+                        versao_alocacao,
+                        indice_estoque,
+                        st.session_state.setdefault("cache_pedidos", CacheResultados()),
+                        reservar=reservar_estoque,
+                        dividir=reservar_estoque and dividir_linhas,
+                        excecoes=excecoes,
+                        workers=workers_pedidos,
+                        diagnostico=Diagnostico(memoria=medir_memoria) if medir_desempenho else None
+                    )
+                    st.session_state["tarefa_alocacao"] = tarefa.id
+                
+                if not tarefa.terminada:
+                    st.progress(tarefa.fracao(), text=(
+                        f"⏳ Tarefa {tarefa.id} ({tarefa.situacao}): {tarefa.etapa or 'aguardando'}"
+                        + (f" — {tarefa.concluidos} de {tarefa.total} arquivo(s) lidos" if tarefa.total else "")
+                    ))
+                    if st.button("⛔ Cancelar processamento"):
+                        tarefa.cancelar()
+                    else:
+                        # Consulta o andamento de novo em instantes (só esta aba reexecuta)
+                        time.sleep(INTERVALO_ACOMPANHAMENTO)
+                    reexecutar_aba()
+                
+                if tarefa.situacao != CONCLUIDA:
+                    if tarefa.situacao == CANCELADA:
+                        st.warning(f"⚠️ Processamento cancelado (tarefa {tarefa.id}).")
+                    else:
+                        st.error(f"❌ Erro durante o processamento: {tarefa.erro}")
+                    if st.button("🔄 Processar novamente"):
+                        gerenciador.retirar(tarefa.id)
+                        reexecutar_aba()
+                    st.stop()
+                
+                # Concluída: o resultado passa para a sessão e sai do gerenciador
+                gerenciador.retirar(tarefa.id)
+                resultado_salvo = {"chave": chave_resultado, "diagnostico": tarefa.diagnostico, **tarefa.resultado}
+                st.session_state["resultado_alocacao"] = resultado_salvo
+            
+            resultado = resultado_salvo["resultado"]
+            faturamento = resultado_salvo["faturamento"]
+            
+            for aviso in resultado_salvo["avisos"]:
+                st.warning(f"⚠️ {aviso}")
+            
+            st.caption(
+                f"{resultado_salvo['recalculados']} de {len(pedidos_files)} arquivo(s) de pedido lidos no último "
+                "processamento; os demais vieram do cache."
+            )
+            if resultado.lotes_em_disco:
+                st.caption(
+                    f"Resultado com {len(resultado)} linha(s) em {resultado.total_lotes} lote(s); "
+                    f"{resultado.lotes_em_disco} gravado(s) em disco (Parquet) para limitar o uso de memória."
+                )
+            if resultado_salvo["diagnostico"] is not None:
+                painel_diagnostico(resultado_salvo["diagnostico"], "alocacao", "🩺 Diagnóstico do processamento em segundo plano")
+            
+            # Colunas escolhidas em cada arquivo (resolução memorizada por cabeçalho)
+            with st.expander("🧭 Colunas identificadas nos arquivos"):
+                arquivos_estoque = [arquivo for arquivo in (estoque_qm, estoque_mf) if arquivo]
+                if arquivos_estoque and not usar_estoque_salvo:
+                    st.caption("Estoques")
+                    st.dataframe(tabela_mapeamento({
+                        arquivo.name: resolver_colunas(ler_cabecalho(arquivo), REGRAS_ESTOQUE)
+                        for arquivo in arquivos_estoque
+                    }), use_container_width=True)
+                st.caption("Pedidos")
+                st.dataframe(tabela_mapeamento({
+                    file.name: resolver_colunas(ler_cabecalho(file), REGRAS_PEDIDO)
+                    for file in pedidos_files
+                }), use_container_width=True)
+            
+            # =====================================================
+            # RESULTADO FINAL
+            # =====================================================
+            
+            st.subheader("📊 Resultado da Alocação")
+            
+            # Filtros e paginação no servidor, lote a lote: só a página visível
+            # vai ao navegador e só os lotes dessa página são lidos inteiros
+            col_cnpj, col_arquivo, col_empresa = st.columns(3)
+            filtro_cnpj = col_cnpj.text_input("Filtrar por CNPJ", placeholder="Parte do CNPJ (somente números)")
+            filtro_arquivos = col_arquivo.multiselect("Arquivos de pedido", opcoes_filtro_resultado(resultado, "Arquivo_Pedido"))
+            filtro_empresas = col_empresa.multiselect("Empresa de atendimento", opcoes_filtro_resultado(resultado, "Empresa_Atendimento"))
+            
+            contagens = contar_filtradas(resultado, filtro_cnpj, filtro_arquivos, filtro_empresas)
+            linhas_filtradas = sum(contagens)
+            
+            col_tamanho, col_pagina = st.columns([1, 3])
+            linhas_por_pagina = col_tamanho.selectbox(
+                "Linhas por página",
+                OPCOES_LINHAS_POR_PAGINA,
+                index=OPCOES_LINHAS_POR_PAGINA.index(LINHAS_POR_PAGINA)
+            )
+            paginas = total_paginas(linhas_filtradas, linhas_por_pagina)
+            pagina = col_pagina.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas, value=1)
+            
+            df_pagina = pagina_filtrada(
+                resultado, contagens, pagina, linhas_por_pagina, filtro_cnpj, filtro_arquivos, filtro_empresas
+            )
+            with etapa("ui.tabela_resultado", linhas=len(df_pagina)):
+                st.dataframe(df_pagina, use_container_width=True)
+            
+            inicio_pagina = (pagina - 1) * linhas_por_pagina
+            st.caption(
+                f"Linhas {inicio_pagina + 1 if len(df_pagina) else 0}–{inicio_pagina + len(df_pagina)} "
+                f"de {linhas_filtradas}" + (f" (filtradas de {len(resultado)})" if linhas_filtradas != len(resultado) else "")
+            )
+            
+            # =====================================================
+            # FATURAMENTO POR EMPRESA
+            # =====================================================
+            # Uma métrica por grupo da prioridade (quantos houver)
+            st.subheader("💰 Faturamento Previsto por Empresa")
+            for coluna, grupo in zip(st.columns(len(prioridade)), prioridade):
+                coluna.metric(grupo, f"R$ {formatar_br(faturamento.get(grupo, 0.0))}")
+            
+            st.subheader("💰 Faturamento Previsto por Empresa (Incluindo Sem Estoque)")
+            for coluna, grupo in zip(st.columns(len(prioridade) + 1), prioridade + [SEM_ESTOQUE]):
+                coluna.metric(grupo, f"R$ {formatar_br(faturamento.get(grupo, 0.0))}")
+            
+            # =====================================================
+            # SEPARAÇÃO POR EMPRESA E REPOSIÇÃO
+            # =====================================================
+            st.subheader("📋 Separação por Empresa e Reposição")
+            df_separacao = resultado_salvo["separacao"]
+            df_reposicao = resultado_salvo["reposicao"]
+            
+            col1, col2 = st.columns(2)
+            col1.metric("Produtos a separar", f"{(df_separacao['Empresa_Atendimento'] != SEM_ESTOQUE).sum()}")
+            col2.metric("Produtos em falta", f"{len(df_reposicao)}")
+            
+            with st.expander("🔍 Produtos em falta (maiores faltas primeiro)"):
+                st.dataframe(df_reposicao.head(LINHAS_POR_PAGINA), use_container_width=True, hide_index=True)
+            
+            col1, col2 = st.columns(2)
+            col1.download_button(
+                "⬇️ Baixar Lista de Separação (CSV)",
+                csv_grupo(df_separacao),
+                "separacao.csv",
+                "text/csv",
+                on_click="ignore"
+            )
+            col2.download_button(
+                "⬇️ Baixar Reposição (CSV)",
+                csv_grupo(df_reposicao),
+                "reposicao.csv",
+                "text/csv",
+                on_click="ignore"
+            )
+            
+            # =====================================================
+            # GERAR ZIP COM ARQUIVOS SEPARADOS
+            # =====================================================
+            formato_zip = st.selectbox(
+                "Formato dos arquivos no ZIP",
+                formatos_disponiveis(),
+                format_func=FORMATOS_EXPORTACAO.get,
+                help="CSV com ';' e decimal ',' (importação no ERP), Parquet ou Excel."
+            )
+            
+            # ZIP montado em arquivo temporário (vai para o disco se ficar grande)
+            # e guardado na sessão para o mesmo resultado e formato; os bytes só
+            # são lidos quando o download é pedido
+            zip_salvo = st.session_state.get("zip_resultado")
+            if not zip_salvo or zip_salvo["chave"] != (chave_resultado, formato_zip):
+                zip_salvo = {
+                    "chave": (chave_resultado, formato_zip),
+                    "arquivo": escrever_zip_temporario(resultado, formato=formato_zip, workers=workers_pedidos),
+                    "trava": threading.Lock(),
+                }
+                st.session_state["zip_resultado"] = zip_salvo
+            
+            st.download_button(
+                "⬇️ Baixar Resultados (ZIP)",
+                partial(ler_zip_salvo, zip_salvo),
+                "alocacao_pedidos.zip",
+                "application/zip",
+                on_click="ignore"
+            )
+            
+            # =====================================================
+            # PDFs POR PEDIDO E EMPRESA
+            # =====================================================
+            if st.button("📄 Gerar PDFs por pedido e empresa"):
+                zip_pdfs = io.BytesIO()
+                with st.spinner("Gerando PDFs..."):
+                    gerar_pdfs_em_lote(documentos_alocacao(resultado), zip_pdfs, workers=workers_pedidos)
+                
+                st.download_button(
+                    "⬇️ Baixar PDFs (ZIP)",
+                    zip_pdfs.getvalue(),
+                    "alocacao_pedidos_pdf.zip",
+                    "application/zip",
+                    on_click="ignore"
+                )
+        
+        except Exception as e:
+            st.error(f"❌ Erro durante o processamento: {str(e)}")
+            st.info("Verifique os arquivos enviados (formato, encoding, separadores) e tente novamente.")
+
+    else:
+        st.info("⬆️ Envie os arquivos de estoque (QM e MF), ou use o estoque salvo, e os pedidos para iniciar o processamento.")
+
+# =====================================================
+# PAINEL DE DIAGNÓSTICO
+# =====================================================
+def executar_com_diagnostico(aba, chave):
+    """
+    Executa a aba medindo as suas etapas (com o diagnóstico ligado) e mostra
+    o painel ao final dela: uma aba reexecutada sozinha mostra o que ela
+    mesma fez.
+    """
+    diagnostico = Diagnostico(memoria=medir_memoria) if medir_desempenho else None
+    with ativar(diagnostico):
+        aba()
+    if diagnostico is not None:
+        painel_diagnostico(diagnostico, chave)
+
+
+def painel_diagnostico(diagnostico, chave, titulo="🩺 Diagnóstico desta execução"):
+    with st.expander(titulo, expanded=True):
+        if not diagnostico.registros:
+            st.caption("Nenhuma etapa executada nesta execução.")
+            return
+        st.dataframe(diagnostico.tabela(), use_container_width=True, hide_index=True)
+        col1, col2 = st.columns(2)
+        col1.download_button(
+            "⬇️ Baixar diagnóstico (JSON)",
+            diagnostico.json(),
+            file_name=f"diagnostico_{chave}.json",
+            mime="application/json",
+            key=f"diagnostico_json_{chave}",
+            on_click="ignore"
+        )
+        col2.download_button(
+            "⬇️ Baixar diagnóstico (CSV)",
+            diagnostico.csv(),
+            file_name=f"diagnostico_{chave}.csv",
+            mime="text/csv",
+            key=f"diagnostico_csv_{chave}",
+            on_click="ignore"
+        )
+
+
+# =====================================================
+# EXECUTAR AS ABAS (FRAGMENTOS INDEPENDENTES)
+# =====================================================
+# Cada aba é um fragmento: botões, textos, filtros e downloads de uma aba
+# reexecutam apenas ela. A outra aba fica como está, sem recalcular nada.
+@st.fragment
+def fragmento_whatsapp():
+    executar_com_diagnostico(aba_whatsapp, "whatsapp")
+
+
+@st.fragment
+def fragmento_estoques():
+    executar_com_diagnostico(aba_estoques, "estoques")
+
+
+with tab1:
+    fragmento_whatsapp()
+
+with tab2:
+    fragmento_estoques()
@@ -0,0 +1,145 @@
+import contextvars
+import json
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+# Diagnóstico ativo na execução corrente (None = instrumentação desligada)
+_ATIVO = contextvars.ContextVar("diagnostico", default=None)
+
+COLUNAS_DIAGNOSTICO = ["etapa", "segundos", "linhas", "linhas_por_segundo", "pico_memoria_mb"]
+
+# O tracemalloc é do processo inteiro: ligado enquanto houver algum
+# diagnóstico com memória ativo (em qualquer sessão ou thread) e com as
+# etapas abertas de todos eles, para que nenhuma perca o pico de outra
+_TRAVA_MEMORIA = threading.Lock()
+_memoria_em_uso = 0
+_iniciou_tracemalloc = False
+_quadros_abertos = []
+
+
+# =====================================================
+# REGISTRO DAS ETAPAS
+# =====================================================
+class Diagnostico:
+    """
+    Tempo de parede, linhas processadas e (opcionalmente) pico de memória de
+    cada etapa executada enquanto estiver ativo (ver ativar e etapa).
+
+    O pico de memória usa tracemalloc, que deixa o Python mais lento: por
+    isso só é medido com memoria=True. Ele é do processo inteiro: com outras
+    execuções simultâneas (outras sessões, abas ou a tarefa em segundo
+    plano), o pico de uma etapa inclui o que elas alocaram no período.
+    """
+
+    def __init__(self, memoria=False):
+        self.memoria = memoria
+        self.registros = []
+
+    def tabela(self):
+        return pd.DataFrame(self.registros, columns=COLUNAS_DIAGNOSTICO).astype({"linhas": "Int64"})
+
+    def json(self):
+        return json.dumps(self.registros, indent=2, ensure_ascii=False)
+
+    def csv(self):
+        return self.tabela().to_csv(index=False, sep=";", decimal=",")
+
+
+@contextmanager
+def ativar(diagnostico):
+    """Ativa `diagnostico` dentro do bloco; com None, não faz nada."""
+    if diagnostico is None:
+        yield None
+        return
+
+    if diagnostico.memoria:
+        _ligar_memoria()
+    token = _ATIVO.set(diagnostico)
+    try:
+        yield diagnostico
+    finally:
+        _ATIVO.reset(token)
+        if diagnostico.memoria:
+            _desligar_memoria()
+
+
+@contextmanager
+def etapa(nome, linhas=None):
+    """
+    Mede o bloco como uma etapa do diagnóstico ativo. O registro devolvido
+    aceita registro["linhas"] = n quando o total só é conhecido no fim.
+
+    Sem diagnóstico ativo o custo é apenas o de uma consulta a ContextVar.
+    """
+    diagnostico = _ATIVO.get()
+    if diagnostico is None:
+        yield {}
+        return
+
+    registro = {"etapa": nome, "linhas": linhas}
+    posicao = len(diagnostico.registros)
+    diagnostico.registros.append(None)  # etapas listadas na ordem em que começam
+    medir_memoria = diagnostico.memoria and tracemalloc.is_tracing()
+    if medir_memoria:
+        quadro = _abrir_quadro()
+
+    inicio = time.perf_counter()
+    try:
+        yield registro
+    finally:
+        segundos = time.perf_counter() - inicio
+        registro["segundos"] = round(segundos, 6)
+        linhas_etapa = registro.get("linhas")
+        registro["linhas_por_segundo"] = round(linhas_etapa / segundos, 1) if linhas_etapa and segundos else None
+        registro["pico_memoria_mb"] = None
+
+        if medir_memoria:
+            pico = _fechar_quadro(quadro)
+            registro["pico_memoria_mb"] = round((pico - quadro["inicio"]) / 1024 / 1024, 2)
+
+        diagnostico.registros[posicao] = {coluna: registro.get(coluna) for coluna in COLUNAS_DIAGNOSTICO}
+
+
+# =====================================================
+# PICO DE MEMÓRIA (TRACEMALLOC COMPARTILHADO)
+# =====================================================
+def _ligar_memoria():
+    global _memoria_em_uso, _iniciou_tracemalloc
+    with _TRAVA_MEMORIA:
+        if _memoria_em_uso == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _iniciou_tracemalloc = True
+        _memoria_em_uso += 1
+
+
+def _desligar_memoria():
+    # Só para o tracemalloc que ligou, e quando nenhum diagnóstico o usa mais
+    global _memoria_em_uso, _iniciou_tracemalloc
+    with _TRAVA_MEMORIA:
+        _memoria_em_uso -= 1
+        if _memoria_em_uso == 0 and _iniciou_tracemalloc:
+            tracemalloc.stop()
+            _iniciou_tracemalloc = False
+
+
+def _abrir_quadro():
+    # Antes de zerar o pico para a nova etapa, repassa-o a todas as etapas
+    # abertas (deste e de outros diagnósticos)
+    with _TRAVA_MEMORIA:
+        atual, pico = tracemalloc.get_traced_memory()
+        for quadro in _quadros_abertos:
+            quadro["pico"] = max(quadro["pico"], pico)
+        tracemalloc.reset_peak()
+        quadro = {"inicio": atual, "pico": atual}
+        _quadros_abertos.append(quadro)
+        return quadro
+
+
+def _fechar_quadro(quadro):
+    with _TRAVA_MEMORIA:
+        _quadros_abertos.remove(quadro)
+        return max(tracemalloc.get_traced_memory()[1], quadro["pico"])
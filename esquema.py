@@ -0,0 +1,122 @@
+import re
+import unicodedata
+from collections import namedtuple
+from functools import lru_cache
+
+import pandas as pd
+
+# Regra de resolução de uma coluna lógica:
+# - nomes: candidatos em ordem de prioridade (o primeiro tem precedência);
+# - excluir: trechos que descartam uma coluna na busca aproximada
+#   (ex.: "DESCR" impede que PRODUTO case com DESCRICAO_PRODUTO).
+Regra = namedtuple("Regra", ["nomes", "excluir"], defaults=[()])
+
+# Assinaturas de cabeçalho diferentes memorizadas (por processo)
+CACHE_ESQUEMAS = 512
+
+
+# =====================================================
+# NORMALIZAÇÃO DE NOMES DE COLUNA
+# =====================================================
+def normalizar_nome(nome):
+    """
+    Remove acentos, converte para maiúsculas e unifica separadores
+    ("Valor Unitário" e "VALOR-UNITARIO" viram "VALOR_UNITARIO").
+    """
+    nome = unicodedata.normalize('NFD', str(nome)).encode('ascii', 'ignore').decode('ascii').upper()
+    return re.sub(r"[\s_.\-/]+", "_", nome).strip("_")
+
+
+# =====================================================
+# NORMALIZAÇÃO DE CÓDIGOS DE PRODUTO
+# =====================================================
+def normalizar_codigos(serie):
+    """
+    Códigos de produto como texto, sem espaços, em maiúsculas e sem zeros à
+    esquerda: a mesma chave no estoque, nos pedidos e no WhatsApp. Usa
+    strings para evitar NaN em códigos mistos.
+    """
+    return serie.astype(str).str.strip().str.upper().str.lstrip('0')
+
+
+# =====================================================
+# RESOLUÇÃO DO ESQUEMA (EXATO, DEPOIS APROXIMADO)
+# =====================================================
+def resolver_colunas(cabecalho, regras):
+    """
+    Resolve cada nome lógico de `regras` ({nome: Regra ou candidatos em ordem
+    de prioridade}) para a coluna original do cabeçalho (ou None).
+
+    1. Correspondência exata (após normalização), na ordem dos candidatos e
+       sem repetir uma coluna já atribuída;
+    2. Para o que faltar, correspondência por trecho, na ordem dos
+       candidatos, ignorando colunas já atribuídas e as excluídas pela regra.
+
+    O resultado é memorizado pela assinatura normalizada do cabeçalho: vários
+    arquivos exportados do mesmo sistema resolvem o esquema uma única vez.
+    """
+    indices = _resolver_indices(
+        tuple(normalizar_nome(c) for c in cabecalho),
+        _chave_regras(regras)
+    )
+    return {nome: (cabecalho[i] if i is not None else None) for nome, i in indices.items()}
+
+
+def tabela_mapeamento(mapas):
+    """
+    Monta uma tabela para exibição a partir de {arquivo: mapa}, com uma linha
+    por arquivo e uma coluna por nome lógico (coluna original escolhida).
+    """
+    linhas = [
+        {"Arquivo": arquivo, **{nome: coluna or "—" for nome, coluna in mapa.items()}}
+        for arquivo, mapa in mapas.items()
+    ]
+    return pd.DataFrame(linhas)
+
+
+# =====================================================
+# FUNÇÕES AUXILIARES
+# =====================================================
+def _chave_regras(regras):
+    # Regras em forma imutável (e hasheável) para servir de chave do cache
+    chave = []
+    for nome, regra in regras.items():
+        if not isinstance(regra, Regra):
+            regra = Regra(regra)
+        chave.append((nome, Regra(
+            tuple(normalizar_nome(n) for n in regra.nomes),
+            tuple(normalizar_nome(e) for e in regra.excluir)
+        )))
+    return tuple(chave)
+
+
+@lru_cache(maxsize=CACHE_ESQUEMAS)
+def _resolver_indices(assinatura, regras):
+    indices = dict.fromkeys(nome for nome, _ in regras)
+    usadas = set()
+
+    for nome, regra in regras:
+        for candidato in regra.nomes:
+            if candidato in assinatura and assinatura.index(candidato) not in usadas:
+                indices[nome] = assinatura.index(candidato)
+                usadas.add(indices[nome])
+                break
+
+    for nome, regra in regras:
+        if indices[nome] is not None:
+            continue
+        indices[nome] = next(
+            (
+                i
+                for candidato in regra.nomes
+                for i, coluna in enumerate(assinatura)
+                if i not in usadas
+                and candidato in coluna
+                and not any(e in coluna for e in regra.excluir)
+            ),
+            None
+        )
+        if indices[nome] is not None:
+            usadas.add(indices[nome])
+
+    return indices
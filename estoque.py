@@ -0,0 +1,100 @@
+import pandas as pd
+
+from diagnostico import etapa
+from esquema import Regra, normalizar_codigos, resolver_colunas
+from leitura import ler_cabecalho, ler_colunas
+from numeros_br import parse_br
+from tipos import compactar
+
+# Colunas obrigatórias do estoque e os possíveis nomes no CSV (em ordem de prioridade)
+REGRAS_ESTOQUE = {
+    "Produto": Regra(("PRODUTO", "CODIGO", "COD_PROD", "CODPROD"), excluir=("DESCR", "NOME")),
+    "Qtde": Regra(("QTDE", "QUANTIDADE", "SALDO", "QTD")),
+    "LK-GRUPO": Regra(("LK-GRUPO", "LKGRUPO", "GRUPO", "EMPRESA")),
+}
+
+
+class ColunasEstoqueError(ValueError):
+    """Os arquivos de estoque não contêm as colunas Produto, Qtde e LK-GRUPO."""
+
+    def __init__(self, colunas_qm, colunas_mf):
+        super().__init__(
+            "Os arquivos de estoque não contêm todas as colunas necessárias (Produto, Qtde, LK-GRUPO)."
+        )
+        self.colunas_qm = colunas_qm
+        self.colunas_mf = colunas_mf
+
+
+# =====================================================
+# LER, NORMALIZAR E AGRUPAR ESTOQUES
+# =====================================================
+def agrupar_estoque(arquivo_qm, arquivo_mf):
+    """
+    Lê os CSVs de estoque QM e MF e devolve o estoque agrupado por Produto e
+    LK-GRUPO (colunas Produto, LK-GRUPO, Qtde).
+
+    Apenas as três colunas necessárias são lidas. Arquivos grandes são lidos
+    em blocos, agrupando cada bloco antes de juntar os parciais.
+    """
+    with etapa("estoque.esquema"):
+        cabecalho_qm = ler_cabecalho(arquivo_qm)
+        cabecalho_mf = ler_cabecalho(arquivo_mf)
+        mapa_qm = resolver_colunas(cabecalho_qm, REGRAS_ESTOQUE)
+        mapa_mf = resolver_colunas(cabecalho_mf, REGRAS_ESTOQUE)
+
+    if not all(mapa_qm.values()) or not all(mapa_mf.values()):
+        raise ColunasEstoqueError(cabecalho_qm, cabecalho_mf)
+
+    parciais = _ler_agrupado(arquivo_qm, mapa_qm) + _ler_agrupado(arquivo_mf, mapa_mf)
+    with etapa("estoque.somar"):
+        return compactar(_somar_por_produto(pd.concat(parciais, ignore_index=True)))
+
+
+def agrupar_atualizacao(arquivo):
+    """
+    Lê um CSV de atualização parcial do estoque (somente os SKUs alterados,
+    de qualquer LK-GRUPO), com as mesmas colunas dos estoques completos, e
+    devolve-o agrupado como agrupar_estoque.
+    """
+    cabecalho = ler_cabecalho(arquivo)
+    mapa = resolver_colunas(cabecalho, REGRAS_ESTOQUE)
+
+    if not all(mapa.values()):
+        raise ColunasEstoqueError(cabecalho, [])
+
+    return compactar(_somar_por_produto(pd.concat(_ler_agrupado(arquivo, mapa), ignore_index=True)))
+
+
+def _ler_agrupado(arquivo, mapa):
+    # Agrupa cada bloco lido; arquivos pequenos vêm em um único bloco
+    with etapa("estoque.leitura_e_agrupamento") as registro:
+        dados = ler_colunas(arquivo, mapa)
+        blocos = [dados] if isinstance(dados, pd.DataFrame) else dados
+        parciais = []
+        linhas = 0
+        for bloco in blocos:
+            linhas += len(bloco)
+            parciais.append(_agrupar_bloco(bloco))
+        registro["linhas"] = linhas
+        return parciais
+
+
+def _agrupar_bloco(df_estoque):
+    # Normalizar dados do estoque
+    df_estoque["Produto"] = normalizar_codigos(df_estoque["Produto"])
+    df_estoque["Qtde"] = parse_br(df_estoque["Qtde"], ponto_milhar=False).fillna(0)
+    df_estoque["LK-GRUPO"] = df_estoque["LK-GRUPO"].astype(str).str.strip().str.upper()
+
+    # Filtrar estoques válidos
+    df_estoque = df_estoque.dropna(subset=["Produto"])
+
+    return _somar_por_produto(df_estoque)
+
+
+def _somar_por_produto(df_estoque):
+    # Agrupar estoque por Produto e LK-GRUPO
+    return (
+        df_estoque
+        .groupby(["Produto", "LK-GRUPO"], as_index=False)["Qtde"]
+        .sum()
+    )
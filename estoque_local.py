@@ -0,0 +1,140 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+from tipos import compactar
+
+# Base local com o último estoque agrupado (SQLite, ao lado do aplicativo)
+CAMINHO_ESTOQUE_LOCAL = os.environ.get(
+    "ESTOQUE_LOCAL_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "estoque_local.sqlite3")
+)
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS estoque (
+    produto TEXT NOT NULL,
+    grupo TEXT NOT NULL,
+    qtde REAL NOT NULL,
+    PRIMARY KEY (produto, grupo)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS snapshot (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    versao INTEGER NOT NULL,
+    atualizado_em TEXT NOT NULL,
+    origem TEXT NOT NULL
+);
+"""
+
+# Última consulta de info_snapshot por caminho: {caminho: ((mtime_ns, tamanho), info)}
+_INFO_SNAPSHOT = {}
+
+
+# =====================================================
+# GRAVAR: SUBSTITUIÇÃO COMPLETA OU ATUALIZAÇÃO PARCIAL
+# =====================================================
+def substituir_estoque(df_estoque_agrupado, origem="", caminho=CAMINHO_ESTOQUE_LOCAL):
+    """
+    Substitui todo o estoque salvo pelo estoque agrupado informado (colunas
+    Produto, LK-GRUPO, Qtde). Devolve a nova versão do snapshot.
+    """
+    with _conectar(caminho) as conexao:
+        conexao.execute("DELETE FROM estoque")
+        conexao.executemany("INSERT INTO estoque (produto, grupo, qtde) VALUES (?, ?, ?)", _linhas(df_estoque_agrupado))
+        versao = _registrar_snapshot(conexao, origem)
+    _INFO_SNAPSHOT.pop(caminho, None)
+    return versao
+
+
+def aplicar_atualizacao(df_atualizacao, origem="", caminho=CAMINHO_ESTOQUE_LOCAL):
+    """
+    Aplica uma atualização parcial: cada Produto/LK-GRUPO informado passa a ter
+    a Qtde do arquivo (os demais ficam como estão). Devolve a nova versão.
+    """
+    with _conectar(caminho) as conexao:
+        conexao.executemany(
+            "INSERT INTO estoque (produto, grupo, qtde) VALUES (?, ?, ?) "
+            "ON CONFLICT (produto, grupo) DO UPDATE SET qtde = excluded.qtde",
+            _linhas(df_atualizacao)
+        )
+        versao = _registrar_snapshot(conexao, origem)
+    _INFO_SNAPSHOT.pop(caminho, None)
+    return versao
+
+
+# =====================================================
+# LER O ESTOQUE SALVO
+# =====================================================
+def info_snapshot(caminho=CAMINHO_ESTOQUE_LOCAL):
+    """
+    Devolve {"versao", "atualizado_em", "origem", "skus"} do estoque salvo, ou
+    None se ainda não houver estoque salvo. Consulta rápida: serve de chave
+    de cache para carregar_estoque_local.
+
+    A resposta fica guardada enquanto o arquivo não muda (data de modificação
+    e tamanho): chamadas repetidas, como as das reexecuções da página, não
+    reabrem o banco.
+    """
+    try:
+        estado = os.stat(caminho)
+    except FileNotFoundError:
+        return None
+    assinatura = (estado.st_mtime_ns, estado.st_size)
+    guardado = _INFO_SNAPSHOT.get(caminho)
+    if guardado is not None and guardado[0] == assinatura:
+        return guardado[1]
+
+    with _conectar(caminho) as conexao:
+        linha = conexao.execute("SELECT versao, atualizado_em, origem FROM snapshot WHERE id = 1").fetchone()
+        skus = conexao.execute("SELECT COUNT(*) FROM estoque").fetchone()[0] if linha else 0
+    info = None
+    if linha is not None:
+        versao, atualizado_em, origem = linha
+        info = {"versao": versao, "atualizado_em": atualizado_em, "origem": origem, "skus": skus}
+    _INFO_SNAPSHOT[caminho] = (assinatura, info)
+    return info
+
+
+def carregar_estoque_local(caminho=CAMINHO_ESTOQUE_LOCAL):
+    """Estoque salvo no mesmo formato de agrupar_estoque (Produto, LK-GRUPO, Qtde)."""
+    with _conectar(caminho) as conexao:
+        return compactar(pd.read_sql_query(
+            'SELECT produto AS "Produto", grupo AS "LK-GRUPO", qtde AS "Qtde" FROM estoque',
+            conexao
+        ))
+
+
+# =====================================================
+# FUNÇÕES AUXILIARES
+# =====================================================
+@contextmanager
+def _conectar(caminho):
+    # Conexão com o esquema criado; commit ao sair sem erro, sempre fechada
+    conexao = sqlite3.connect(caminho)
+    try:
+        conexao.executescript(_ESQUEMA)
+        with conexao:
+            yield conexao
+    finally:
+        conexao.close()
+
+
+def _linhas(df_estoque):
+    return zip(
+        df_estoque["Produto"].astype(str).tolist(),
+        df_estoque["LK-GRUPO"].astype(str).tolist(),
+        df_estoque["Qtde"].astype(float).tolist(),
+    )
+
+
+def _registrar_snapshot(conexao, origem):
+    linha = conexao.execute("SELECT versao FROM snapshot WHERE id = 1").fetchone()
+    versao = (linha[0] if linha else 0) + 1
+    conexao.execute(
+        "INSERT OR REPLACE INTO snapshot (id, versao, atualizado_em, origem) VALUES (1, ?, ?, ?)",
+        (versao, datetime.now().isoformat(timespec="seconds"), origem)
+    )
+    return versao
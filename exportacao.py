@@ -0,0 +1,333 @@
+import io
+import os
+import tempfile
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from importlib.util import find_spec
+from itertools import groupby
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_float_dtype
+
+from diagnostico import etapa
+from resultados import lotes_resultado
+from tipos import COLUNAS_QUANTIDADE, chave_ordenacao
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+
+# =====================================================
+# CONFIGURAÇÃO DA EXPORTAÇÃO
+# =====================================================
+FORMATOS_EXPORTACAO = {"csv": "CSV (;)", "parquet": "Parquet", "xlsx": "Excel (XLSX)"}
+
+CHAVES_GRUPO = ["Arquivo_Pedido", "Empresa_Atendimento"]
+
+# Threads que serializam os grupos (CSV, Parquet ou XLSX); a compressão e a
+# gravação no ZIP ficam na thread que chama, uma entrada por vez
+WORKERS_EXPORTACAO = min(4, os.cpu_count() or 1)
+
+# Grupos CSV grandes são gravados no ZIP em partes deste tamanho
+LINHAS_POR_PARTE = 50_000
+
+# Linhas convertidas para texto de uma vez (vários grupos por lote)
+LINHAS_POR_LOTE = 200_000
+
+# Compressão rápida: o ZIP fica pouco maior (~15% nos CSVs) e sai bem antes
+NIVEL_COMPRESSAO = 1
+
+# ZIPs temporários acima deste tamanho saem da memória para o disco
+LIMITE_ZIP_EM_MEMORIA = 64 * 1024 * 1024
+
+
+def formatos_disponiveis():
+    """Formatos de exportação cujas dependências estão instaladas."""
+    disponiveis = ["csv"]
+    if pa is not None:
+        disponiveis.append("parquet")
+    if find_spec("openpyxl") or find_spec("xlsxwriter"):
+        disponiveis.append("xlsx")
+    return disponiveis
+
+
+# =====================================================
+# ARQUIVOS SEPARADOS POR PEDIDO E EMPRESA
+# =====================================================
+def grupos_resultado(df_resultado, formato="csv"):
+    """
+    Itera (nome_arquivo, df_grupo) para cada combinação de Arquivo_Pedido e
+    Empresa_Atendimento do resultado da alocação (DataFrame ou
+    ResultadoEmLotes, um lote por vez).
+    """
+    for lote in lotes_resultado(df_resultado):
+        df, fatias = _fatias_por_grupo(lote)
+        for nome, inicio, fim in fatias:
+            yield f"{nome}.{formato}", df.iloc[inicio:fim]
+
+
+def csv_grupo(df_grupo, cabecalho=True):
+    df_grupo = _quantidades_texto(_tipos_exportacao(df_grupo))
+    return df_grupo.to_csv(index=False, header=cabecalho, sep=";", decimal=",").encode("utf-8")
+
+
+def serializar_grupo(df_grupo, formato="csv"):
+    """Conteúdo (bytes) de um grupo no formato pedido."""
+    if formato == "csv":
+        return csv_grupo(df_grupo)
+
+    df_grupo = _tipos_exportacao(df_grupo)
+    buffer = io.BytesIO()
+    if formato == "parquet":
+        df_grupo.to_parquet(buffer, index=False)
+    elif formato == "xlsx":
+        df_grupo.to_excel(buffer, index=False)
+    else:
+        raise ValueError(f"Formato de exportação desconhecido: {formato}")
+    return buffer.getvalue()
+
+
+def escrever_zip_resultados(df_resultado, destino, extras=None, formato="csv", workers=WORKERS_EXPORTACAO):
+    """
+    Grava em `destino` (caminho ou arquivo binário) um ZIP com um arquivo por
+    pedido e empresa. `extras` ({nome: bytes}) são incluídos como estão.
+
+    Só a serialização dos grupos é paralela (`workers` threads): a compressão
+    (deflate) e a gravação acontecem nesta thread, uma entrada por vez, parte
+    a parte e na ordem do arquivo final, enquanto as próximas partes são
+    serializadas. Apenas alguns grupos ficam em memória por vez.
+
+    Um ResultadoEmLotes é exportado lote a lote (cada pedido está inteiro em
+    um lote, então nenhum arquivo se repete no ZIP).
+    """
+    with etapa("exportacao.zip", linhas=len(df_resultado)), \
+            zipfile.ZipFile(destino, "w", zipfile.ZIP_DEFLATED, compresslevel=NIVEL_COMPRESSAO) as zipf:
+        for nome, partes in groupby(_serializar(df_resultado, formato, workers), key=itemgetter(0)):
+            if formato != "csv":
+                # Parquet e XLSX já são comprimidos: armazenados sem nova compressão
+                zipf.writestr(nome, next(partes)[1], compress_type=zipfile.ZIP_STORED)
+                continue
+            with zipf.open(nome, "w") as entrada:
+                for _, conteudo in partes:
+                    entrada.write(conteudo)
+        for nome, conteudo in (extras or {}).items():
+            zipf.writestr(nome, conteudo)
+
+
+def escrever_zip_temporario(df_resultado, extras=None, formato="csv", workers=WORKERS_EXPORTACAO):
+    """
+    Mesmo conteúdo de escrever_zip_resultados, em um arquivo temporário que só
+    vai para o disco acima de LIMITE_ZIP_EM_MEMORIA. Devolve o arquivo
+    posicionado no início.
+    """
+    destino = tempfile.SpooledTemporaryFile(max_size=LIMITE_ZIP_EM_MEMORIA)
+    escrever_zip_resultados(df_resultado, destino, extras=extras, formato=formato, workers=workers)
+    destino.seek(0)
+    return destino
+
+
+def escrever_diretorio_resultados(df_resultado, diretorio, extras=None, formato="csv", workers=WORKERS_EXPORTACAO):
+    """Mesmo conteúdo de escrever_zip_resultados, gravado como arquivos em `diretorio`."""
+    os.makedirs(diretorio, exist_ok=True)
+    for nome, partes in groupby(_serializar(df_resultado, formato, workers), key=itemgetter(0)):
+        with open(os.path.join(diretorio, nome), "wb") as f:
+            for _, conteudo in partes:
+                f.write(conteudo)
+    for nome, conteudo in (extras or {}).items():
+        with open(os.path.join(diretorio, nome), "wb") as f:
+            f.write(conteudo)
+
+
+# =====================================================
+# SERIALIZAÇÃO EM PARALELO (ORDEM PRESERVADA)
+# =====================================================
+def _serializar(df_resultado, formato, workers):
+    """
+    Gera (nome_arquivo, bytes) de cada parte de cada grupo, na ordem do
+    arquivo final, mantendo no máximo 2 * workers partes em andamento.
+    """
+    partes = _partes(df_resultado, formato)
+    if workers <= 1:
+        for nome, serializar in partes:
+            yield nome, serializar()
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pendentes = deque()
+        for nome, serializar in partes:
+            pendentes.append((nome, pool.submit(serializar)))
+            if len(pendentes) >= 2 * workers:
+                nome_pronto, futuro = pendentes.popleft()
+                yield nome_pronto, futuro.result()
+        while pendentes:
+            nome_pronto, futuro = pendentes.popleft()
+            yield nome_pronto, futuro.result()
+
+
+def _partes(df_resultado, formato):
+    # (nome_arquivo, serializar) para cada parte, um lote do resultado por vez
+    for lote in lotes_resultado(df_resultado):
+        yield from _partes_lote(lote, formato)
+
+
+def _partes_lote(df_lote, formato):
+    # CSVs grandes em várias partes
+    df, fatias = _fatias_por_grupo(df_lote)
+
+    if formato != "csv":
+        for nome, inicio, fim in fatias:
+            yield f"{nome}.{formato}", partial(serializar_grupo, df.iloc[inicio:fim], formato)
+        return
+
+    # O texto dos CSVs é preparado por lotes de grupos, não do resultado inteiro
+    for lote in _lotes(fatias, LINHAS_POR_LOTE):
+        inicio_lote, fim_lote = lote[0][1], lote[-1][2]
+        tabela = _tabela_csv(df.iloc[inicio_lote:fim_lote])
+        for nome, inicio, fim in lote:
+            for parte in range(inicio, fim, LINHAS_POR_PARTE):
+                ate = min(parte + LINHAS_POR_PARTE, fim)
+                fatia_tabela = tabela.slice(parte - inicio_lote, ate - parte) if tabela is not None else None
+                yield f"{nome}.csv", partial(_csv_parte, df.iloc[parte:ate], fatia_tabela, parte == inicio)
+
+
+def _lotes(fatias, linhas_por_lote):
+    lote = []
+    for fatia in fatias:
+        lote.append(fatia)
+        if fatia[2] - lote[0][1] >= linhas_por_lote:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def _fatias_por_grupo(df_resultado):
+    # Ordena uma vez pelas chaves (mantendo a ordem das linhas em cada grupo,
+    # como o groupby) e devolve os intervalos contíguos de cada grupo. As
+    # chaves são comparadas como texto, pelos códigos das categorias.
+    if df_resultado.empty:
+        return df_resultado.reset_index(drop=True), []
+
+    chaves = [chave_ordenacao(df_resultado[coluna]) for coluna in CHAVES_GRUPO]
+    ordem = np.lexsort(chaves[::-1])
+    df = df_resultado.take(ordem).reset_index(drop=True)
+
+    chaves = np.column_stack([chave[ordem] for chave in chaves])
+    inicios = np.flatnonzero(np.append(True, (chaves[1:] != chaves[:-1]).any(axis=1)))
+    fins = np.append(inicios[1:], len(df))
+    arquivos = np.asarray(df["Arquivo_Pedido"].take(inicios))
+    empresas = np.asarray(df["Empresa_Atendimento"].take(inicios))
+
+    fatias = [
+        (f"{arquivo.replace('.csv', '')}_{empresa}", int(inicio), int(fim))
+        for arquivo, empresa, inicio, fim in zip(arquivos, empresas, inicios, fins)
+    ]
+    return df, fatias
+
+
+def _tipos_exportacao(df):
+    # Arquivos exportados com os tipos de sempre: quantidades float32 voltam
+    # a float64 (mesmo texto no CSV) e categorias voltam a texto
+    tipos = {}
+    for nome, tipo in df.dtypes.items():
+        if tipo == "float32":
+            tipos[nome] = "float64"
+        elif isinstance(tipo, pd.CategoricalDtype):
+            tipos[nome] = tipo.categories.dtype
+    return df.astype(tipos) if tipos else df
+
+
+def _quantidades_texto(df):
+    # Quantidades inteiras saem sem ",0" (como quando eram lidas como int64);
+    # as fracionárias mantêm o texto do float, com vírgula decimal
+    colunas = [coluna for coluna in COLUNAS_QUANTIDADE if coluna in df.columns and is_float_dtype(df[coluna])]
+    if not colunas:
+        return df
+    df = df.copy()
+    for coluna in colunas:
+        valores = df[coluna].to_numpy(dtype="float64", na_value=np.nan)
+        inteiros = _inteiros(valores)
+        fracionarios = np.flatnonzero(np.isfinite(valores) & ~inteiros)
+        texto = np.full(len(valores), None, dtype=object)
+        texto[inteiros] = valores[inteiros].astype("int64").astype(str)
+        texto[fracionarios] = [repr(float(v)).replace(".", ",") for v in valores[fracionarios]]
+        df[coluna] = texto
+    return df
+
+
+def _inteiros(valores):
+    # Valores inteiros na faixa em que o float é impresso sem notação científica
+    with np.errstate(invalid="ignore"):
+        return np.isfinite(valores) & (np.abs(valores) < 1e15) & (valores == np.round(valores))
+
+
+# =====================================================
+# CSV RÁPIDO VIA PYARROW
+# =====================================================
+def _tabela_csv(df):
+    """
+    Converte o resultado inteiro, uma única vez, em uma tabela Arrow de texto
+    com os números já no formato do CSV (vírgula decimal). Cada grupo é uma
+    fatia dessa tabela, gravada sem segurar o GIL. None se não for possível.
+    """
+    if pa is None:
+        return None
+    try:
+        colunas = {nome: _texto_csv(serie) for nome, serie in df.items()}
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return None
+    return pa.table(colunas)
+
+
+def _texto_csv(serie):
+    if is_float_dtype(serie):
+        return _decimal_virgula(serie, sem_decimal_inteiros=serie.name in COLUNAS_QUANTIDADE)
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        # Cada categoria vira texto uma vez; as linhas só copiam pelo código
+        return pa.array(serie.cat.categories, from_pandas=True).take(pa.array(serie.cat.codes, mask=serie.isna().to_numpy()))
+    return pa.array(serie, from_pandas=True)
+
+
+def _decimal_virgula(serie, sem_decimal_inteiros=False):
+    # Mesmo texto do to_csv do pandas (repr do float), com vírgula decimal;
+    # com sem_decimal_inteiros, os valores inteiros saem sem ",0" (quantidades)
+    valores = serie.to_numpy(dtype="float64", na_value=np.nan)
+    texto = pc.cast(pa.array(valores, from_pandas=True), pa.string())
+    if not sem_decimal_inteiros:
+        inteiros = pc.invert(pc.match_substring_regex(texto, "[.en]"))
+        texto = pc.if_else(inteiros, pc.binary_join_element_wise(texto, ".0", ""), texto)
+
+    # Fora de [1e-4, 1e15) o Arrow e o Python escolhem notações diferentes
+    absolutos = np.abs(valores)
+    extremos = np.flatnonzero(np.isfinite(valores) & ((absolutos >= 1e15) | ((absolutos > 0) & (absolutos < 1e-4))))
+    if extremos.size:
+        texto = texto.to_numpy(zero_copy_only=False)
+        texto[extremos] = [repr(float(v)) for v in valores[extremos]]
+        texto = pa.array(texto, type=pa.string(), from_pandas=True)
+
+    return pc.replace_substring(texto, ".", ",")
+
+
+def _csv_parte(df_parte, tabela_parte, cabecalho):
+    if tabela_parte is not None:
+        buffer = io.BytesIO()
+        if cabecalho:
+            buffer.write((";".join(df_parte.columns) + "\n").encode("utf-8"))
+        try:
+            pa_csv.write_csv(
+                tabela_parte,
+                buffer,
+                pa_csv.WriteOptions(include_header=False, delimiter=";", quoting_style="none")
+            )
+            return buffer.getvalue()
+        except pa.ArrowInvalid:
+            pass  # texto com ';', aspas ou quebras de linha: o pandas coloca aspas
+    return csv_grupo(df_parte, cabecalho)
+
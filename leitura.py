@@ -0,0 +1,116 @@
+import csv
+import io
+import os
+from contextlib import contextmanager
+
+import pandas as pd
+
+# =====================================================
+# CONFIGURAÇÃO DA LEITURA
+# =====================================================
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+
+# Arquivos acima deste tamanho são lidos em blocos de LINHAS_POR_BLOCO linhas
+LIMITE_LEITURA_EM_BLOCOS = 64 * 1024 * 1024
+LINHAS_POR_BLOCO = 500_000
+
+
+# =====================================================
+# CABEÇALHO
+# =====================================================
+def ler_cabecalho(arquivo, sep=";", encoding="latin1"):
+    """
+    Lê apenas a primeira linha do CSV e devolve os nomes das colunas, sem
+    consumir o restante do arquivo.
+    """
+    with _abrir(arquivo) as f:
+        linha = f.readline().decode(encoding).rstrip("\r\n")
+    return next(csv.reader([linha], delimiter=sep), [])
+
+
+# =====================================================
+# LEITURA TIPADA SOMENTE DAS COLUNAS NECESSÁRIAS
+# =====================================================
+def ler_colunas(arquivo, mapa, sep=";", encoding="latin1", em_blocos=None):
+    """
+    Lê do CSV somente as colunas resolvidas em `mapa` ({nome: coluna_original}),
+    todas como texto, e devolve-as com os nomes lógicos. As conversões
+    numéricas ficam a cargo de quem chama (ver numeros_br.parse_br).
+
+    Arquivos grandes (ou em_blocos=True) são lidos em blocos: nesse caso a
+    função devolve um iterador de DataFrames em vez de um único DataFrame.
+    """
+    mapa = {nome: coluna for nome, coluna in mapa.items() if coluna}
+    colunas = list(dict.fromkeys(mapa.values()))
+
+    if em_blocos is None:
+        em_blocos = _tamanho(arquivo) > LIMITE_LEITURA_EM_BLOCOS
+
+    opcoes = dict(sep=sep, encoding=encoding, usecols=colunas, dtype=str)
+
+    if em_blocos:
+        return _ler_em_blocos(arquivo, opcoes, mapa)
+
+    with _abrir(arquivo) as f:
+        if pa is not None:
+            df = _ler_pyarrow(f, colunas, sep, encoding)
+        else:
+            df = pd.read_csv(f, **opcoes)
+    return _nomes_logicos(df, mapa)
+
+
+# =====================================================
+# FUNÇÕES AUXILIARES
+# =====================================================
+def _ler_pyarrow(f, colunas, sep, encoding):
+    # Tipos informados direto ao pyarrow: evita inferência (e perda de zeros à esquerda)
+    tabela = pa_csv.read_csv(
+        f,
+        read_options=pa_csv.ReadOptions(encoding=encoding),
+        parse_options=pa_csv.ParseOptions(delimiter=sep),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=colunas,
+            column_types={c: pa.string() for c in colunas},
+            strings_can_be_null=True,
+        ),
+    )
+    return tabela.to_pandas()
+
+
+def _ler_em_blocos(arquivo, opcoes, mapa):
+    with _abrir(arquivo) as f:
+        for bloco in pd.read_csv(f, chunksize=LINHAS_POR_BLOCO, **opcoes):
+            yield _nomes_logicos(bloco, mapa)
+
+
+def _nomes_logicos(df, mapa):
+    # Uma mesma coluna original pode atender a mais de um nome lógico
+    return pd.DataFrame({nome: df[coluna] for nome, coluna in mapa.items()}, index=df.index)
+
+
+@contextmanager
+def _abrir(arquivo):
+    """
+    Abre um caminho em modo binário ou reposiciona no início um arquivo já
+    aberto (ex.: UploadedFile do Streamlit), sem fechá-lo ao final.
+    """
+    if isinstance(arquivo, (str, os.PathLike)):
+        with open(arquivo, "rb") as f:
+            yield f
+    else:
+        arquivo.seek(0)
+        yield arquivo
+
+
+def _tamanho(arquivo):
+    if isinstance(arquivo, (str, os.PathLike)):
+        return os.path.getsize(arquivo)
+    if hasattr(arquivo, "size"):
+        return arquivo.size
+    if isinstance(arquivo, io.BytesIO):
+        return arquivo.getbuffer().nbytes
+    return 0
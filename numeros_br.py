@@ -0,0 +1,175 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+
+# Padrões avaliados sobre o texto sem "R$" e sem espaços
+_VIRGULA_DECIMAL = r"^-?[\d.]*,\d*$"        # uma vírgula, pontos (milhar) antes dela
+_PONTO_DECIMAL = r"^-?[\d,]*\.\d*$"         # um ponto, vírgulas (milhar) antes dele
+_MILHAR_UNICO = r"^-?[1-9]\d{0,2}\.\d{3}$"  # "1.234": ponto como milhar
+_NUMERO_SIMPLES = r"^-?\d+(?:\.\d+)?$"
+
+# Acima deste valor os centavos deixam de ser exatos em float64 (e depois
+# estouram o int64): esses valores são formatados um a um
+_LIMITE_VETORIZADO = 1e13
+
+
+# =====================================================
+# TEXTO BR -> FLOAT (COLUNA INTEIRA)
+# =====================================================
+def parse_br(serie, ponto_milhar=True):
+    """
+    Converte uma coluna de valores em formato brasileiro para float, de forma
+    vetorizada. Valores vazios ou inválidos viram NaN.
+
+    Regras (as mesmas para pedidos CSV e WhatsApp):
+    - vírgula e ponto presentes: o último é o separador decimal
+      ("1.234,56" -> 1234.56, "1,234.56" -> 1234.56);
+    - só vírgula: uma vírgula é decimal ("12,5" -> 12.5); várias são milhar;
+    - só ponto: vários pontos ou um ponto seguido de 3 dígitos são milhar
+      ("1.234" -> 1234, "1.234.567" -> 1234567); caso contrário é decimal
+      ("12.50" -> 12.5);
+    - "R$" e espaços são ignorados.
+
+    Com ponto_milhar=False (quantidades), um único ponto é sempre decimal
+    ("1.500" -> 1.5), como na leitura original das quantidades; a regra do
+    milhar fica só para valores em R$.
+    """
+    if is_numeric_dtype(serie):
+        return serie.astype("float64")
+    if pa is None:
+        return _parse_br_pandas(serie, ponto_milhar)
+
+    texto = _texto_arrow(serie)
+    for ignorado in ("R$", " "):
+        if pc.any(pc.match_substring(texto, ignorado)).as_py():
+            texto = pc.replace_substring(texto, ignorado, "")
+
+    virgula_decimal = pc.match_substring_regex(texto, _VIRGULA_DECIMAL)
+    ponto_decimal = pc.match_substring_regex(texto, _PONTO_DECIMAL)
+    if ponto_milhar:
+        ponto_decimal = pc.and_(ponto_decimal, pc.invert(pc.match_substring_regex(texto, _MILHAR_UNICO)))
+
+    sem_pontos = pc.replace_substring(texto, ".", "")
+    normalizado = pc.if_else(
+        virgula_decimal,
+        pc.replace_substring(sem_pontos, ",", "."),
+        pc.if_else(
+            ponto_decimal,
+            pc.replace_substring(texto, ",", ""),
+            pc.replace_substring(sem_pontos, ",", "")
+        )
+    )
+
+    valido = pc.match_substring_regex(normalizado, _NUMERO_SIMPLES)
+    valores = pc.cast(pc.if_else(valido, normalizado, None), pa.float64())
+    return pd.Series(valores.to_numpy(zero_copy_only=False), index=serie.index, dtype="float64")
+
+
+def valor_br(texto):
+    """Versão escalar de parse_br (0.0 para vazio ou inválido)."""
+    if not texto:
+        return 0.0
+    valor = parse_br(pd.Series([texto], dtype=object)).iloc[0]
+    return 0.0 if np.isnan(valor) else float(valor)
+
+
+# =====================================================
+# FLOAT -> TEXTO BR (COLUNA INTEIRA)
+# =====================================================
+def formatar_br_serie(serie):
+    """
+    Formata uma coluna numérica como "1.234,56" (duas casas, milhar com ponto),
+    de forma vetorizada e com o mesmo resultado de f"{v:,.2f}". NaN vira texto
+    vazio; infinitos, valores acima de _LIMITE_VETORIZADO e valores a meio
+    centavo do arredondamento são formatados um a um.
+    """
+    valores = pd.to_numeric(serie, errors="coerce").to_numpy(dtype="float64")
+    nulos = np.isnan(valores)
+    escalares = ~nulos & ~(np.abs(valores) < _LIMITE_VETORIZADO)
+    escalados = np.abs(np.where(nulos | escalares, 0, valores)) * 100
+
+    # Perto de meio centavo, o produto por 100 pode arredondar para o lado
+    # errado: a f-string arredonda o valor binário exato
+    escalares |= np.abs(escalados % 1 - 0.5) <= 4 * np.spacing(escalados)
+    centavos = np.round(np.where(escalares, 0, escalados)).astype(np.int64)
+    inteiro, decimais = np.divmod(centavos, 100)
+    # Como na f-string, o sinal vem do valor ("-0,00" para -0,004)
+    negativo = np.signbit(valores)
+
+    formatar = _formatar_br_pandas if pa is None else _formatar_br_arrow
+    resultado = formatar(serie.index, inteiro, decimais, negativo, nulos)
+    if escalares.any():
+        resultado[escalares] = [_formatar_br_escalar(v) for v in valores[escalares]]
+    return resultado
+
+
+def _formatar_br_arrow(indice, inteiro, decimais, negativo, nulos):
+    # Todos os grupos de milhar com 3 dígitos; zeros e pontos à esquerda saem depois
+    n_grupos = (len(str(inteiro.max(initial=0))) - 1) // 3 + 1
+    grupos = [
+        pc.utf8_lpad(pc.cast(pa.array(inteiro // 1000 ** k % 1000), pa.string()), 3, "0")
+        for k in reversed(range(n_grupos))
+    ]
+    texto = pc.binary_join_element_wise(*grupos, ".") if n_grupos > 1 else grupos[0]
+    texto = pc.utf8_ltrim(texto, "0.")
+    texto = pc.if_else(pc.equal(texto, ""), "0", texto)
+
+    texto = pc.binary_join_element_wise(
+        texto, pc.utf8_lpad(pc.cast(pa.array(decimais), pa.string()), 2, "0"), ","
+    )
+    texto = pc.binary_join_element_wise(pc.if_else(pa.array(negativo), "-", ""), texto, "")
+    texto = pc.if_else(pa.array(nulos), "", texto)
+    return pd.Series(texto.to_numpy(zero_copy_only=False), index=indice, dtype=object)
+
+
+def _formatar_br_escalar(v):
+    return f"{v:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def formatar_br(v):
+    """Versão escalar de formatar_br_serie."""
+    return formatar_br_serie(pd.Series([v])).iloc[0]
+
+
+def _texto_arrow(serie):
+    try:
+        return pa.array(serie, type=pa.string(), from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Coluna object com valores não textuais (ex.: números misturados)
+        return pa.array(serie.map(str, na_action="ignore"), type=pa.string(), from_pandas=True)
+
+
+# =====================================================
+# IMPLEMENTAÇÃO SEM PYARROW (MESMAS REGRAS)
+# =====================================================
+def _parse_br_pandas(serie, ponto_milhar=True):
+    texto = serie.astype("string").str.replace("R$", "", regex=False).str.replace(" ", "", regex=False)
+
+    virgula_decimal = texto.str.contains(_VIRGULA_DECIMAL).fillna(False)
+    ponto_decimal = texto.str.contains(_PONTO_DECIMAL).fillna(False)
+    if ponto_milhar:
+        ponto_decimal &= ~texto.str.contains(_MILHAR_UNICO).fillna(False)
+
+    sem_pontos = texto.str.replace(".", "", regex=False)
+    normalizado = sem_pontos.str.replace(",", "", regex=False)
+    normalizado = normalizado.where(~ponto_decimal, texto.str.replace(",", "", regex=False))
+    normalizado = normalizado.where(~virgula_decimal, sem_pontos.str.replace(",", ".", regex=False))
+
+    valido = normalizado.str.contains(_NUMERO_SIMPLES).fillna(False)
+    return normalizado.where(valido, "nan").astype("float64")
+
+
+def _formatar_br_pandas(indice, inteiro, decimais, negativo, nulos):
+    texto = [
+        f"{'-' if neg else ''}{i:,}".replace(",", ".") + f",{d:02d}"
+        for i, d, neg in zip(inteiro.tolist(), decimais.tolist(), negativo.tolist())
+    ]
+    resultado = pd.Series(texto, index=indice, dtype=object)
+    resultado[nulos] = ""
+    return resultado
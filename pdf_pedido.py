@@ -0,0 +1,233 @@
+import multiprocessing
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import chain, islice
+
+from fpdf import FPDF
+
+from diagnostico import etapa
+from exportacao import grupos_resultado
+from pedidos import WORKERS_PADRAO
+from whatsapp import montar_dados_para_pdf
+
+# Documentos em andamento por processo do pool (os demais esperam no iterável)
+DOCUMENTOS_POR_WORKER = 4
+
+
+# =====================================================
+# PDF OFICIAL ZIONNE
+# =====================================================
+class PedidoPDF(FPDF):
+
+    def __init__(self, emissao=None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Em lote, todos os documentos compartilham o mesmo carimbo de emissão
+        self.emissao = emissao or datetime.now().strftime('%d/%m/%Y %H:%M')
+
+    def header(self):
+        self.set_font("Arial", "B", 14)
+        self.cell(0, 8, "PEDIDO DE VENDA - FEIRA ABUP SHOW HOME", 0, 1, "C")
+        self.set_font("Arial", "", 9)
+        self.cell(
+            0, 5,
+            f"Emissão: {self.emissao}",
+            0, 1, "R"
+        )
+        self.ln(3)
+
+    def footer(self):
+        self.set_y(-22)
+        self.set_font("Arial", "", 8)
+        self.cell(0, 4, "Instagram: @zionne.oficial", 0, 1, "C")
+        self.cell(0, 4, "Telefone / WhatsApp: (41) 3043-0595", 0, 1, "C")
+        self.cell(0, 4, "Site: zionne.com.br | E-mail: comercial@zionne.com", 0, 1, "C")
+        self.cell(0, 4, "R. Gen. Mário Tourinho, 2465 - Curitiba - PR", 0, 0, "C")
+
+def gerar_pdf(
+    dados_cliente,
+    carrinho,
+    total,
+    cond_pag,
+    frete,
+    obs,
+    cnpj,
+    telefone,
+    email,
+    ie,
+    emissao=None
+):
+    pdf = PedidoPDF(emissao)
+    pdf.add_page()
+    pdf.set_auto_page_break(auto=True, margin=25)
+
+    pdf.set_font("Arial", "B", 10)
+    pdf.cell(0, 6, "DADOS DO CLIENTE", 0, 1)
+    pdf.set_font("Arial", "", 9)
+
+    pdf.cell(0, 5, f"Cliente: {dados_cliente.get('razao','')}", 0, 1)
+    pdf.cell(0, 5, f"CNPJ: {cnpj}    IE: {ie}", 0, 1)
+    pdf.cell(0, 5, f"Telefone: {telefone}    E-mail: {email}", 0, 1)
+
+    pdf.multi_cell(
+        0, 5,
+        f"Endereço:\n{dados_cliente.get('endereco_linha1','')}\n{dados_cliente.get('endereco_linha2','')}"
+    )
+
+    pdf.ln(3)
+
+    pdf.set_font("Arial", "B", 9)
+    pdf.cell(10, 6, "Item", 1)
+    pdf.cell(25, 6, "Código", 1)
+    pdf.cell(90, 6, "Descrição", 1)
+    pdf.cell(15, 6, "Qtde", 1)
+    pdf.cell(25, 6, "Vlr Unit", 1)
+    pdf.cell(25, 6, "Vlr Total", 1, 1)
+
+    pdf.set_font("Arial", "", 9)
+
+    cell = pdf.cell
+    for i, item in enumerate(carrinho, start=1):
+        cell(10, 6, str(i), 1)
+        cell(25, 6, item["codigo"], 1)
+        cell(90, 6, item["descricao"], 1)
+        cell(15, 6, str(item["qtd"]), 1, 0, "C")
+        cell(25, 6, f"{item['preco']:.2f}", 1, 0, "R")
+        cell(25, 6, f"{item['total']:.2f}", 1, 1, "R")
+
+    pdf.ln(4)
+    pdf.set_font("Arial", "B", 10)
+    pdf.cell(130, 6, "")
+    pdf.cell(30, 6, "TOTAL:", 1)
+    pdf.cell(30, 6, f"{total:.2f}", 1, 1, "R")
+
+    pdf.ln(4)
+    pdf.set_font("Arial", "", 9)
+    pdf.multi_cell(0, 5, f"Pagamento: {cond_pag}")
+    pdf.multi_cell(0, 5, f"Frete: {frete}")
+    pdf.multi_cell(0, 5, f"Observações: {obs}")
+
+    return pdf.output(dest="S").encode("latin1")
+
+
+# =====================================================
+# PDF A PARTIR DO TEXTO DO PEDIDO (WHATSAPP)
+# =====================================================
+def parametros_pdf_pedido(texto, df_itens, dados_cliente, total, endereco=None):
+    dados_pdf, carrinho = montar_dados_para_pdf(
+        dados_cliente, df_itens, texto, endereco
+    )
+
+    return dict(
+        dados_cliente=dados_pdf,
+        carrinho=carrinho,
+        total=total,
+        cond_pag="Conforme combinado",
+        frete="A combinar",
+        obs="Pedido gerado via WhatsApp",
+        cnpj=dados_cliente.get("CNPJ"),
+        telefone=dados_cliente.get("Telefone"),
+        email=dados_cliente.get("Email"),
+        ie=dados_cliente.get("IE")
+    )
+
+def gerar_pdf_pedido(texto, df_itens, dados_cliente, total, endereco=None):
+    return gerar_pdf(**parametros_pdf_pedido(texto, df_itens, dados_cliente, total, endereco))
+
+
+# =====================================================
+# PDFs EM LOTE (POOL DE PROCESSOS -> ZIP)
+# =====================================================
+def gerar_pdfs_em_lote(documentos, destino, workers=WORKERS_PADRAO):
+    """
+    Renderiza vários PDFs e grava em `destino` (caminho ou arquivo binário) um
+    ZIP com todos eles, na ordem recebida.
+
+    `documentos` é um iterável de (nome_arquivo, parametros), onde
+    parametros são os argumentos nomeados de gerar_pdf.
+    """
+    with zipfile.ZipFile(destino, "w", zipfile.ZIP_DEFLATED) as zipf:
+        escrever_pdfs(zipf, documentos, workers=workers)
+
+
+def escrever_pdfs(zipf, documentos, workers=WORKERS_PADRAO):
+    """
+    Renderiza os documentos em um pool de processos e os grava no ZIP já
+    aberto `zipf`. Todos recebem o mesmo carimbo de emissão.
+
+    `documentos` é consumido aos poucos: no máximo DOCUMENTOS_POR_WORKER *
+    workers documentos ficam em andamento por vez.
+    """
+    emissao = datetime.now().strftime('%d/%m/%Y %H:%M')
+    documentos = ((nome, dict(p, emissao=emissao)) for nome, p in documentos)
+
+    with etapa("pdf.lote") as registro:
+        registro["linhas"] = _gravar_pdfs(zipf, documentos, workers)
+
+
+def _gravar_pdfs(zipf, documentos, workers):
+    # Grava os PDFs na ordem recebida e devolve quantos foram gravados
+    def gravar(nome, pdf_bytes):
+        # O conteúdo do PDF já é comprimido pelo FPDF: armazenar sem recomprimir
+        zipf.writestr(nome, pdf_bytes, compress_type=zipfile.ZIP_STORED)
+
+    primeiros = list(islice(documentos, 2))
+    documentos = chain(primeiros, documentos)
+    total = 0
+    if workers <= 1 or len(primeiros) <= 1:
+        for nome, parametros in documentos:
+            gravar(nome, _renderizar(parametros))
+            total += 1
+        return total
+
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=contexto) as pool:
+        pendentes = deque()
+        for nome, parametros in documentos:
+            pendentes.append((nome, pool.submit(_renderizar, parametros)))
+            total += 1
+            if len(pendentes) >= DOCUMENTOS_POR_WORKER * workers:
+                nome_pronto, futuro = pendentes.popleft()
+                gravar(nome_pronto, futuro.result())
+        while pendentes:
+            nome_pronto, futuro = pendentes.popleft()
+            gravar(nome_pronto, futuro.result())
+    return total
+
+
+def documentos_alocacao(df_resultado):
+    """
+    Itera (nome_pdf, parametros de gerar_pdf) para cada Arquivo_Pedido e
+    Empresa_Atendimento do resultado da alocação (mesmos nomes do ZIP de
+    CSVs), montando cada documento só quando ele é pedido.
+    """
+    for nome_pdf, df_grupo in grupos_resultado(df_resultado, "pdf"):
+        arquivo = df_grupo["Arquivo_Pedido"].iloc[0]
+        empresa = df_grupo["Empresa_Atendimento"].iloc[0]
+        carrinho = [
+            {"codigo": codigo, "descricao": "", "qtd": f"{qtd:g}", "preco": preco, "total": total}
+            for codigo, qtd, preco, total in zip(
+                df_grupo["Codigo"],
+                df_grupo["Quantidade_Pedido"],
+                df_grupo["Valor_Unitario"],
+                df_grupo["Valor_Item"],
+            )
+        ]
+        cnpjs = ", ".join(df_grupo["CNPJ"].astype(str).unique())
+        yield nome_pdf, {
+            "dados_cliente": {"razao": cnpjs, "endereco_linha1": "", "endereco_linha2": ""},
+            "carrinho": carrinho,
+            "total": float(df_grupo["Valor_Item"].sum()),
+            "cond_pag": "Conforme combinado",
+            "frete": "A combinar",
+            "obs": f"Pedido {arquivo} - atendimento: {empresa}",
+            "cnpj": cnpjs,
+            "telefone": "",
+            "email": "",
+            "ie": "",
+        }
+
+
+def _renderizar(parametros):
+    return gerar_pdf(**parametros)
@@ -0,0 +1,139 @@
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from diagnostico import etapa
+from esquema import Regra, normalizar_codigos, resolver_colunas
+from leitura import ler_cabecalho, ler_colunas
+from numeros_br import parse_br
+from tipos import compactar
+
+# Colunas do pedido e os possíveis nomes no CSV (em ordem de prioridade)
+REGRAS_PEDIDO = {
+    "Codigo": Regra(("CODIGO", "COD_PROD", "CODPROD", "PRODUTO"), excluir=("DESCR", "NOME")),
+    "Quantidade": Regra(("QUANTIDADE", "QTDE", "QTD")),
+    "CNPJ": Regra(("CNPJ", "CNPJ_CLIENTE", "CPF_CNPJ", "CLIENTE"), excluir=("NOME", "RAZAO")),
+    "Valor_Unitario": Regra(("VALOR_UNITARIO", "VL_UNIT", "PRECO", "VALOR"), excluir=("TOTAL",)),
+    "Total": Regra(("TOTAL", "VALOR_TOTAL", "VL_TOTAL")),
+}
+
+# Processos usados por padrão para ler vários pedidos em paralelo
+WORKERS_PADRAO = min(8, os.cpu_count() or 1)
+
+COLUNAS_PEDIDO = ["CNPJ", "Codigo", "Quantidade", "Valor_Unitario", "Total_Item", "Arquivo_Pedido"]
+
+
+class ColunasPedidoError(ValueError):
+    """O pedido não contém as colunas obrigatórias (Codigo e Quantidade)."""
+
+
+# =====================================================
+# LER E NORMALIZAR UM ARQUIVO DE PEDIDO
+# =====================================================
+def ler_pedido(arquivo, nome_arquivo):
+    """
+    Lê um CSV de pedido (somente as colunas necessárias) e devolve as linhas
+    normalizadas com as colunas de COLUNAS_PEDIDO.
+    """
+    with etapa("pedidos.esquema"):
+        mapa = resolver_colunas(ler_cabecalho(arquivo), REGRAS_PEDIDO)
+
+    if not mapa["Codigo"] or not mapa["Quantidade"]:
+        raise ColunasPedidoError(f"Pedido {nome_arquivo} ignorado: colunas obrigatórias não encontradas.")
+
+    with etapa("pedidos.leitura_csv") as registro:
+        df_pedido = ler_colunas(arquivo, mapa, em_blocos=False)
+        registro["linhas"] = len(df_pedido)
+
+    with etapa("pedidos.normalizacao", linhas=len(df_pedido)):
+        return _normalizar_pedido(df_pedido, mapa, nome_arquivo)
+
+
+def _normalizar_pedido(df_pedido, mapa, nome_arquivo):
+    # Normalizar dados do pedido
+    df_pedido["Codigo"] = normalizar_codigos(df_pedido["Codigo"])
+    df_pedido["Quantidade"] = parse_br(df_pedido["Quantidade"], ponto_milhar=False).fillna(0)
+
+    # Calcular valor do item (parse_br converte a coluna inteira no formato brasileiro)
+    if mapa["Total"]:
+        df_pedido["Total_Item"] = parse_br(df_pedido["Total"]).fillna(0.0)
+        df_pedido["Valor_Unitario"] = (
+            df_pedido["Total_Item"] /
+            df_pedido["Quantidade"].replace(0, 1)
+        )
+
+    elif mapa["Valor_Unitario"]:
+        df_pedido["Valor_Unitario"] = parse_br(df_pedido["Valor_Unitario"]).fillna(0.0)
+        df_pedido["Total_Item"] = (
+            df_pedido["Quantidade"] *
+            df_pedido["Valor_Unitario"]
+        )
+
+    else:
+        df_pedido["Valor_Unitario"] = 0
+        df_pedido["Total_Item"] = 0
+
+    # Normalizar CNPJ
+    if mapa["CNPJ"]:
+        df_pedido["CNPJ"] = df_pedido["CNPJ"].astype(str).str.replace(r"\D", "", regex=True)
+    else:
+        df_pedido["CNPJ"] = nome_arquivo
+
+    # Filtrar pedidos válidos
+    df_pedido = df_pedido.dropna(subset=["Codigo"])
+    df_pedido["Arquivo_Pedido"] = nome_arquivo
+
+    # Códigos, CNPJ e arquivo como categorias; quantidades em float32 se exato
+    return compactar(df_pedido[COLUNAS_PEDIDO].copy())
+
+
+# =====================================================
+# LER VÁRIOS PEDIDOS EM PARALELO
+# =====================================================
+def ler_pedidos(arquivos, workers=WORKERS_PADRAO, ao_concluir=None):
+    """
+    Lê e normaliza vários pedidos, recebidos como pares (nome_arquivo, conteudo),
+    em um pool de processos. `conteudo` são os bytes do CSV ou o caminho do
+    arquivo (lido só quando chega a sua vez).
+
+    Devolve uma lista de (df_pedido, aviso) na mesma ordem de `arquivos`: o
+    aviso vem preenchido (e df_pedido é None) quando faltam colunas
+    obrigatórias. `ao_concluir(concluidos, total)` é chamado a cada arquivo
+    terminado, na ordem de conclusão; se lançar uma exceção (ex.: tarefa
+    cancelada), os arquivos ainda não iniciados são descartados.
+    """
+    total = len(arquivos)
+    resultados = [None] * total
+
+    if workers <= 1 or total <= 1:
+        for i, (nome, conteudo) in enumerate(arquivos):
+            resultados[i] = _ler_pedido_conteudo(nome, conteudo)
+            if ao_concluir:
+                ao_concluir(i + 1, total)
+        return resultados
+
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(workers, total), mp_context=contexto) as pool:
+        futuros = {
+            pool.submit(_ler_pedido_conteudo, nome, conteudo): i
+            for i, (nome, conteudo) in enumerate(arquivos)
+        }
+        try:
+            for concluidos, futuro in enumerate(as_completed(futuros), start=1):
+                resultados[futuros[futuro]] = futuro.result()
+                if ao_concluir:
+                    ao_concluir(concluidos, total)
+        except BaseException:
+            pool.shutdown(cancel_futures=True)
+            raise
+
+    return resultados
+
+
+def _ler_pedido_conteudo(nome_arquivo, conteudo):
+    arquivo = conteudo if isinstance(conteudo, (str, os.PathLike)) else io.BytesIO(conteudo)
+    try:
+        return ler_pedido(arquivo, nome_arquivo), None
+    except ColunasPedidoError as e:
+        return None, str(e)
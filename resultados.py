@@ -0,0 +1,166 @@
+import os
+import shutil
+import tempfile
+import warnings
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from diagnostico import etapa
+from tipos import codigos, concatenar
+
+try:
+    import pyarrow  # noqa: F401 (necessário para gravar os lotes em Parquet)
+except ImportError:
+    pyarrow = None
+
+# Acima deste total em memória (MB), os lotes do resultado vão para arquivos Parquet
+LIMITE_RESULTADO_EM_MEMORIA_MB = int(os.environ.get("RESULTADO_MEMORIA_MAX_MB", "512"))
+
+
+# =====================================================
+# RESULTADO DA ALOCAÇÃO EM LOTES (MEMÓRIA OU PARQUET)
+# =====================================================
+class ResultadoEmLotes:
+    """
+    Resultado da alocação guardado em lotes colunares (DataFrames com as
+    `colunas` informadas, ou as do primeiro lote), sem montar um único
+    DataFrame com todas as linhas.
+
+    Enquanto o total em memória fica abaixo de `limite_memoria_mb`, os lotes
+    ficam em memória; acima dele, são gravados juntos em um arquivo Parquet
+    temporário e liberados. lotes() devolve um lote por vez (os gravados são
+    lidos de volta só quando chega a vez deles), e os arquivos são apagados
+    quando o resultado deixa de ser usado. Sem pyarrow, tudo fica em memória
+    (com um RuntimeWarning ao passar do limite).
+
+    Cada Arquivo_Pedido vem inteiro em um único lote: resumos e exportação
+    tratam cada lote de forma independente e só somam os parciais.
+    """
+
+    def __init__(self, colunas=None, limite_memoria_mb=LIMITE_RESULTADO_EM_MEMORIA_MB):
+        self.colunas = list(colunas) if colunas is not None else None
+        self.limite_memoria = limite_memoria_mb * 1024 * 1024
+        self.linhas = 0
+        self._memoria = []
+        self._bytes_memoria = 0
+        self._arquivos = []
+        self._inicios = []
+        self._diretorio = None
+
+    def __len__(self):
+        return self.linhas
+
+    @property
+    def lotes_em_disco(self):
+        return len(self._arquivos)
+
+    @property
+    def total_lotes(self):
+        return len(self._arquivos) + (1 if self._memoria else 0)
+
+    def adicionar(self, df_lote):
+        """
+        Acrescenta as linhas de `df_lote` (um ou mais Arquivo_Pedido
+        completos). Lotes maiores que o limite são divididos por arquivo.
+        """
+        if df_lote.empty:
+            return
+        if self.colunas is None:
+            self.colunas = list(df_lote.columns)
+        for parte in _partes_por_arquivo(df_lote, self.limite_memoria if pyarrow is not None else 0):
+            if list(parte.columns) != self.colunas:
+                parte = parte[self.colunas]
+            tamanho = int(parte.memory_usage(deep=True).sum())
+            self._memoria.append(parte)
+            self._bytes_memoria += tamanho
+            self.linhas += len(parte)
+            if pyarrow is not None and self._bytes_memoria > self.limite_memoria:
+                self._gravar()
+            elif self._bytes_memoria > self.limite_memoria >= self._bytes_memoria - tamanho:
+                # Sem pyarrow não há como gravar: avisa uma vez, ao passar do limite
+                warnings.warn(
+                    f"Resultado acima de {self.limite_memoria // (1024 * 1024)} MB mantido em memória: "
+                    "instale pyarrow para gravar os lotes em Parquet.",
+                    RuntimeWarning,
+                    stacklevel=2
+                )
+
+    def lotes(self, colunas=None):
+        """
+        Itera os lotes como DataFrames, na ordem em que foram adicionados
+        (apenas `colunas`, se informadas).
+        """
+        for posicao in range(self.total_lotes):
+            yield self.lote(posicao, colunas)
+
+    def lote(self, posicao, colunas=None):
+        """
+        Lote na posição `posicao`: os gravados em disco vêm primeiro, lidos do
+        Parquet; o último reúne os lotes ainda em memória. O índice de cada
+        lote continua a numeração do anterior (posição da linha no resultado).
+        """
+        todas = colunas is None or list(colunas) == self.colunas
+        colunas = self.colunas if colunas is None else list(colunas)
+        if posicao < len(self._arquivos):
+            with etapa("resultado.ler_lote") as registro:
+                df_lote = pd.read_parquet(self._arquivos[posicao], columns=colunas)
+                registro["linhas"] = len(df_lote)
+            df_lote.index = pd.RangeIndex(self._inicios[posicao], self._inicios[posicao] + len(df_lote))
+            return df_lote
+
+        if len(self._memoria) > 1:
+            self._memoria = [concatenar(self._memoria)]
+        df_lote = self._memoria[0] if todas else self._memoria[0][colunas]
+        inicio = self._linhas_em_disco()
+        return df_lote.set_axis(pd.RangeIndex(inicio, self.linhas)) if inicio else df_lote
+
+    def _gravar(self):
+        # Junta os lotes em memória em um arquivo Parquet e os libera
+        if self._diretorio is None:
+            self._diretorio = tempfile.mkdtemp(prefix="resultado_alocacao_")
+            weakref.finalize(self, shutil.rmtree, self._diretorio, ignore_errors=True)
+        caminho = os.path.join(self._diretorio, f"lote_{len(self._arquivos):05d}.parquet")
+        df_lote = concatenar(self._memoria)
+        with etapa("resultado.gravar_lote", linhas=len(df_lote)):
+            df_lote.to_parquet(caminho, index=False)
+        self._inicios.append(self._linhas_em_disco())
+        self._arquivos.append(caminho)
+        self._memoria = []
+        self._bytes_memoria = 0
+
+    def _linhas_em_disco(self):
+        return self.linhas - sum(len(df_lote) for df_lote in self._memoria)
+
+
+def lotes_resultado(resultado, colunas=None):
+    """Lotes de um ResultadoEmLotes, ou o próprio DataFrame como lote único."""
+    if isinstance(resultado, pd.DataFrame):
+        return [resultado if colunas is None else resultado[list(colunas)]]
+    return resultado.lotes(colunas)
+
+
+# =====================================================
+# FUNÇÕES AUXILIARES
+# =====================================================
+def _partes_por_arquivo(df_lote, limite_bytes):
+    # Partes de até ~limite_bytes sem dividir nenhum Arquivo_Pedido; as linhas
+    # de cada arquivo ficam juntas, na ordem original
+    tamanho = int(df_lote.memory_usage(deep=True).sum())
+    if not limite_bytes or tamanho <= limite_bytes:
+        return [df_lote]
+
+    arquivo = codigos(df_lote["Arquivo_Pedido"])
+    ordem = np.argsort(arquivo, kind="stable")
+    inicios = np.flatnonzero(np.append(True, arquivo[ordem][1:] != arquivo[ordem][:-1]))
+    linhas_por_parte = max(1, len(df_lote) * limite_bytes // tamanho)
+
+    partes = []
+    inicio = 0
+    for corte in inicios[1:]:
+        if corte - inicio >= linhas_por_parte:
+            partes.append(df_lote.take(ordem[inicio:corte]).reset_index(drop=True))
+            inicio = corte
+    partes.append(df_lote.take(ordem[inicio:]).reset_index(drop=True))
+    return partes
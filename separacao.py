@@ -0,0 +1,188 @@
+import numpy as np
+import pandas as pd
+
+from diagnostico import etapa
+from resultados import lotes_resultado
+from tipos import categoria, chave_ordenacao, codigos, concatenar, quantidade
+
+COLUNAS_SEPARACAO = [
+    "Empresa_Atendimento",
+    "Codigo",
+    "Quantidade_Separar",
+    "Pedidos",
+    "Estoque",
+    "Estoque_Restante",
+    "Falta",
+]
+
+COLUNAS_REPOSICAO = [
+    "Codigo",
+    "Quantidade_Pedida",
+    "Estoque_Total",
+    "Falta",
+    "Pedidos_Afetados",
+]
+
+# Colunas do resultado lidas para o resumo
+_COLUNAS_LIDAS = ["Empresa_Atendimento", "Codigo", "Arquivo_Pedido", "Quantidade_Pedido"]
+
+
+# =====================================================
+# LISTA DE SEPARAÇÃO E REPOSIÇÃO (CONSOLIDADAS)
+# =====================================================
+def resumir_separacao(df_resultado, indice_estoque):
+    """
+    Consolida o resultado da alocação (DataFrame ou ResultadoEmLotes)
+    agrupado por Empresa_Atendimento e Codigo. Devolve (df_separacao,
+    df_reposicao):
+
+    - df_separacao: uma linha por empresa e produto com a quantidade a
+      separar, o número de pedidos (Arquivo_Pedido) com o produto, o estoque
+      do grupo (indice_estoque), o que sobra após a separação e a falta. As
+      linhas "SEM ESTOQUE" têm estoque zero: toda a quantidade é falta.
+    - df_reposicao: um produto por linha com falta em alguma empresa (soma das
+      faltas), o total pedido, o estoque de todos os grupos e os pedidos
+      afetados, da maior para a menor falta.
+
+    Cada lote é agrupado pelos códigos inteiros das categorias e só os
+    parciais (um por empresa e produto) são somados; como cada pedido está
+    em um único lote, as contagens de pedidos também se somam. Com mais de
+    um lote, os pedidos afetados pedem uma segunda passada pelos lotes. O
+    estoque é consultado uma vez por produto distinto.
+    """
+    with etapa("separacao.resumo", linhas=len(df_resultado)):
+        parciais = []
+        for lote in lotes_resultado(df_resultado, _COLUNAS_LIDAS):
+            parciais.append(_agrupar_lote(lote))
+        if not parciais:
+            parciais.append(_agrupar_lote(pd.DataFrame(columns=_COLUNAS_LIDAS)))
+
+        # Soma dos parciais por chave densa (empresa, produto) sobre as categorias unidas
+        grupos = concatenar(grupos for grupos, _ in parciais)
+        empresa = categoria(grupos["Empresa_Atendimento"])
+        codigo = categoria(grupos["Codigo"])
+        total_codigos = len(codigo.categories)
+        tamanho = len(empresa.categories) * total_codigos
+        chave = empresa.codes.astype("int64") * total_codigos + codigo.codes
+        separar = np.bincount(chave, weights=grupos["Quantidade_Separar"].to_numpy(), minlength=tamanho)
+        pedidos = np.bincount(chave, weights=grupos["Pedidos"].to_numpy(), minlength=tamanho).astype("int64")
+
+        chaves = np.flatnonzero(np.bincount(chave, minlength=tamanho))
+        separar = separar[chaves]
+        pedidos = pedidos[chaves]
+
+        empresa_grupo = chaves // total_codigos
+        codigo_grupo = chaves % total_codigos
+
+        # Estoque de cada produto distinto em cada grupo (zero fora do índice e para SEM ESTOQUE)
+        tabela = np.clip(indice_estoque.to_numpy(dtype="float64"), 0, None)
+        linha = indice_estoque.index.get_indexer(codigo.categories)
+        coluna = indice_estoque.columns.get_indexer(empresa.categories)
+        estoque_codigo = np.zeros((total_codigos, tabela.shape[1]))
+        estoque_codigo[linha >= 0] = tabela[linha[linha >= 0]]
+        estoque_codigo = np.column_stack([estoque_codigo, np.zeros(total_codigos)])
+        estoque = estoque_codigo[codigo_grupo, coluna[empresa_grupo]]
+
+        falta = np.clip(separar - estoque, 0, None)
+        df_separacao = pd.DataFrame({
+            "Empresa_Atendimento": pd.Categorical.from_codes(empresa_grupo, dtype=empresa.dtype),
+            "Codigo": pd.Categorical.from_codes(codigo_grupo, dtype=codigo.dtype),
+            "Quantidade_Separar": quantidade(separar),
+            "Pedidos": pedidos,
+            "Estoque": quantidade(estoque),
+            "Estoque_Restante": quantidade(np.clip(estoque - separar, 0, None)),
+            "Falta": quantidade(falta),
+        }, columns=COLUNAS_SEPARACAO)
+        ordem = np.lexsort((chave_ordenacao(df_separacao["Codigo"]), empresa_grupo))
+        df_separacao = df_separacao.iloc[ordem].reset_index(drop=True)
+
+        # Pedidos distintos com falta no produto (um pedido pode faltar em mais de
+        # um grupo); com um único lote, os pares (grupo, pedido) já estão prontos
+        falta_chave = np.zeros(tamanho)
+        falta_chave[chaves] = falta
+        if len(parciais) > 1:
+            parciais = (_agrupar_lote(lote) for lote in lotes_resultado(df_resultado, _COLUNAS_LIDAS))
+        pedidos_afetados = np.zeros(total_codigos, dtype="int64")
+        for grupos_lote, pares in parciais:
+            pedidos_afetados += _afetados_lote(grupos_lote, pares, empresa, codigo, falta_chave)
+
+        df_reposicao = _reposicao(codigo, codigo_grupo, separar, falta, estoque_codigo, pedidos_afetados)
+    return df_separacao, df_reposicao
+
+
+# =====================================================
+# FUNÇÕES AUXILIARES
+# =====================================================
+def _agrupar_lote(lote):
+    """
+    Soma de um lote por (empresa, produto): DataFrame com Empresa_Atendimento,
+    Codigo, Quantidade_Separar e Pedidos, e os pares distintos (linha do
+    DataFrame, pedido) usados para contar os pedidos afetados.
+    """
+    empresa = categoria(lote["Empresa_Atendimento"])
+    codigo = categoria(lote["Codigo"])
+    arquivo = codigos(lote["Arquivo_Pedido"])
+    total_codigos = len(codigo.categories)
+    total_arquivos = int(arquivo.max()) + 1 if len(arquivo) else 1
+
+    validas = (empresa.codes >= 0) & (codigo.codes >= 0)
+    chave = empresa.codes[validas].astype("int64") * total_codigos + codigo.codes[validas]
+    arquivo = arquivo[validas]
+
+    # Chave densa (empresa, produto): somas por bincount, sem ordenar as linhas.
+    # Pares (chave, arquivo) distintos, por tabela hash, contam os pedidos
+    tamanho = len(empresa.categories) * total_codigos
+    separar = np.bincount(
+        chave,
+        weights=lote["Quantidade_Pedido"].to_numpy(dtype="float64")[validas],
+        minlength=tamanho
+    )
+    pares = pd.unique(chave * total_arquivos + arquivo)
+    par_chave, par_arquivo = np.divmod(pares, total_arquivos)
+    pedidos = np.bincount(par_chave, minlength=tamanho)
+
+    chaves = np.flatnonzero(np.bincount(chave, minlength=tamanho))
+    linha_chave = np.full(tamanho, -1)
+    linha_chave[chaves] = np.arange(len(chaves))
+
+    grupos = pd.DataFrame({
+        "Empresa_Atendimento": pd.Categorical.from_codes(chaves // total_codigos, dtype=empresa.dtype),
+        "Codigo": pd.Categorical.from_codes(chaves % total_codigos, dtype=codigo.dtype),
+        "Quantidade_Separar": separar[chaves],
+        "Pedidos": pedidos[chaves],
+    })
+    return grupos, (linha_chave[par_chave], par_arquivo, total_arquivos)
+
+
+def _afetados_lote(grupos_lote, pares, empresa, codigo, falta_chave):
+    # Pedidos distintos do lote com falta, por produto (códigos das categorias unidas)
+    linha, arquivo, total_arquivos = pares
+    empresa_lote = categoria(grupos_lote["Empresa_Atendimento"])
+    codigo_lote = categoria(grupos_lote["Codigo"])
+    codigo_global = codigo.categories.get_indexer(codigo_lote.categories)[codigo_lote.codes]
+    chave_global = (
+        empresa.categories.get_indexer(empresa_lote.categories)[empresa_lote.codes].astype("int64")
+        * len(codigo.categories) + codigo_global
+    )
+
+    com_falta = falta_chave[chave_global[linha]] > 0
+    afetados = pd.unique(codigo_global[linha[com_falta]].astype("int64") * total_arquivos + arquivo[com_falta])
+    return np.bincount(afetados // total_arquivos, minlength=len(codigo.categories))
+
+
+def _reposicao(codigo, codigo_grupo, separar, falta, estoque_codigo, pedidos_afetados):
+    # Totais por produto a partir dos grupos (empresa, produto) já somados
+    total_codigos = len(codigo.categories)
+    pedida = np.bincount(codigo_grupo, weights=separar, minlength=total_codigos)
+    falta_codigo = np.bincount(codigo_grupo, weights=falta, minlength=total_codigos)
+
+    com_falta = np.flatnonzero(falta_codigo > 0)
+    df_reposicao = pd.DataFrame({
+        "Codigo": pd.Categorical.from_codes(com_falta, dtype=codigo.dtype),
+        "Quantidade_Pedida": quantidade(pedida[com_falta]),
+        "Estoque_Total": quantidade(estoque_codigo[com_falta].sum(axis=1)),
+        "Falta": quantidade(falta_codigo[com_falta]),
+        "Pedidos_Afetados": pedidos_afetados[com_falta],
+    }, columns=COLUNAS_REPOSICAO)
+    ordem = np.lexsort((chave_ordenacao(df_reposicao["Codigo"]), -falta_codigo[com_falta]))
+    return df_reposicao.iloc[ordem].reset_index(drop=True)
@@ -0,0 +1,165 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from diagnostico import ativar
+
+# Tarefas executadas ao mesmo tempo (as demais esperam na fila)
+WORKERS_TAREFAS = 2
+
+# Tarefas terminadas guardadas até serem retiradas (as mais antigas saem primeiro)
+TAREFAS_TERMINADAS_MAX = 8
+
+NA_FILA = "na fila"
+EXECUTANDO = "executando"
+CONCLUIDA = "concluída"
+CANCELADA = "cancelada"
+ERRO = "erro"
+
+
+class TarefaCancelada(Exception):
+    """A tarefa foi cancelada antes de terminar."""
+
+
+# =====================================================
+# UMA TAREFA EM SEGUNDO PLANO
+# =====================================================
+class Tarefa:
+    """
+    Estado de uma tarefa enviada a GerenciadorTarefas: situação, etapa atual,
+    progresso (concluidos de total), resultado ou erro.
+
+    A função executada recebe a própria tarefa e informa o andamento com
+    progresso e etapa; ambos lançam TarefaCancelada se o cancelamento foi
+    pedido, interrompendo a tarefa no próximo ponto de verificação.
+    """
+
+    def __init__(self, chave, diagnostico=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.chave = chave
+        self.diagnostico = diagnostico
+        self.situacao = NA_FILA
+        self.etapa = ""
+        self.concluidos = 0
+        self.total = 0
+        self.resultado = None
+        self.erro = None
+        self.criada_em = time.time()
+        self.terminada_em = None
+        self._cancelar = threading.Event()
+        self._futuro = None
+
+    @property
+    def terminada(self):
+        return self.situacao in (CONCLUIDA, CANCELADA, ERRO)
+
+    def fracao(self):
+        return self.concluidos / self.total if self.total else 0.0
+
+    def cancelar(self):
+        """Pede o cancelamento; uma tarefa ainda na fila nem chega a começar."""
+        self._cancelar.set()
+        if self._futuro is not None and self._futuro.cancel():
+            self._terminar(CANCELADA)
+
+    def verificar(self):
+        if self._cancelar.is_set():
+            raise TarefaCancelada()
+
+    def avancar(self, etapa):
+        """Passa para a etapa `etapa` (texto mostrado ao usuário)."""
+        self.verificar()
+        self.etapa = etapa
+
+    def progresso(self, concluidos, total):
+        """Uso direto como ao_concluir(concluidos, total) das leituras em lote."""
+        self.verificar()
+        self.concluidos, self.total = concluidos, total
+
+    def _terminar(self, situacao):
+        self.situacao = situacao
+        self.terminada_em = time.time()
+
+
+# =====================================================
+# GERENCIADOR (POOL DE THREADS COMPARTILHADO)
+# =====================================================
+class GerenciadorTarefas:
+    """
+    Executa tarefas em um pool de threads, fora do script que as enviou:
+    reexecuções do Streamlit e o fechamento da aba não interrompem a tarefa,
+    e o resultado fica guardado até ser retirado.
+
+    Cada tarefa tem uma chave (ex.: estoque, arquivos e opções): enviar uma
+    chave que já está na fila, em execução ou concluída devolve a mesma
+    tarefa em vez de repetir o trabalho. Quem cancela ou retira a tarefa
+    afeta todos que a compartilham: inclua na chave o dono (ex.: a sessão)
+    quando as tarefas não devem ser compartilhadas.
+    """
+
+    def __init__(self, workers=WORKERS_TAREFAS, max_terminadas=TAREFAS_TERMINADAS_MAX):
+        self.max_terminadas = max_terminadas
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tarefa")
+        self._tarefas = {}
+        self._trava = threading.Lock()
+
+    def enviar(self, chave, funcao, *args, diagnostico=None, **kwargs):
+        """
+        Agenda funcao(tarefa, *args, **kwargs) e devolve a Tarefa. Com
+        `diagnostico`, as etapas da tarefa são medidas nele.
+        """
+        with self._trava:
+            for tarefa in self._tarefas.values():
+                if tarefa.chave == chave and tarefa.situacao in (NA_FILA, EXECUTANDO, CONCLUIDA):
+                    return tarefa
+
+            tarefa = Tarefa(chave, diagnostico)
+            self._tarefas[tarefa.id] = tarefa
+            self._descartar_antigas()
+            tarefa._futuro = self._pool.submit(self._executar, tarefa, funcao, args, kwargs)
+            return tarefa
+
+    def obter(self, id_tarefa):
+        with self._trava:
+            return self._tarefas.get(id_tarefa)
+
+    def retirar(self, id_tarefa):
+        """Remove a tarefa do gerenciador (cancelando-a se não terminou) e a devolve."""
+        with self._trava:
+            tarefa = self._tarefas.pop(id_tarefa, None)
+        if tarefa is not None and not tarefa.terminada:
+            tarefa.cancelar()
+        return tarefa
+
+    def retirar_se(self, condicao):
+        """Retira (cancelando as que não terminaram) as tarefas em que condicao(tarefa) é verdadeira."""
+        with self._trava:
+            ids = [id_tarefa for id_tarefa, tarefa in self._tarefas.items() if condicao(tarefa)]
+        for id_tarefa in ids:
+            self.retirar(id_tarefa)
+
+    def _executar(self, tarefa, funcao, args, kwargs):
+        if tarefa._cancelar.is_set():
+            tarefa._terminar(CANCELADA)
+            return
+        tarefa.situacao = EXECUTANDO
+        try:
+            with ativar(tarefa.diagnostico):
+                tarefa.resultado = funcao(tarefa, *args, **kwargs)
+        except TarefaCancelada:
+            tarefa._terminar(CANCELADA)
+        except Exception as e:
+            tarefa.erro = str(e)
+            tarefa._terminar(ERRO)
+        else:
+            tarefa._terminar(CONCLUIDA)
+
+    def _descartar_antigas(self):
+        # Mantém só as tarefas terminadas mais recentes (as em andamento ficam)
+        terminadas = sorted(
+            (tarefa for tarefa in self._tarefas.values() if tarefa.terminada),
+            key=lambda tarefa: tarefa.terminada_em
+        )
+        for tarefa in terminadas[:max(0, len(terminadas) - self.max_terminadas)]:
+            del self._tarefas[tarefa.id]
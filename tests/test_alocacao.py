@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from alocacao import SEM_ESTOQUE, alocar_pedidos, indexar_estoque, ler_excecoes
+
+
+# =====================================================
+# DADOS DE TESTE
+# =====================================================
+def _estoque(saldos, grupos=("QM", "MF")):
+    # saldos: {(produto, grupo): qtde}
+    df = pd.DataFrame(
+        [(produto, grupo, qtde) for (produto, grupo), qtde in saldos.items()],
+        columns=["Produto", "LK-GRUPO", "Qtde"],
+    )
+    return indexar_estoque(df, list(grupos))
+
+
+def _pedidos(linhas):
+    # linhas: [(arquivo, cnpj, codigo, quantidade)]
+    df = pd.DataFrame(linhas, columns=["Arquivo_Pedido", "CNPJ", "Codigo", "Quantidade"])
+    df["Quantidade"] = df["Quantidade"].astype("float64")
+    df["Valor_Unitario"] = 1.0
+    df["Total_Item"] = df["Quantidade"]
+    return df
+
+
+def _alocacao(resultado):
+    return list(zip(resultado["Empresa_Atendimento"].astype(str), resultado["Quantidade_Pedido"].astype(float)))
+
+
+def _referencia(linhas, saldos, grupos, dividir, ordem_da_linha=lambda linha: None):
+    """Alocação com reserva linha a linha, por arquivo e na ordem original."""
+    saldos = dict(saldos)
+    por_linha = {}
+    for posicao in sorted(range(len(linhas)), key=lambda i: linhas[i][0]):
+        _, _, codigo, qtd = linhas[posicao]
+        partes, pendente = [], qtd
+        for grupo in ordem_da_linha(linhas[posicao]) or grupos:
+            saldo = saldos.get((codigo, grupo), 0)
+            atendido = min(pendente, saldo) if dividir else (pendente if saldo >= pendente else 0)
+            if atendido > 0:
+                partes.append((grupo, float(atendido)))
+                saldos[(codigo, grupo)] = saldo - atendido
+                pendente -= atendido
+            if not pendente:
+                break
+        if pendente:
+            partes.append((SEM_ESTOQUE, float(pendente if dividir else qtd)))
+        por_linha[posicao] = partes
+    return [parte for posicao in range(len(linhas)) for parte in por_linha[posicao]]
+
+
+def _aleatorio(semente, grupos=("QM", "MF")):
+    rng = np.random.default_rng(semente)
+    produtos = ["A", "B", "C"]
+    saldos = {(p, g): int(rng.integers(0, 25)) for p in produtos for g in grupos}
+    linhas = [
+        (f"pedido{rng.integers(0, 3)}.csv", str(rng.integers(111, 114)), str(rng.choice(produtos)), int(rng.integers(1, 16)))
+        for _ in range(40)
+    ]
+    return saldos, linhas
+
+
+# =====================================================
+# ALOCAÇÃO COM RESERVA
+# =====================================================
+def test_linha_que_nao_cabe_nao_bloqueia_as_seguintes():
+    indice = _estoque({("A", "QM"): 10, ("A", "MF"): 10})
+    pedidos = _pedidos([("p.csv", "1", "A", 20), ("p.csv", "1", "A", 5)])
+
+    resultado = alocar_pedidos(pedidos, indice, reservar=True)
+
+    assert _alocacao(resultado) == [(SEM_ESTOQUE, 20.0), ("QM", 5.0)]
+    assert resultado["Qtde_Disponivel"].tolist() == [0.0, 10.0]
+
+
+def test_linhas_recusadas_nao_consomem_saldo_do_proximo_grupo():
+    indice = _estoque({("A", "QM"): 10, ("A", "MF"): 13})
+    pedidos = _pedidos([("p.csv", "1", "A", q) for q in (8, 6, 3, 20, 4, 7)])
+
+    resultado = alocar_pedidos(pedidos, indice, reservar=True)
+
+    assert _alocacao(resultado) == [
+        ("QM", 8.0), ("MF", 6.0), ("MF", 3.0), (SEM_ESTOQUE, 20.0), ("MF", 4.0), (SEM_ESTOQUE, 7.0)
+    ]
+
+
+@pytest.mark.parametrize("dividir", [False, True])
+@pytest.mark.parametrize("semente", range(20))
+def test_reserva_igual_a_alocacao_linha_a_linha(semente, dividir):
+    saldos, linhas = _aleatorio(semente)
+
+    resultado = alocar_pedidos(_pedidos(linhas), _estoque(saldos), reservar=True, dividir=dividir)
+
+    assert _alocacao(resultado) == _referencia(linhas, saldos, ["QM", "MF"], dividir)
+
+
+# =====================================================
+# EXCEÇÕES DE PRIORIDADE
+# =====================================================
+@pytest.mark.parametrize("dividir", [False, True])
+def test_linha_sem_grupo_no_nivel_nao_consome_saldo_de_outro_grupo(dividir):
+    indice = _estoque({("A", "QM"): 5, ("A", "MF"): 10})
+    pedidos = _pedidos([("p.csv", "111", "A", 15), ("p.csv", "222", "A", 5)])
+    excecoes, _ = ler_excecoes("CNPJ 111: MF\nCNPJ 222: MF, QM")
+
+    resultado = alocar_pedidos(pedidos, indice, reservar=True, dividir=dividir, excecoes=excecoes)
+
+    primeira = [("MF", 10.0), (SEM_ESTOQUE, 5.0)] if dividir else [(SEM_ESTOQUE, 15.0)]
+    segunda = [("QM", 5.0)] if dividir else [("MF", 5.0)]
+    assert _alocacao(resultado) == primeira + segunda
+
+
+@pytest.mark.parametrize("reservar", [False, True])
+def test_excecao_do_produto_igual_a_ordem_padrao_prevalece_sobre_a_do_cliente(reservar):
+    indice = _estoque({("A", "QM"): 10, ("A", "MF"): 10})
+    pedidos = _pedidos([("p.csv", "111", "A", 5)])
+    excecoes, _ = ler_excecoes("CNPJ 111: MF, QM\nCODIGO A: QM, MF")
+
+    resultado = alocar_pedidos(pedidos, indice, reservar=reservar, excecoes=excecoes)
+
+    assert _alocacao(resultado) == [("QM", 5.0)]
+
+
+@pytest.mark.parametrize("dividir", [False, True])
+def test_cada_linha_esgota_a_sua_prioridade_antes_das_seguintes(dividir):
+    indice = _estoque({("A", "QM"): 10, ("A", "MF"): 10})
+    pedidos = _pedidos([("p1.csv", "111", "A", 8), ("p2.csv", "222", "A", 8), ("p3.csv", "333", "A", 8)])
+    excecoes, _ = ler_excecoes("CNPJ 111: MF\nCNPJ 222: MF, QM")
+
+    resultado = alocar_pedidos(pedidos, indice, reservar=True, dividir=dividir, excecoes=excecoes)
+
+    esperado = [("MF", 8.0), ("MF", 2.0), ("QM", 6.0), ("QM", 4.0), (SEM_ESTOQUE, 4.0)] if dividir else [
+        ("MF", 8.0), ("QM", 8.0), (SEM_ESTOQUE, 8.0)
+    ]
+    assert _alocacao(resultado) == esperado
+
+
+@pytest.mark.parametrize("dividir", [False, True])
+@pytest.mark.parametrize("semente", range(20))
+def test_reserva_com_excecoes_igual_a_alocacao_linha_a_linha(semente, dividir):
+    saldos, linhas = _aleatorio(semente)
+    rng = np.random.default_rng(1000 + semente)
+    ordens = [("MF",), ("MF", "QM"), ("QM",), ("QM", "MF")]
+    texto = "\n".join(
+        [f"CNPJ {cnpj}: {', '.join(ordens[rng.integers(0, 4)])}" for cnpj in ("111", "112") if rng.random() < 0.7]
+        + [f"CODIGO {codigo}: {', '.join(ordens[rng.integers(0, 4)])}" for codigo in ("A", "B") if rng.random() < 0.5]
+    )
+    excecoes, _ = ler_excecoes(texto)
+
+    def ordem_da_linha(linha):
+        _, cnpj, codigo, _ = linha
+        return excecoes.por_codigo.get(codigo) or excecoes.por_cnpj.get(cnpj)
+
+    resultado = alocar_pedidos(_pedidos(linhas), _estoque(saldos), reservar=True, dividir=dividir, excecoes=excecoes)
+
+    assert _alocacao(resultado) == _referencia(linhas, saldos, ["QM", "MF"], dividir, ordem_da_linha)
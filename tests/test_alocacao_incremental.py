@@ -0,0 +1,58 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from alocacao import indexar_estoque
+from alocacao_incremental import CacheResultados, alocar_incremental
+
+
+def _estoque():
+    df = pd.DataFrame([("75", "QM", 10), ("80", "MF", 5)], columns=["Produto", "LK-GRUPO", "Qtde"])
+    return indexar_estoque(df, ["QM", "MF"])
+
+
+def _arquivo(nome, codigo, quantidade):
+    conteudo = (
+        "Cnpj;Codigo;Produto;Quantidade;Valor_Unitario;Total\n"
+        f'="12345678000199";{codigo};Desc;{quantidade};12,50;12,50\n'
+    ).encode()
+    return nome, f"hash-{nome}-{codigo}-{quantidade}", conteudo
+
+
+class Parar(Exception):
+    pass
+
+
+def test_verificar_interrompe_mesmo_com_leituras_em_cache():
+    arquivos = [_arquivo("a.csv", "0000075", 3), _arquivo("b.csv", "0000080", 2)]
+    cache = CacheResultados()
+    resultado, avisos, recalculados = alocar_incremental(arquivos, "v1", _estoque(), cache, workers=1)
+    assert (len(resultado), avisos, recalculados) == (2, [], 2)
+
+    chamadas = []
+
+    def verificar():
+        chamadas.append(None)
+        if len(chamadas) > 1:
+            raise Parar()
+
+    with pytest.raises(Parar):
+        alocar_incremental(arquivos, "v2", _estoque(), cache, workers=1, verificar=verificar)
+    assert not cache.alocacoes
+
+
+def test_chamadas_com_o_mesmo_cache_rodam_uma_apos_a_outra():
+    arquivos = [_arquivo("a.csv", "0000075", 3)]
+    cache = CacheResultados()
+    concluidas = []
+    cache.trava.acquire()
+    thread = threading.Thread(
+        target=lambda: concluidas.append(alocar_incremental(arquivos, "v1", _estoque(), cache, workers=1))
+    )
+    thread.start()
+    thread.join(timeout=0.2)
+    assert not concluidas
+    cache.trava.release()
+    thread.join()
+    assert len(concluidas[0][0]) == 1 and cache.versao_estoque == "v1"
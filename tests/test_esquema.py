@@ -0,0 +1,42 @@
+from esquema import Regra, normalizar_nome, resolver_colunas
+
+
+def test_normalizar_nome():
+    assert normalizar_nome("Valor Unitário") == "VALOR_UNITARIO"
+    assert normalizar_nome(" VALOR-UNITARIO. ") == "VALOR_UNITARIO"
+
+
+def test_exato_tem_precedencia_sobre_aproximado():
+    # "COD_PRODUTO" contém PRODUTO, mas "Produto" casa exatamente
+    mapa = resolver_colunas(["COD_PRODUTO", "Produto"], {"produto": ["PRODUTO"]})
+    assert mapa == {"produto": "Produto"}
+
+
+def test_exato_de_outra_regra_vence_o_aproximado():
+    # CODIGO casaria por trecho com "Código Produto", que pertence exatamente a PRODUTO
+    mapa = resolver_colunas(
+        ["Código Produto", "Código"],
+        {"produto": ["CODIGO_PRODUTO"], "codigo": ["CODIGO"]}
+    )
+    assert mapa == {"produto": "Código Produto", "codigo": "Código"}
+
+
+def test_ordem_dos_candidatos():
+    mapa = resolver_colunas(["QTD", "QUANTIDADE"], {"qtde": ["QUANTIDADE", "QTD"]})
+    assert mapa == {"qtde": "QUANTIDADE"}
+
+
+def test_excluir_descarta_coluna_na_busca_aproximada():
+    regras = {"produto": Regra(["PRODUTO"], excluir=["DESCR"])}
+    assert resolver_colunas(["DESCRICAO_PRODUTO", "COD_PRODUTO"], regras) == {"produto": "COD_PRODUTO"}
+    assert resolver_colunas(["DESCRICAO_PRODUTO"], regras) == {"produto": None}
+
+
+def test_coluna_nunca_atribuida_duas_vezes():
+    regras = {"codigo": ["CODIGO"], "referencia": ["CODIGO", "REF"]}
+    assert resolver_colunas(["Código"], regras) == {"codigo": "Código", "referencia": None}
+    assert resolver_colunas(["COD_CODIGO_X"], regras) == {"codigo": "COD_CODIGO_X", "referencia": None}
+
+
+def test_sem_correspondencia():
+    assert resolver_colunas(["A", "B"], {"valor": ["VALOR"]}) == {"valor": None}
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import numeros_br
+from numeros_br import formatar_br_serie, parse_br
+
+
+@pytest.fixture(params=["arrow", "pandas"])
+def implementacao(request, monkeypatch):
+    # As duas implementações seguem as mesmas regras
+    if request.param == "pandas":
+        monkeypatch.setattr(numeros_br, "pa", None)
+    elif numeros_br.pa is None:
+        pytest.skip("pyarrow não instalado")
+    return request.param
+
+
+def _f_string(v):
+    return f"{v:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+# =====================================================
+# TEXTO BR -> FLOAT
+# =====================================================
+@pytest.mark.parametrize("texto, esperado", [
+    ("1.234,56", 1234.56),
+    ("1,234.56", 1234.56),
+    ("12,5", 12.5),
+    ("1,234,567", 1234567.0),
+    ("1.234", 1234.0),
+    ("1.234.567", 1234567.0),
+    ("12.50", 12.5),
+    ("R$ 1.234,56", 1234.56),
+    ("-3,5", -3.5),
+    ("0,5", 0.5),
+])
+def test_parse_br(implementacao, texto, esperado):
+    assert parse_br(pd.Series([texto], dtype=object)).iloc[0] == esperado
+
+
+@pytest.mark.parametrize("texto", [None, "", "abc", "12a", "R$"])
+def test_parse_br_invalido_vira_nan(implementacao, texto):
+    assert np.isnan(parse_br(pd.Series([texto], dtype=object)).iloc[0])
+
+
+def test_parse_br_quantidades_com_ponto_decimal(implementacao):
+    serie = pd.Series(["1.500", "1.234,5", "2"], dtype=object)
+    assert parse_br(serie, ponto_milhar=False).tolist() == [1.5, 1234.5, 2.0]
+
+
+def test_parse_br_mantem_o_indice_e_colunas_numericas(implementacao):
+    serie = pd.Series(["1,5", "2"], index=[10, 20], dtype=object)
+    assert parse_br(serie).index.tolist() == [10, 20]
+    assert parse_br(pd.Series([1, 2])).tolist() == [1.0, 2.0]
+
+
+# =====================================================
+# FLOAT -> TEXTO BR
+# =====================================================
+@pytest.mark.parametrize("valor, esperado", [
+    (1234.56, "1.234,56"),
+    (0, "0,00"),
+    (-1234567.891, "-1.234.567,89"),
+    (999.999, "1.000,00"),
+    (0.005, "0,01"),
+    (2.675, "2,67"),
+    (-0.004, "-0,00"),
+    (1e15, "1.000.000.000.000.000,00"),
+])
+def test_formatar_br_serie(implementacao, valor, esperado):
+    assert formatar_br_serie(pd.Series([valor])).iloc[0] == esperado
+
+
+def test_formatar_br_serie_nulos_e_infinitos(implementacao):
+    resultado = formatar_br_serie(pd.Series([np.nan, np.inf, -np.inf, None], dtype="float64"))
+    assert resultado.tolist() == ["", "inf", "-inf", ""]
+
+
+def test_formatar_br_serie_igual_ao_escalar(implementacao):
+    # Valores com meio centavo (onde o arredondamento vetorizado divergia) e aleatórios
+    rng = np.random.default_rng(0)
+    valores = np.concatenate([
+        rng.integers(-10 ** 7, 10 ** 7, 5_000) / 1000,
+        rng.integers(-10 ** 9, 10 ** 9, 5_000) / 200,
+        rng.normal(0, 1e6, 5_000),
+    ])
+    resultado = formatar_br_serie(pd.Series(valores))
+    assert resultado.tolist() == [_f_string(v) for v in valores]
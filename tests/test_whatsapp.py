@@ -0,0 +1,162 @@
+import re
+
+import pandas as pd
+import pytest
+
+from numeros_br import parse_br, valor_br
+from whatsapp import (
+    COLUNAS_ITENS, MOTIVO_SEM_CODIGO, MOTIVO_SEM_VALORES, ler_pedido_whatsapp, total_confere
+)
+
+CLIENTE = """👤 *DADOS DO CLIENTE*
+Razão Social: LOJA EXEMPLO COMERCIO DE MOVEIS LTDA
+CNPJ: 12.345.678/0001-99
+IE: 9012345678
+Telefone: (41) 99876-5432
+E-mail: compras@lojaexemplo.com.br
+📍 Endereço:
+Rua das Araucárias, 1234 - Centro
+Curitiba - PR - 80000-000
+"""
+
+ITENS = """📦 *ITENS DO PEDIDO*
+
+*PRODUTO 85062 - ITEM 1*
+Cód: 0085062
+13 x R$ 2.556,17 = *R$ 33.230,21*
+
+*PRODUTO 26979 - ITEM 2*
+Cód: 26979
+6 x R$ 205,82 = *R$ 1.234,92*
+
+*CADEIRA, 4 PÉS*
+Cód: 0000123
+1000 x R$ 1,5 = *R$ 1.500,00*
+"""
+
+TOTAL = "💰 *TOTAL DO PEDIDO: R$ 35.965,13*\n"
+
+# Cliente antes dos itens (formato usual) e depois do total
+PEDIDO = "🛒 *NOVO PEDIDO*\n\n" + CLIENTE + "\n" + ITENS + "\n" + TOTAL
+PEDIDO_CLIENTE_DEPOIS = "🛒 *NOVO PEDIDO*\n\n" + ITENS + "\n" + TOTAL + "\n" + CLIENTE
+
+
+# =====================================================
+# EXTRATORES ANTERIORES (REGEX SOBRE O TEXTO INTEIRO)
+# =====================================================
+def _itens_antigo(texto):
+    bloco = re.search(r"📦\s*\*ITENS DO PEDIDO\*(.*?)💰\s*\*TOTAL DO PEDIDO", texto, re.DOTALL)
+    padrao = re.findall(
+        r"\*\s*(.*?)\s*\*\s*\n"
+        r"Cód:\s*(\d+)\s*\n"
+        r"(\d+)\s*x\s*R\$\s*([\d,.]+)\s*=\s*\*R\$\s*([\d,.]+)\*",
+        bloco.group(1)
+    )
+    df_itens = pd.DataFrame(padrao, columns=["Produto", "Codigo", "Quantidade", "Valor_Unitario", "Total"])
+    df_itens["Quantidade"] = df_itens["Quantidade"].astype(int)
+    df_itens["Valor_Unitario"] = parse_br(df_itens["Valor_Unitario"]).fillna(0.0)
+    df_itens["Total"] = parse_br(df_itens["Total"]).fillna(0.0)
+    return df_itens[COLUNAS_ITENS]
+
+
+def _cliente_antigo(texto):
+    campos = {
+        "Razao_Social": r"Razão Social:\s*(.*)",
+        "CNPJ": r"CNPJ:\s*([\d./-]+)",
+        "IE": r"IE:\s*(.*)",
+        "Telefone": r"Telefone:\s*([\d()+\s-]+)",
+        "Email": r"E-mail:\s*(.*)"
+    }
+    dados = {}
+    for campo, regex in campos.items():
+        m = re.search(regex, texto)
+        dados[campo] = m.group(1).strip() if m else ""
+    return dados
+
+
+def _endereco_antigo(texto):
+    m = re.search(r"📍 Endereço:\s*\n(.+)\n(.+)", texto)
+    return (m.group(1).strip(), m.group(2).strip()) if m else ("", "")
+
+
+def _total_antigo(texto):
+    m = re.search(r"TOTAL DO PEDIDO:\s*R\$\s*([\d,.]+)", texto)
+    return valor_br(m.group(1)) if m else 0.0
+
+
+# =====================================================
+# LEITURA EM PASSADA ÚNICA
+# =====================================================
+@pytest.mark.parametrize("texto", [PEDIDO, PEDIDO_CLIENTE_DEPOIS], ids=["cliente_antes", "cliente_depois"])
+def test_igual_aos_extratores_anteriores(texto):
+    leitura = ler_pedido_whatsapp(texto)
+
+    pd.testing.assert_frame_equal(leitura.itens, _itens_antigo(texto))
+    assert leitura.cliente == _cliente_antigo(texto)
+    assert leitura.endereco == _endereco_antigo(texto)
+    assert leitura.total == _total_antigo(texto)
+    assert leitura.falhas == []
+
+
+def test_valores_lidos():
+    leitura = ler_pedido_whatsapp(PEDIDO)
+
+    assert leitura.itens["Codigo"].tolist() == ["0085062", "26979", "0000123"]
+    assert leitura.itens["Produto"].tolist() == ["PRODUTO 85062 - ITEM 1", "PRODUTO 26979 - ITEM 2", "CADEIRA, 4 PÉS"]
+    assert leitura.itens["Quantidade"].tolist() == [13, 6, 1000]
+    assert leitura.itens["Valor_Unitario"].tolist() == [2556.17, 205.82, 1.5]
+    assert leitura.cliente["CNPJ"] == "12.345.678/0001-99"
+    assert leitura.cliente["Telefone"] == "(41) 99876-5432"
+    assert leitura.endereco == ("Rua das Araucárias, 1234 - Centro", "Curitiba - PR - 80000-000")
+    assert leitura.total == 35965.13
+    assert total_confere(leitura)
+
+
+@pytest.mark.parametrize("texto", [PEDIDO, PEDIDO_CLIENTE_DEPOIS], ids=["cliente_antes", "cliente_depois"])
+def test_quebras_de_linha_crlf(texto):
+    esperado = ler_pedido_whatsapp(texto)
+    leitura = ler_pedido_whatsapp(texto.replace("\n", "\r\n"))
+
+    pd.testing.assert_frame_equal(leitura.itens, esperado.itens)
+    assert leitura.cliente == esperado.cliente
+    assert leitura.endereco == esperado.endereco
+    assert leitura.total == esperado.total
+    assert leitura.falhas == []
+
+
+def test_sem_total_do_pedido():
+    leitura = ler_pedido_whatsapp("🛒 *NOVO PEDIDO*\n\n" + CLIENTE + "\n" + ITENS)
+
+    assert len(leitura.itens) == 3
+    assert leitura.total == 0.0
+    assert [falha["Motivo"] for falha in leitura.falhas] == ["linha \"TOTAL DO PEDIDO\" não encontrada após os itens"]
+    assert not total_confere(leitura)
+
+
+def test_total_que_nao_confere():
+    leitura = ler_pedido_whatsapp(PEDIDO.replace("35.965,13", "35.965,50"))
+
+    assert leitura.total == 35965.5
+    assert leitura.soma_itens == pytest.approx(35965.13)
+    assert leitura.falhas == []
+    assert not total_confere(leitura)
+
+
+def test_itens_incompletos_viram_falhas():
+    texto = PEDIDO.replace("Cód: 26979\n", "").replace("1000 x R$ 1,5 = *R$ 1.500,00*\n", "")
+    leitura = ler_pedido_whatsapp(texto)
+
+    assert leitura.itens["Codigo"].tolist() == ["0085062"]
+    assert [(falha["Texto"], falha["Motivo"]) for falha in leitura.falhas] == [
+        ("PRODUTO 26979 - ITEM 2", MOTIVO_SEM_CODIGO),
+        ("6 x R$ 205,82 = *R$ 1.234,92*", "quantidade e valores sem produto e código"),
+        ("CADEIRA, 4 PÉS", MOTIVO_SEM_VALORES),
+    ]
+
+
+def test_sem_bloco_de_itens():
+    leitura = ler_pedido_whatsapp(CLIENTE)
+
+    assert leitura.itens.empty and list(leitura.itens.columns) == COLUNAS_ITENS
+    assert leitura.cliente == _cliente_antigo(CLIENTE)
+    assert [falha["Motivo"] for falha in leitura.falhas] == ["bloco \"ITENS DO PEDIDO\" não encontrado"]
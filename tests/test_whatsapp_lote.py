@@ -0,0 +1,88 @@
+import io
+import zipfile
+
+from whatsapp import ler_pedido_whatsapp
+from whatsapp_lote import converter_conversa, dividir_pedidos, linhas_conversa
+
+
+def _pedido(cnpj, codigo, quantidade):
+    total = f"{quantidade * 10},00"
+    return (
+        "🛒 *NOVO PEDIDO*\n"
+        "\n"
+        "👤 *DADOS DO CLIENTE*\n"
+        "Razão Social: LOJA EXEMPLO LTDA\n"
+        f"CNPJ: {cnpj}\n"
+        "Telefone: (41) 99876-5432\n"
+        "📍 Endereço:\n"
+        "Rua das Araucárias, 1234 - Centro\n"
+        "Curitiba - PR - 80000-000\n"
+        "\n"
+        "📦 *ITENS DO PEDIDO*\n"
+        "\n"
+        f"*PRODUTO {codigo}*\n"
+        f"Cód: {codigo}\n"
+        f"{quantidade} x R$ 10,00 = *R$ {total}*\n"
+        "\n"
+        f"💰 *TOTAL DO PEDIDO: R$ {total}*"
+    )
+
+
+# Android e iOS, mensagens de várias linhas, um pedido sem total (descartado)
+# e dois pedidos do mesmo cliente
+CONVERSA = (
+    "18/10/2026 10:10 - Vendedor: " + _pedido("12.345.678/0001-99", "0000001", 2) + "\n"
+    "18/10/2026 10:11 - Cliente: Obrigado!\n"
+    "Até amanhã,\n"
+    "Fulano\n"
+    "\u200e[18/10/2026, 10:12:00] Vendedor: " + _pedido("98.765.432/0001-10", "0000002", 3) + "\n"
+    "18/10/2026 10:13 - Vendedor: 🛒 *NOVO PEDIDO*\n"
+    "📦 *ITENS DO PEDIDO*\n"
+    "18/10/2026 10:14 - Vendedor: " + _pedido("12.345.678/0001-99", "0000003", 4) + "\n"
+)
+
+
+def test_dividir_pedidos_uma_mensagem_por_pedido():
+    pedidos = list(dividir_pedidos(io.StringIO(CONVERSA)))
+
+    assert pedidos == [
+        _pedido("12.345.678/0001-99", "0000001", 2),
+        _pedido("98.765.432/0001-10", "0000002", 3),
+        _pedido("12.345.678/0001-99", "0000003", 4),
+    ]
+    assert [ler_pedido_whatsapp(texto).total for texto in pedidos] == [20.0, 30.0, 40.0]
+
+
+def test_dividir_pedidos_crlf():
+    assert list(dividir_pedidos(io.StringIO(CONVERSA.replace("\n", "\r\n"), newline=""))) == \
+        list(dividir_pedidos(io.StringIO(CONVERSA)))
+
+
+def test_linhas_conversa_txt():
+    arquivo = io.BytesIO(("\ufeff" + CONVERSA).encode("utf-8"))
+    assert list(linhas_conversa(arquivo, "Conversa.TXT")) == io.StringIO(CONVERSA).readlines()
+
+
+def test_linhas_conversa_zip_com_varios_txt():
+    conteudo = io.BytesIO()
+    with zipfile.ZipFile(conteudo, "w") as zipf:
+        zipf.writestr("b.txt", "18/10/2026 10:20 - Cliente: segundo\n")
+        zipf.writestr("midia.jpg", b"\xff\xd8")
+        zipf.writestr("a.txt", CONVERSA.encode("utf-8"))
+    conteudo.seek(0)
+
+    linhas = list(linhas_conversa(conteudo, "conversa.zip"))
+    assert linhas == io.StringIO(CONVERSA).readlines() + ["18/10/2026 10:20 - Cliente: segundo\n"]
+
+
+def test_converter_conversa_nomes_repetidos():
+    destino = io.BytesIO()
+    resumo = converter_conversa(linhas_conversa(io.BytesIO(CONVERSA.encode("utf-8")), "conversa.txt"), destino)
+
+    assert [pedido["Arquivo"] for pedido in resumo] == [
+        "12345678000199_41998765432", "98765432000110_41998765432", "12345678000199_41998765432_2"
+    ]
+    assert all(pedido["Total_Confere"] and pedido["Linhas_Com_Falha"] == 0 for pedido in resumo)
+    with zipfile.ZipFile(destino) as zipf:
+        assert zipf.namelist() == [f"{pedido['Arquivo']}.csv" for pedido in resumo]
+        assert "0000003" in zipf.read("12345678000199_41998765432_2.csv").decode()
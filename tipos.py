@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# Colunas guardadas como categorias (textos repetidos linha a linha)
+COLUNAS_CATEGORICAS = ["CNPJ", "Codigo", "Produto", "LK-GRUPO", "Empresa_Atendimento", "Arquivo_Pedido"]
+
+# Colunas de quantidade que podem ser float32 (os valores em R$ continuam float64)
+COLUNAS_QUANTIDADE = ["Quantidade", "Quantidade_Pedido", "Qtde", "Qtde_Disponivel"]
+
+
+# =====================================================
+# REPRESENTAÇÕES COMPACTAS
+# =====================================================
+def categoria(valores):
+    """
+    Valores como pd.Categorical: cada texto distinto é guardado uma única vez
+    e as linhas guardam apenas o código inteiro.
+    """
+    if isinstance(getattr(valores, "dtype", None), pd.CategoricalDtype):
+        return valores.array if isinstance(valores, pd.Series) else valores
+    return pd.Categorical(valores)
+
+
+def quantidade(valores):
+    """
+    Quantidades como float32 quando a conversão é exata (inteiros até 2**24 e
+    frações binárias); caso contrário, mantém float64.
+    """
+    valores = np.asarray(valores, dtype="float64")
+    compactos = valores.astype("float32")
+    if np.array_equal(compactos, valores, equal_nan=True):
+        return compactos
+    return valores
+
+
+def compactar(df):
+    """Aplica categoria e quantidade às colunas conhecidas presentes em `df`."""
+    for coluna in COLUNAS_CATEGORICAS:
+        if coluna in df.columns:
+            df[coluna] = categoria(df[coluna])
+    for coluna in COLUNAS_QUANTIDADE:
+        if coluna in df.columns:
+            df[coluna] = quantidade(df[coluna])
+    return df
+
+
+def codigos(valores):
+    """Código inteiro de cada linha (mesmo texto -> mesmo código); -1 para nulos."""
+    if isinstance(getattr(valores, "dtype", None), pd.CategoricalDtype):
+        return np.asarray(valores.cat.codes if isinstance(valores, pd.Series) else valores.codes)
+    return pd.factorize(np.asarray(valores))[0]
+
+
+def chave_ordenacao(valores):
+    """
+    Inteiros que ordenam as linhas como os textos de `valores` (e não como a
+    ordem das categorias, que depende de como foram criadas).
+    """
+    valores = categoria(valores)
+    ordem = np.empty(len(valores.categories), dtype="int64")
+    ordem[np.argsort(valores.categories.to_numpy(dtype=str), kind="stable")] = np.arange(len(ordem))
+    return np.where(valores.codes >= 0, ordem[valores.codes], len(ordem))
+
+
+# =====================================================
+# CONCATENAÇÃO SEM PERDER AS CATEGORIAS
+# =====================================================
+def concatenar(dfs):
+    """
+    pd.concat que mantém as colunas categóricas como categorias, unindo as
+    categorias de cada parte (o pd.concat devolveria object se elas
+    diferirem).
+    """
+    dfs = list(dfs)
+    if len(dfs) == 1:
+        return dfs[0].reset_index(drop=True)
+
+    categoricas = [
+        coluna for coluna, tipo in dfs[0].dtypes.items()
+        if isinstance(tipo, pd.CategoricalDtype)
+        and all(isinstance(df[coluna].dtype, pd.CategoricalDtype) for df in dfs)
+    ]
+    df = pd.concat([df.drop(columns=categoricas) for df in dfs], ignore_index=True)
+    for coluna in categoricas:
+        df[coluna] = union_categoricals([d[coluna] for d in dfs])
+    return df[list(dfs[0].columns)]
@@ -0,0 +1,116 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from resultados import lotes_resultado
+from tipos import categoria, concatenar
+
+# Linhas enviadas ao navegador por página da tabela de resultado
+LINHAS_POR_PAGINA = 500
+OPCOES_LINHAS_POR_PAGINA = [100, 500, 1_000, 5_000]
+
+# Colunas lidas de cada lote para avaliar os filtros
+COLUNAS_FILTRO = ["CNPJ", "Arquivo_Pedido", "Empresa_Atendimento"]
+
+
+# =====================================================
+# FILTROS DO RESULTADO
+# =====================================================
+def opcoes_filtro(serie):
+    """Valores distintos de uma coluna (categórica ou não), em ordem alfabética."""
+    return sorted(str(v) for v in categoria(serie).categories)
+
+
+def opcoes_filtro_resultado(resultado, coluna):
+    """opcoes_filtro de uma coluna do resultado (DataFrame ou ResultadoEmLotes), unindo os lotes."""
+    valores = set()
+    for lote in lotes_resultado(resultado, [coluna]):
+        valores.update(opcoes_filtro(lote[coluna]))
+    return sorted(valores)
+
+
+def filtrar_resultado(df_resultado, cnpj="", arquivos=(), empresas=()):
+    """
+    Linhas do resultado cujo CNPJ contém `cnpj` (somente dígitos comparados)
+    e cujo Arquivo_Pedido e Empresa_Atendimento estão nas listas (vazias =
+    sem filtro).
+
+    Os filtros são avaliados sobre as categorias (poucos valores) e aplicados
+    às linhas pelo código inteiro.
+    """
+    mascara = _mascara_filtros(df_resultado, cnpj, arquivos, empresas)
+    return df_resultado if mascara.all() else df_resultado[mascara]
+
+
+# =====================================================
+# PAGINAÇÃO
+# =====================================================
+def total_paginas(linhas, linhas_por_pagina=LINHAS_POR_PAGINA):
+    return max(1, math.ceil(linhas / linhas_por_pagina))
+
+
+def pagina_resultado(df, pagina, linhas_por_pagina=LINHAS_POR_PAGINA):
+    """Fatia da página `pagina` (a partir de 1), já limitada ao total de páginas."""
+    pagina = min(max(1, pagina), total_paginas(len(df), linhas_por_pagina))
+    inicio = (pagina - 1) * linhas_por_pagina
+    return df.iloc[inicio:inicio + linhas_por_pagina]
+
+
+def contar_filtradas(resultado, cnpj="", arquivos=(), empresas=()):
+    """
+    Linhas de cada lote do ResultadoEmLotes que passam pelos filtros de
+    filtrar_resultado. Só as colunas dos filtros são lidas.
+    """
+    return [
+        int(_mascara_filtros(lote, cnpj, arquivos, empresas).sum())
+        for lote in resultado.lotes(COLUNAS_FILTRO)
+    ]
+
+
+def pagina_filtrada(resultado, contagens, pagina, linhas_por_pagina=LINHAS_POR_PAGINA, cnpj="", arquivos=(), empresas=()):
+    """
+    Página `pagina` das linhas filtradas do ResultadoEmLotes, dadas as
+    contagens por lote de contar_filtradas: só os lotes que caem na página
+    são lidos inteiros.
+    """
+    pagina = min(max(1, pagina), total_paginas(sum(contagens), linhas_por_pagina))
+    inicio = (pagina - 1) * linhas_por_pagina
+    fim = inicio + linhas_por_pagina
+
+    partes = []
+    antes = 0
+    for posicao, linhas in enumerate(contagens):
+        if linhas and antes < fim and antes + linhas > inicio:
+            lote = filtrar_resultado(resultado.lote(posicao), cnpj, arquivos, empresas)
+            partes.append(lote.iloc[max(0, inicio - antes):fim - antes])
+        antes += linhas
+
+    if not partes:
+        return pd.DataFrame(columns=resultado.colunas)
+    if len(partes) == 1:
+        return partes[0]
+    # Índices de cada lote já são as posições no resultado: mantidos na página
+    return concatenar(partes).set_axis(np.concatenate([parte.index for parte in partes]))
+
+
+# =====================================================
+# FUNÇÕES AUXILIARES
+# =====================================================
+def _mascara_filtros(df, cnpj, arquivos, empresas):
+    mascara = np.ones(len(df), dtype=bool)
+
+    digitos = "".join(c for c in cnpj if c.isdigit())
+    if digitos:
+        mascara &= _linhas_com(df["CNPJ"], lambda v: digitos in v)
+    if arquivos:
+        mascara &= _linhas_com(df["Arquivo_Pedido"], set(arquivos).__contains__)
+    if empresas:
+        mascara &= _linhas_com(df["Empresa_Atendimento"], set(empresas).__contains__)
+    return mascara
+
+
+def _linhas_com(serie, aceita):
+    valores = categoria(serie)
+    aceitas = np.array([aceita(str(v)) for v in valores.categories], dtype=bool)
+    return np.where(valores.codes >= 0, aceitas[valores.codes] if len(aceitas) else False, False)
@@ -0,0 +1,243 @@
+import re
+from collections import namedtuple
+from io import StringIO
+
+import pandas as pd
+
+from numeros_br import formatar_br, formatar_br_serie, parse_br, valor_br
+
+
+# ---------------- FUNÇÕES AUXILIARES ----------------
+def so_numeros(v):
+    return re.sub(r"\D", "", v or "")
+
+def parse_valor(v):
+    return valor_br(v)
+
+def formatar_codigo(c):
+    return c.zfill(7)
+
+def formatar_cnpj(cnpj):
+    return f'="{so_numeros(cnpj)}"'
+
+# ---------------- LEITURA EM PASSADA ÚNICA ----------------
+# Padrões por linha, compilados uma vez (nenhum atravessa linhas)
+_INICIO_ITENS = re.compile(r"📦\s*\*ITENS DO PEDIDO\*")
+_FIM_ITENS = re.compile(r"💰\s*\*TOTAL DO PEDIDO")
+_ITEM_PRODUTO = re.compile(r"\*\s*(.*?)\s*\*\s*$")
+_ITEM_CODIGO = re.compile(r"Cód:\s*(\d+)\s*$")
+_ITEM_VALORES = re.compile(r"(\d+)\s*x\s*R\$\s*([\d,.]+)\s*=\s*\*R\$\s*([\d,.]+)\*")
+_TOTAL = re.compile(r"TOTAL DO PEDIDO:\s*R\$\s*([\d,.]+)")
+_ENDERECO = re.compile(r"📍 Endereço:\s*$")
+_CAMPOS_CLIENTE = {
+    "Razao_Social": re.compile(r"Razão Social:\s*(.*)"),
+    "CNPJ": re.compile(r"CNPJ:\s*([\d./-]+)"),
+    "IE": re.compile(r"IE:\s*(.*)"),
+    "Telefone": re.compile(r"Telefone:\s*([\d()+\s-]+)"),
+    "Email": re.compile(r"E-mail:\s*(.*)"),
+}
+
+COLUNAS_ITENS = ["Codigo", "Produto", "Quantidade", "Valor_Unitario", "Total"]
+
+MOTIVO_SEM_CODIGO = "item sem a linha \"Cód:\""
+MOTIVO_SEM_VALORES = "item sem a linha \"quantidade x R$ valor = R$ total\""
+
+# Diferença aceita entre a soma dos itens e o TOTAL DO PEDIDO (arredondamento)
+TOLERANCIA_TOTAL = 0.01
+
+LeituraPedido = namedtuple("LeituraPedido", ["itens", "cliente", "endereco", "total", "soma_itens", "falhas"])
+
+
+def ler_pedido_whatsapp(texto):
+    """
+    Lê o texto do pedido em uma única passada pelas linhas e devolve uma
+    LeituraPedido com os itens (DataFrame), os dados do cliente, as duas
+    linhas do endereço, o TOTAL DO PEDIDO, a soma dos itens e as falhas.
+
+    Cada linha é testada apenas contra os padrões do estado corrente (fora
+    dos itens, esperando produto, código ou valores), então o custo é
+    linear no tamanho do texto. Dados do cliente e endereço são lidos antes
+    ou depois do bloco de itens (e, dentro dele, campos do cliente em linhas
+    que não são de item). Linhas do bloco de itens que não formam um item
+    completo entram em `falhas` ({"Linha", "Texto", "Motivo"}).
+    """
+    cliente = dict.fromkeys(_CAMPOS_CLIENTE, "")
+    faltantes = dict(_CAMPOS_CLIENTE)
+    endereco = []
+    linhas_endereco = 0
+    itens = []
+    falhas = []
+    total = None
+    estado = "inicio"  # inicio -> produto -> codigo -> valores -> produto ... -> fim
+    produto = codigo = None
+    linha_item = 0
+
+    def ler_cliente(linha):
+        # Campos do cliente ainda não encontrados; True se a linha tinha algum
+        encontrou = False
+        for campo, padrao in list(faltantes.items()):
+            m = padrao.search(linha)
+            if m:
+                cliente[campo] = m.group(1).strip()
+                del faltantes[campo]
+                encontrou = True
+        return encontrou
+
+    def ler_endereco(linha):
+        # As duas linhas que seguem "📍 Endereço:"
+        nonlocal linhas_endereco
+        if linhas_endereco and linha.strip():
+            endereco.append(linha.strip())
+            linhas_endereco -= 1
+        elif not endereco and _ENDERECO.search(linha):
+            linhas_endereco = 2
+
+    for numero, linha in enumerate(texto.splitlines(), start=1):
+        linha_total = "TOTAL DO PEDIDO" in linha
+        if linha_total and total is None:
+            m = _TOTAL.search(linha)
+            if m:
+                total = valor_br(m.group(1))
+
+        if estado in ("inicio", "fim"):
+            ler_endereco(linha)
+            ler_cliente(linha)
+            if estado == "inicio" and _INICIO_ITENS.search(linha):
+                estado = "produto"
+            continue
+
+        if not linha.strip():
+            continue
+
+        if linha_total and _FIM_ITENS.search(linha):
+            if estado == "codigo":
+                falhas.append(_falha(linha_item, produto, MOTIVO_SEM_CODIGO))
+            elif estado == "valores":
+                falhas.append(_falha(linha_item, produto, MOTIVO_SEM_VALORES))
+            estado = "fim"
+            continue
+
+        if estado == "codigo":
+            m = _ITEM_CODIGO.match(linha)
+            if m:
+                codigo = m.group(1)
+                estado = "valores"
+                continue
+            falhas.append(_falha(linha_item, produto, MOTIVO_SEM_CODIGO))
+            estado = "produto"
+        elif estado == "valores":
+            m = _ITEM_VALORES.match(linha)
+            if m:
+                itens.append((produto, codigo) + m.groups())
+                estado = "produto"
+                continue
+            falhas.append(_falha(linha_item, produto, MOTIVO_SEM_VALORES))
+            estado = "produto"
+
+        # Esperando o nome de um novo produto
+        if _ITEM_VALORES.match(linha):
+            falhas.append(_falha(numero, linha, "quantidade e valores sem produto e código"))
+            continue
+        m = _ITEM_PRODUTO.search(linha)
+        if m:
+            produto, linha_item = m.group(1), numero
+            estado = "codigo"
+        elif not ler_cliente(linha):
+            falhas.append(_falha(numero, linha, "linha não reconhecida no bloco de itens"))
+
+    if estado == "inicio":
+        falhas.append(_falha(None, "", "bloco \"ITENS DO PEDIDO\" não encontrado"))
+    elif estado != "fim":
+        falhas.append(_falha(None, "", "linha \"TOTAL DO PEDIDO\" não encontrada após os itens"))
+
+    df_itens = _itens_dataframe(itens)
+    soma_itens = float(df_itens["Total"].sum()) if not df_itens.empty else 0.0
+    return LeituraPedido(
+        itens=df_itens,
+        cliente=cliente,
+        endereco=tuple(endereco) if len(endereco) == 2 else ("", ""),
+        total=total if total is not None else 0.0,
+        soma_itens=soma_itens,
+        falhas=falhas,
+    )
+
+
+def total_confere(leitura, tolerancia=TOLERANCIA_TOTAL):
+    """A soma dos itens bate com o TOTAL DO PEDIDO (dentro da tolerância)?"""
+    return abs(leitura.soma_itens - leitura.total) <= tolerancia
+
+
+def _falha(numero, texto, motivo):
+    return {"Linha": numero, "Texto": texto.strip(), "Motivo": motivo}
+
+
+def _itens_dataframe(itens):
+    df_itens = pd.DataFrame(itens, columns=["Produto", "Codigo", "Quantidade", "Valor_Unitario", "Total"])
+    if df_itens.empty:
+        return pd.DataFrame(columns=COLUNAS_ITENS)
+
+    # Conversões feitas por coluna, não item a item
+    df_itens["Quantidade"] = df_itens["Quantidade"].astype(int)
+    df_itens["Valor_Unitario"] = parse_br(df_itens["Valor_Unitario"]).fillna(0.0)
+    df_itens["Total"] = parse_br(df_itens["Total"]).fillna(0.0)
+
+    return df_itens[COLUNAS_ITENS]
+
+# ---------------- EXTRAÇÃO POR PARTE ----------------
+# Atalhos para quem precisa de uma só parte; para mais de uma, use
+# ler_pedido_whatsapp (cada atalho percorre o texto inteiro)
+def extrair_itens(texto):
+    return ler_pedido_whatsapp(texto).itens
+
+def extrair_dados_cliente(texto):
+    return ler_pedido_whatsapp(texto).cliente
+
+def extrair_endereco(texto):
+    return ler_pedido_whatsapp(texto).endereco
+
+def extrair_total(texto):
+    return ler_pedido_whatsapp(texto).total
+
+# ---------------- MONTAGEM PDF ----------------
+def montar_dados_para_pdf(dados_cliente, df_itens, texto, endereco=None):
+    end1, end2 = endereco if endereco is not None else extrair_endereco(texto)
+
+    dados_cliente_pdf = {
+        "razao": dados_cliente.get("Razao_Social", ""),
+        "endereco_linha1": end1,
+        "endereco_linha2": end2
+    }
+
+    if df_itens.empty:
+        return dados_cliente_pdf, []
+
+    # Itens montados direto das colunas (sem iterrows)
+    carrinho = [
+        {"codigo": cod, "descricao": prod, "qtd": qtd, "preco": preco, "total": total}
+        for cod, prod, qtd, preco, total in zip(
+            df_itens["Codigo"],
+            df_itens["Produto"],
+            df_itens["Quantidade"].tolist(),
+            df_itens["Valor_Unitario"].tolist(),
+            df_itens["Total"].tolist(),
+        )
+    ]
+
+    return dados_cliente_pdf, carrinho
+
+# ---------------- CSV DO PEDIDO ----------------
+def nome_arquivo_pedido(dados_cliente):
+    cnpj = so_numeros(dados_cliente.get("CNPJ"))
+    telefone = so_numeros(dados_cliente.get("Telefone"))
+    return f"{cnpj}_{telefone}"
+
+def montar_csv_pedido(df_itens, dados_cliente):
+    df_csv = df_itens.copy()
+    df_csv["Cnpj"] = formatar_cnpj(dados_cliente.get("CNPJ"))
+    df_csv["Codigo"] = df_csv["Codigo"].str.zfill(7)
+    df_csv["Valor_Unitario"] = formatar_br_serie(df_csv["Valor_Unitario"])
+    df_csv["Total"] = formatar_br_serie(df_csv["Total"])
+
+    csv = StringIO()
+    df_csv.to_csv(csv, index=False, sep=";")
+    return csv.getvalue()
@@ -0,0 +1,116 @@
+import io
+import re
+import zipfile
+
+from diagnostico import etapa
+from pdf_pedido import escrever_pdfs, parametros_pdf_pedido
+from pedidos import WORKERS_PADRAO
+from whatsapp import ler_pedido_whatsapp, montar_csv_pedido, nome_arquivo_pedido, total_confere
+
+# Início de mensagem em conversas exportadas do WhatsApp:
+#   Android: "18/10/2026 10:15 - Fulano: texto"
+#   iOS:     "[18/10/2026, 10:15:32] Fulano: texto"
+CABECALHO_MENSAGEM = re.compile(
+    r"^\[?\d{1,2}/\d{1,2}/\d{2,4},?\s+\d{1,2}:\d{2}(?::\d{2})?(?:\s*[AaPp][Mm])?\]?\s*(?:-\s*)?[^:]+:\s?"
+)
+MARCADOR_TOTAL = "💰"
+TEXTO_TOTAL = "TOTAL DO PEDIDO"
+
+
+# =====================================================
+# SEPARAR PEDIDOS DE UMA CONVERSA (PASSADA ÚNICA)
+# =====================================================
+def dividir_pedidos(linhas):
+    """
+    Percorre as linhas de uma conversa exportada uma única vez e gera o texto
+    de cada pedido: da primeira linha da mensagem até a linha
+    "💰 *TOTAL DO PEDIDO...". O prefixo de data/remetente é removido.
+    """
+    buffer = []
+    for linha in linhas:
+        linha = linha.rstrip("\r\n").lstrip("\u200e")
+        cabecalho = CABECALHO_MENSAGEM.match(linha)
+        if cabecalho:
+            # Nova mensagem: descarta o que sobrou da anterior sem total
+            buffer = []
+            linha = linha[cabecalho.end():]
+        buffer.append(linha)
+
+        if MARCADOR_TOTAL in linha and TEXTO_TOTAL in linha:
+            yield "\n".join(buffer)
+            buffer = []
+
+
+def linhas_conversa(arquivo, nome):
+    """
+    Itera as linhas de um .txt exportado ou de todos os .txt de um .zip,
+    sem carregar o conteúdo inteiro em uma string.
+    """
+    if nome.lower().endswith(".zip"):
+        with zipfile.ZipFile(arquivo) as zipf:
+            for membro in sorted(zipf.namelist()):
+                if membro.lower().endswith(".txt"):
+                    with zipf.open(membro) as f:
+                        yield from io.TextIOWrapper(f, encoding="utf-8-sig", errors="replace")
+    else:
+        texto = io.TextIOWrapper(arquivo, encoding="utf-8-sig", errors="replace")
+        try:
+            yield from texto
+        finally:
+            texto.detach()
+
+
+# =====================================================
+# CONVERTER TODOS OS PEDIDOS EM UM ZIP
+# =====================================================
+def converter_conversa(linhas, destino, incluir_pdf=False, workers=WORKERS_PADRAO):
+    """
+    Extrai cada pedido das linhas da conversa e grava em `destino` (caminho
+    ou arquivo binário) um ZIP com um CSV (e, opcionalmente, um PDF) por
+    pedido, nomeados {cnpj}_{telefone}. Os PDFs são renderizados em lote,
+    com `workers` processos.
+
+    Devolve uma lista de dicionários com o resumo de cada pedido, incluindo
+    as linhas de itens não reconhecidas e se a soma dos itens confere com o
+    TOTAL DO PEDIDO.
+    """
+    resumo = []
+    documentos_pdf = []
+    usados = {}
+    with etapa("whatsapp.conversa") as registro, zipfile.ZipFile(destino, "w", zipfile.ZIP_DEFLATED) as zipf:
+        for texto in dividir_pedidos(linhas):
+            leitura = ler_pedido_whatsapp(texto)
+            df_itens = leitura.itens
+            dados_cliente = leitura.cliente
+            total_pedido = leitura.total
+
+            nome_arquivo = _nome_unico(nome_arquivo_pedido(dados_cliente), usados)
+
+            if not df_itens.empty:
+                zipf.writestr(f"{nome_arquivo}.csv", montar_csv_pedido(df_itens, dados_cliente))
+                if incluir_pdf:
+                    documentos_pdf.append((
+                        f"{nome_arquivo}.pdf",
+                        parametros_pdf_pedido(texto, df_itens, dados_cliente, total_pedido, leitura.endereco)
+                    ))
+
+            resumo.append({
+                "Arquivo": nome_arquivo,
+                "Razao_Social": dados_cliente.get("Razao_Social", ""),
+                "CNPJ": dados_cliente.get("CNPJ", ""),
+                "Itens": len(df_itens),
+                "Total": total_pedido,
+                "Linhas_Com_Falha": len(leitura.falhas),
+                "Total_Confere": total_confere(leitura),
+            })
+
+        escrever_pdfs(zipf, documentos_pdf, workers=workers)
+        registro["linhas"] = len(resumo)
+
+    return resumo
+
+
+def _nome_unico(nome, usados):
+    # O mesmo cliente pode enviar mais de um pedido na conversa
+    usados[nome] = usados.get(nome, 0) + 1
+    return nome if usados[nome] == 1 else f"{nome}_{usados[nome]}"